@@ -0,0 +1,55 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import time
+import numpy as np
+import pandas as pd
+
+from co_terms import encode_term_lists, count_term_pairs
+
+
+def bench_count_term_pairs(n_records: int = 200_000,
+                           n_vocab: int = 20_000,
+                           max_terms: int = 30,
+                           n_workers_lst: list = [1, 4, 16]
+                           ) -> pd.DataFrame:
+    """
+    Time the co-term pair counting for a synthetic keyword corpus with 1, 4, and 16 workers
+    and check that all runs give the same result as the serial run.
+    """
+
+    rng = np.random.default_rng(42)
+
+    # Synthetic keyword lists with a Zipf-like term distribution
+    lengths = rng.integers(1, max_terms + 1, size = n_records)
+    term_ids = np.minimum(rng.zipf(1.3, size = lengths.sum()), n_vocab) - 1
+    terms = np.array([f'term {i}' for i in range(n_vocab)], dtype = object)[term_ids]
+    term_se = pd.Series(np.split(terms, np.cumsum(lengths)[:-1])).map(list)
+
+    vocab, indptr, indices, _ = encode_term_lists(term_se)
+
+    results = []
+    serial = None
+
+    for n_workers in n_workers_lst:
+        start_time = time.perf_counter()
+        pairs = count_term_pairs(indptr, indices, n_terms = len(vocab), n_workers = n_workers)
+        seconds = time.perf_counter() - start_time
+
+        if serial is None:
+            serial = pairs
+        elif not all(np.array_equal(a, b) for a, b in zip(serial, pairs)):
+            raise AssertionError(f"The result with {n_workers} workers differs from the serial result")
+
+        results.append({'n_workers': n_workers, 'seconds': seconds, 'n_pairs': len(pairs[0])})
+
+    results_df = pd.DataFrame(results)
+    results_df['speedup'] = results_df['seconds'].iloc[0] / results_df['seconds']
+
+    return results_df
+
+
+if __name__ == '__main__':
+    print(bench_count_term_pairs())
@@ -0,0 +1,51 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import time
+import numpy as np
+import pandas as pd
+
+from config import default_embedding_model
+from embed import embed_documents
+
+
+def bench_embed_documents(n_docs: int = 100_000,
+                          configs: list = [(1, None), (2, None), (4, None)],
+                          batch_size: int = 64,
+                          embedding_model: str = default_embedding_model
+                          ) -> pd.DataFrame:
+    """
+    Measure the embedding throughput for a synthetic corpus of `n_docs` abstracts with 
+    different numbers of processes and torch threads per process. By default, the 
+    threads are split evenly between the processes. `embedding_model` can also be the 
+    path of a local sentence transformer model.
+    """
+
+    rng = np.random.default_rng(42)
+    n_cores = os.cpu_count() or 1
+
+    # Synthetic abstracts of 50 to 350 words from a small vocabulary
+    vocab = np.array(['risk', 'bank', 'network', 'model', 'market', 'systemic', 'contagion', 'capital',
+                      'financial', 'stability', 'liquidity', 'analysis', 'the', 'of', 'and', 'in'])
+    lengths = rng.integers(50, 350, size = n_docs)
+    docs = [' '.join(rng.choice(vocab, size = n)) for n in lengths]
+
+    results = []
+
+    for n_processes, n_threads in configs:
+        n_threads = n_threads or max(1, n_cores // n_processes)
+
+        start_time = time.perf_counter()
+        embed_documents(docs, embedding_model = embedding_model, batch_size = batch_size, n_processes = n_processes, n_threads = n_threads)
+        seconds = time.perf_counter() - start_time
+
+        results.append({'n_processes': n_processes, 'n_threads': n_threads, 
+                        'seconds': seconds, 'docs_per_sec': n_docs / seconds})
+
+    return pd.DataFrame(results)
+
+
+if __name__ == '__main__':
+    print(bench_embed_documents())
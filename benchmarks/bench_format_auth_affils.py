@@ -0,0 +1,72 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import time
+import numpy as np
+import pandas as pd
+
+from config import BiblioSource
+from clean import format_auth_affils, format_auth_affils_dims
+
+
+def create_consortium_records(n_records: int = 1_000,
+                              n_authors: int = 500,
+                              n_collaborations: int = 10
+                              ) -> pd.Series:
+    """
+    Create synthetic Dimensions authors-affiliations strings of consortium papers, with 
+    `n_authors` authors per record and nested parentheses in the affiliations. The records
+    belong to `n_collaborations` collaborations, which share their author lists.
+    """
+
+    rng = np.random.default_rng(42)
+
+    affiliations = [f'Department of Physics (Group {i}), University {i % 400}, City {i % 90}, Country {i % 40}' for i in range(2_000)]
+    collaborations = []
+
+    for _ in range(n_collaborations):
+        auth_affils_lst = []
+
+        for i in rng.integers(0, 100_000, size = n_authors):
+            n_affils = rng.integers(1, 4)
+            affils_str = '; '.join(affiliations[j] for j in rng.integers(0, len(affiliations), size = n_affils))
+            auth_affils_lst.append(f'Surname{i}, Firstname{i % 97} M. ({affils_str})')
+
+        collaborations.append('; '.join(auth_affils_lst))
+
+    return pd.Series([collaborations[i] for i in rng.integers(0, n_collaborations, size = n_records)])
+
+
+def bench_format_auth_affils(n_records: int = 1_000,
+                             n_authors: int = 500
+                             ) -> pd.DataFrame:
+    """
+    Time the per-record formatting (`format_auth_affils_dims` with `apply`) and the batch
+    formatting (`format_auth_affils`) of long consortium records, and check that both give
+    the same result.
+    """
+
+    auth_affils_se = create_consortium_records(n_records, n_authors)
+
+    start_time = time.perf_counter()
+    expected_se = auth_affils_se.apply(format_auth_affils_dims)
+    apply_seconds = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    auth_affils_formatted_se = format_auth_affils(auth_affils_se, BiblioSource.DIMS)
+    batch_seconds = time.perf_counter() - start_time
+
+    if not auth_affils_formatted_se.equals(expected_se):
+        raise AssertionError(f"The batch result differs from the per-record result")
+
+    return pd.DataFrame([{'n_records': len(auth_affils_se),
+                          'mean_record_kb': auth_affils_se.str.len().mean() / 1_000,
+                          'apply_seconds': apply_seconds,
+                          'batch_seconds': batch_seconds,
+                          'speedup': apply_seconds / batch_seconds}])
+
+
+if __name__ == '__main__':
+    print(bench_format_auth_affils())
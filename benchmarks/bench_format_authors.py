@@ -0,0 +1,68 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import time
+import numpy as np
+import pandas as pd
+
+from config import BiblioSource
+from clean import format_authors, format_auth_scopus, format_auth_lens, format_auth_dims
+
+
+def bench_format_authors(n_authors: int = 1_000_000,
+                         max_authors: int = 20
+                         ) -> pd.DataFrame:
+    """
+    Time the per-record author formatting (`format_auth_*` with `apply`) and the batch 
+    formatting (`format_authors`) for synthetic Scopus, Lens and Dimensions exports with 
+    about `n_authors` author names, and check that both give the same result.
+    """
+
+    rng = np.random.default_rng(42)
+
+    surnames = np.array([f'Surname{i}' for i in range(5_000)] + ['Müller', 'Taghizadeh-Hesary', 'de Kaspar'], dtype = object)
+    first_names = np.array(['John', 'Anna', 'M.', 'Xiao', 'Pia-Johanna', 'J.A.', 'Zoë'], dtype = object)
+
+    # Synthetic author lists with 1 to max_authors authors per record
+    lengths = rng.integers(1, max_authors + 1, size = 2 * n_authors // max_authors)
+    n_names = lengths.sum()
+    surname_arr = surnames[rng.integers(0, len(surnames), size = n_names)]
+    first_arr = first_names[rng.integers(0, len(first_names), size = n_names)] + ' ' + first_names[rng.integers(0, len(first_names), size = n_names)]
+    bounds = np.cumsum(lengths)[:-1]
+
+    formats = {BiblioSource.SCOPUS: (surname_arr + ' ' + first_arr, ', ', format_auth_scopus),
+               BiblioSource.LENS: (first_arr + ' ' + surname_arr, '; ', format_auth_lens),
+               BiblioSource.DIMS: (surname_arr + ', ' + first_arr, '; ', format_auth_dims)}
+
+    results = []
+
+    for biblio_source, (names, sep, format_func) in formats.items():
+        authors_se = pd.Series([sep.join(record) for record in np.split(names, bounds)])
+
+        start_time = time.perf_counter()
+        expected_se = authors_se.apply(format_func)
+        apply_seconds = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        authors_formatted_se = format_authors(authors_se, biblio_source)
+        batch_seconds = time.perf_counter() - start_time
+
+        if not authors_formatted_se.equals(expected_se):
+            raise AssertionError(f"The batch result for {biblio_source.name} differs from the per-record result")
+
+        results.append({'biblio_source': biblio_source.name, 
+                        'n_records': len(authors_se), 
+                        'n_authors': n_names,
+                        'apply_seconds': apply_seconds, 
+                        'batch_seconds': batch_seconds})
+
+    results_df = pd.DataFrame(results)
+    results_df['speedup'] = results_df['apply_seconds'] / results_df['batch_seconds']
+
+    return results_df
+
+
+if __name__ == '__main__':
+    print(bench_format_authors())
@@ -340,6 +340,136 @@ def format_auth_dims(authors: Union[str, float]) -> Union[str, float]:
         return 'Anonymous, N.A.'
 
 
+# The whitespace characters of Python's str.split() and str.strip()
+_whitespace_chars = '\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000'
+
+
+def _normalise_whitespace(names_arr: Any) -> Any:
+    """
+    Strip the author names in a pyarrow string array and separate their parts by single spaces,
+    like `' '.join(name.split())`. Only the names with other whitespace are rewritten with a regex.
+    """
+
+    import pyarrow.compute as pc
+
+    names_arr = pc.utf8_trim(names_arr, _whitespace_chars)
+    irregular_mask = pc.match_substring_regex(names_arr, f"[{re.escape(_whitespace_chars.replace(' ', ''))}]|  ")
+
+    if pc.any(irregular_mask).as_py():
+        irregular_arr = pc.replace_substring_regex(names_arr.filter(irregular_mask), f"[{re.escape(_whitespace_chars)}]+", ' ')
+        names_arr = pc.replace_with_mask(names_arr, irregular_mask, irregular_arr)
+
+    return names_arr
+
+
+def _format_author_names(names_arr: Any, surname_first: bool) -> Any:
+    """
+    Format the author names in a pyarrow string array as `Surname, Initials`, with the same
+    rules as `format_auth_scopus`. The names are non-empty, with the name parts separated
+    by single spaces.
+    """
+
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    parts_lst_arr = pc.split_pattern(names_arr, ' ')
+    parts_arr = pc.list_flatten(parts_lst_arr)
+    offsets = parts_lst_arr.offsets.to_numpy() - parts_lst_arr.offsets[0].as_py()
+    n_parts = np.diff(offsets)
+
+    # The surname is the first or last name part, the initials are made from the other parts
+    surname_pos = offsets[:-1] if surname_first else offsets[1:] - 1
+    other_mask = np.ones(len(parts_arr), dtype = bool)
+    other_mask[surname_pos] = False
+
+    other_parts_arr = parts_arr.filter(pa.array(other_mask))
+    other_parts_arr = pc.if_else(pc.ends_with(other_parts_arr, '.'),
+                                 other_parts_arr,
+                                 pc.binary_join_element_wise(pc.utf8_slice_codeunits(other_parts_arr, 0, 1), '.', ''))
+
+    other_offsets = np.concatenate([[0], np.cumsum(n_parts - 1)]).astype(np.int32)
+    initials_arr = pc.binary_join(pa.ListArray.from_arrays(pa.array(other_offsets), other_parts_arr), '')
+    initials_arr = pc.if_else(pa.array(n_parts > 1), initials_arr, 'N.A.')
+
+    return pc.binary_join_element_wise(parts_arr.take(pa.array(surname_pos)), initials_arr, ', ')
+
+
+def format_authors(authors_se: pd.Series, biblio_source: BiblioSource) -> pd.Series:
+    """
+    Reformats the author names of all the publications in a Scopus, Lens or Dimensions
+    CSV export. The result is the same as applying `format_auth_scopus`, `format_auth_lens`
+    or `format_auth_dims` to each record, but the author lists are split into a single
+    array of author names that is formatted with pyarrow string kernels, and the names
+    are then joined again per record. Without pyarrow, the functions are applied per record.
+
+    Args:
+        authors_se:
+            The author names strings.
+        biblio_source:
+            The bibliographic database of the export (SCOPUS, LENS or DIMS).
+
+    Raises:
+        ValueError: If the biblio_source is not SCOPUS, LENS or DIMS, or if a Dimensions
+        author name consists only of commas.
+
+    Returns:
+        The formatted author names strings, with the index of `authors_se`.
+    """
+
+    format_funcs = {BiblioSource.SCOPUS: format_auth_scopus,
+                    BiblioSource.LENS: format_auth_lens,
+                    BiblioSource.DIMS: format_auth_dims}
+
+    if biblio_source not in format_funcs:
+        raise ValueError(f"The biblio_source has to be SCOPUS, LENS or DIMS")
+
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        return authors_se.apply(format_funcs[biblio_source])
+
+    # The records without authors
+    values = authors_se.to_numpy(dtype = object)
+    valid_mask = np.array([isinstance(authors, str) and authors != '' for authors in values], dtype = bool)
+    formatted = np.full(len(values), 'Anonymous, NA.' if biblio_source == BiblioSource.LENS else 'Anonymous, N.A.', dtype = object)
+
+    authors_arr = pa.array(values[valid_mask], type = pa.string())
+
+    # Scopus separates the authors with ';' or, if there is no ';' in a record, with ','
+    if biblio_source == BiblioSource.SCOPUS:
+        authors_arr = pc.if_else(pc.match_substring(authors_arr, ';'), authors_arr, pc.replace_substring(authors_arr, ',', ';'))
+
+    # Split all the records into one array of author names
+    authors_lst_arr = pc.split_pattern(authors_arr, ';')
+    record_ids = pc.list_parent_indices(authors_lst_arr).to_numpy()
+    names_arr = pc.list_flatten(authors_lst_arr)
+
+    # Normalise the whitespace and drop the empty names
+    names_arr = _normalise_whitespace(names_arr)
+    keep_mask = pc.not_equal(names_arr, '')
+
+    if biblio_source == BiblioSource.DIMS:
+        names_arr = _normalise_whitespace(pc.replace_substring(names_arr, ',', ''))
+
+        if pc.any(pc.and_(keep_mask, pc.equal(names_arr, ''))).as_py():
+            raise ValueError(f"Some author names in authors_se consist only of commas")
+
+    names_arr = names_arr.filter(keep_mask)
+    record_ids = record_ids[keep_mask.to_numpy(zero_copy_only = False)]
+
+    names_arr = _format_author_names(names_arr, surname_first = biblio_source != BiblioSource.LENS)
+
+    # Join the names of each record
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(record_ids, minlength = len(authors_arr)))]).astype(np.int32)
+    normalised_arr = pc.binary_join(pa.ListArray.from_arrays(pa.array(offsets), names_arr), '; ')
+    normalised_arr = pc.if_else(pc.starts_with(normalised_arr, '[N'), 'Anonymous, N.A.', normalised_arr)
+
+    formatted[valid_mask] = normalised_arr.to_numpy(zero_copy_only = False)
+
+    return pd.Series(list(formatted), index = authors_se.index, name = authors_se.name)
+
+
 def format_auth_affils_scopus(auth_affils_str: Union[str, float]) -> Union[str, float]:
     """
     Reformats the authors-affilitions string of a Scopus publication in a CSV export.
@@ -396,6 +526,85 @@ def format_auth_affils_scopus(auth_affils_str: Union[str, float]) -> Union[str,
     return normalised_str
 
 
+_paren_pattern = re.compile(r'[()]')
+
+
+def split_auth_affils_dims(auth_affils_str: str) -> List[str]:
+    """
+    Split the authors-affiliations string of a Dimensions publication into the individual
+    author-affiliations. The string is split at each `);` that closes the outermost parenthesis,
+    so that a `;` between affiliations, e.g. `(Affiliation 1; Affiliation 2)`, is kept. A `)`
+    without an opening parenthesis is ignored.
+
+    Only the parentheses are visited, so long strings of consortium papers are split in
+    linear time without a loop over all the characters.
+    """
+
+    splits = []
+    depth = 0   # number of open parentheses
+    start = 0   # starting index of the current author-affiliation
+
+    for match in _paren_pattern.finditer(auth_affils_str):
+        if match.group() == '(':
+            depth += 1
+        elif depth:
+            depth -= 1
+            end = match.end()
+
+            if not depth and auth_affils_str.startswith(';', end):
+                splits.append(auth_affils_str[start:end])
+                start = end + 1
+
+    splits.append(auth_affils_str[start:])
+
+    return splits
+
+
+def _format_auth_affil_dims(auth_affil_str: str) -> str:
+    """
+    Reformats a single author-affiliation of a Dimensions publication, see `format_auth_affils_dims`.
+    """
+
+    # Split the author-affiliation at the first opening parenthesis
+    auth_affil = auth_affil_str.strip().split('(', maxsplit = 1)
+
+    # Extract the affiliation, if present
+    if len(auth_affil) == 2:
+        affiliation = auth_affil[1][:-1] if auth_affil[1].endswith(')') else auth_affil[1]
+
+    else:
+        affiliation = ''
+
+    # Extract the author information, if present
+    if auth_affil[0]:
+        author_parts = auth_affil[0].split(',', maxsplit=1)
+        surname = author_parts[0].strip()
+
+        if len(author_parts) > 1:
+            name_parts = [part.strip() for part in author_parts[1].split()]
+
+            # Format the author name using the first letter of each name part
+            initials = [part[0] + '.' if not part.endswith('.') else part for part in name_parts]
+            name = ''.join(initials)
+        else:
+            name = ''
+    else:
+        # No author information
+        surname = ''
+        name = ''
+
+    # Construct the normalised author-affiliation string
+    if surname:
+        if name:
+            return f'{surname}, {name} ({affiliation})'
+        else:
+            return f'{surname}, N.A. ({affiliation})'
+    elif affiliation:
+        return f'Anonymous, N.A. ({affiliation})'
+    else:
+        return f'Anonymous, N.A. ()'
+
+
 def format_auth_affils_dims(auth_affils_str: Union[str, float]) -> Union[str, float]:
     """
     Reformats the authors-affilitions string of a Dimensions publication in a CSV export.
@@ -420,78 +629,58 @@ def format_auth_affils_dims(auth_affils_str: Union[str, float]) -> Union[str, fl
     # TODO:
     # - Add a try/except to catch cases where strings are ill-formed and print a warning. These cases cannot be
     #   handled here, but the user might be able to fix it manually.
-    
-    auth_affils = []
 
-    if isinstance(auth_affils_str, str):
-        splits = []
-        stack = []  # stack to keep track of open parentheses
-        start = 0   # starting index of the current substring
-        
-        for i, char in enumerate(auth_affils_str):
-            if char == '(':
-                stack.append(i)  # add the index of opening parentheses to the stack
-            elif char == ')' and stack:
-                stack.pop()  # remove the index of matching opening parentheses from the stack
-                if not stack and i < len(auth_affils_str) - 1 and auth_affils_str[i + 1] == ';':
-                    # If stack is empty and ';' is followed by the substring, split the string
-                    splits.append(auth_affils_str[start:i + 1])
-                    start = i + 2
-        
-        splits.append(auth_affils_str[start:])  # append the remaining part of the string
-        auth_affils = [part.strip().split('(', maxsplit = 1) for part in splits] # split each author-affiliation at the first opening parenthesis
-    else:
+    if not isinstance(auth_affils_str, str):
         return np.nan
-    
-    auth_affil_str_lst = []
 
-    for auth_affil in auth_affils:
+    return '; '.join(_format_auth_affil_dims(auth_affil_str) for auth_affil_str in split_auth_affils_dims(auth_affils_str))
 
-        # Extract the affiliation, if present
-        if len(auth_affil) == 2:
-            affiliation = auth_affil[1][:-1] if auth_affil[1].endswith(')') else auth_affil[1]
 
-        else:
-            affiliation = ''
+def format_auth_affils(auth_affils_se: pd.Series, biblio_source: BiblioSource) -> pd.Series:
+    """
+    Reformats the authors-affiliations of all the publications in a Scopus or Dimensions
+    CSV export, with the same result as applying `format_auth_affils_scopus` or
+    `format_auth_affils_dims` to each record.
 
-        # Extract the author information, if present
-        if auth_affil[0]:
-            author_parts = auth_affil[0].split(',', maxsplit=1)
-            surname = author_parts[0].strip()
+    The Dimensions records are split with `split_auth_affils_dims`, and each distinct record
+    and author-affiliation is split and formatted only once. This pays off for consortium
+    papers, whose long author lists are repeated across many records.
 
-            if len(author_parts) > 1:
-                name_parts = [part.strip() for part in author_parts[1].split()]
+    Args:
+        auth_affils_se:
+            The authors-affiliations strings.
+        biblio_source:
+            The bibliographic database of the export (SCOPUS or DIMS).
 
-                # Format the author name using the first letter of each name part
-                initials = [part[0] + '.' if not part.endswith('.') else part for part in name_parts]
-                name = ''.join(initials)
-            else:
-                name = ''
-        else:
-            # No author information
-            surname = ''
-            name = ''
+    Raises:
+        ValueError: If the biblio_source is not SCOPUS or DIMS.
 
-        # Construct the normalised author-affiliation string
-        auth_affil_str = np.nan
+    Returns:
+        The formatted authors-affiliations strings, with the index of `auth_affils_se`.
+    """
 
-        if surname:
-            if name:
-                auth_affil_str = f'{surname}, {name} ({affiliation})'
-            else:
-                auth_affil_str = f'{surname}, N.A. ({affiliation})'
-        elif affiliation:
-            auth_affil_str = f'Anonymous, N.A. ({affiliation})'
-        else:
-            auth_affil_str = f'Anonymous, N.A. ()'
+    if biblio_source == BiblioSource.SCOPUS:
+        return auth_affils_se.apply(format_auth_affils_scopus)
+    elif biblio_source != BiblioSource.DIMS:
+        raise ValueError(f"The biblio_source has to be SCOPUS or DIMS")
 
-        auth_affil_str_lst.append(auth_affil_str)
+    values = auth_affils_se.to_numpy(dtype = object)
+    valid_mask = np.array([isinstance(auth_affils_str, str) for auth_affils_str in values], dtype = bool)
+    formatted = np.full(len(values), np.nan, dtype = object)
 
-    if not auth_affil_str_lst:
-        return np.nan
-    else:
-        normalised_str = '; '.join(auth_affil_str_lst)
-        return normalised_str
+    # Split the distinct records into one list of author-affiliations
+    record_codes, records = pd.factorize(values[valid_mask])
+    auth_affils_lst = [split_auth_affils_dims(auth_affils_str) for auth_affils_str in records]
+    offsets = np.concatenate([[0], np.cumsum([len(auth_affils) for auth_affils in auth_affils_lst])])
+
+    # Format the distinct author-affiliations
+    auth_affil_codes, auth_affils = pd.factorize(np.array([auth_affil for auth_affils in auth_affils_lst for auth_affil in auth_affils], dtype = object))
+    auth_affils_formatted = np.array([_format_auth_affil_dims(auth_affil_str) for auth_affil_str in auth_affils], dtype = object)[auth_affil_codes]
+
+    records_formatted = np.array(['; '.join(auth_affils_formatted[start:end]) for start, end in zip(offsets[:-1], offsets[1:])], dtype = object)
+    formatted[valid_mask] = records_formatted[record_codes]
+
+    return pd.Series(list(formatted), index = auth_affils_se.index, name = auth_affils_se.name)
 
 
 def get_biblio_source_string(biblio_source: BiblioSource) -> Union[str, float]:
@@ -612,19 +801,13 @@ def normalise_biblio_entities(biblio_df_: pd.DataFrame,
 
     # Normalise the authors format
     if 'authors' in biblio_df.columns:
-        if biblio_source == BiblioSource.SCOPUS:
-            biblio_df['authors'] = biblio_df['authors'].apply(format_auth_scopus)
-        elif biblio_source == BiblioSource.LENS:
-            biblio_df['authors'] = biblio_df['authors'].apply(format_auth_lens)
-        elif biblio_source == BiblioSource.DIMS:
-            biblio_df['authors'] = biblio_df['authors'].apply(format_auth_dims)
+        if biblio_source in [BiblioSource.SCOPUS, BiblioSource.LENS, BiblioSource.DIMS]:
+            biblio_df['authors'] = format_authors(biblio_df['authors'], biblio_source)
 
     # Normalise the author-affiliations format
     if 'auth_affils' in biblio_df.columns:
-        if biblio_source == BiblioSource.SCOPUS:
-            biblio_df['auth_affils'] = biblio_df['auth_affils'].apply(format_auth_affils_scopus)
-        elif biblio_source == BiblioSource.DIMS:
-            biblio_df['auth_affils'] = biblio_df['auth_affils'].apply(format_auth_affils_dims)
+        if biblio_source in [BiblioSource.SCOPUS, BiblioSource.DIMS]:
+            biblio_df['auth_affils'] = format_auth_affils(biblio_df['auth_affils'], biblio_source)
 
     biblio_df = biblio_df.drop(columns = ['ext_url', 'source_urls', 'kws_author', 'kws_index', 'kws_lens', 'mesh'], errors = 'ignore')
 
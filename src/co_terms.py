@@ -1,10 +1,15 @@
 import pandas as pd
 import numpy as np
 import igraph as ig
+import hashlib
+import multiprocessing
+import random
 
 from collections import Counter
-from typing import Tuple, Dict, List, Union, Optional
-from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Tuple, Dict, List, Union, Optional, TextIO
+from xml.sax.saxutils import escape, quoteattr
 from tqdm import tqdm
 
 from config import *
@@ -12,18 +17,201 @@ from utilities import *
 
 # FIXME: When `sampling = True`, some runs lead to an error (see Co-Words notebook).
 
+# Results of analyse_co_term_graph, keyed by the hash of the graph and the analysis parameters. Only the 
+# co_term_analysis_cache_size most recently used results are kept, co_term_analysis_cache.clear() frees them all.
+co_term_analysis_cache: Dict[str, pd.DataFrame] = {}
+co_term_analysis_cache_size = 16
 
-def create_co_term_graph(term_se: pd.Series,
-                      min_count: int = 0,
-                      singularise: bool = True,
-                      synonymise: bool = False,
-                      stem: bool = False,
-                      exclude_terms: Optional[List] = None) -> Tuple[ig.Graph, List[str], Counter]:
+# The igraph layouts that take edge weights
+weighted_layouts = ['fr', 'fruchterman_reingold', 'kk', 'kamada_kawai', 'drl']
+
+
+def encode_term_lists(term_se: pd.Series) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Encode the term lists in `term_se` as integer ids into a shared vocabulary.
+
+    The vocabulary is sorted, so that comparing two term ids gives the same result 
+    as comparing the terms themselves. Duplicate terms in a record are removed. The 
+    encoded records are stored in a compressed sparse row layout: the sorted term ids 
+    of record `k` are `indices[indptr[k]:indptr[k + 1]]`.
+
+    Args:
+        term_se: 
+            A Series where each item is a non-empty list of terms.
+
+    Returns:
+        A tuple `(vocab, indptr, indices, freq)` with the sorted array of unique terms, 
+        the record offsets, the term ids, and the number of occurrences of each term 
+        in `term_se` (including duplicates within a record).
+    """
+
+    n_docs = len(term_se)
+    doc_ids = np.repeat(np.arange(n_docs, dtype = np.int64), term_se.map(len).to_numpy())
+
+    # Map each term occurrence to its position in the sorted vocabulary
+    codes, vocab = pd.factorize(term_se.explode().to_numpy(), sort = True)
+    n_terms = len(vocab)
+    freq = np.bincount(codes, minlength = n_terms)
+
+    # Remove duplicate terms within a record and sort the term ids of each record
+    keys = np.unique(doc_ids * n_terms + codes)
+    indices = keys % n_terms if n_terms else keys
+    indptr = np.searchsorted(keys // max(n_terms, 1), np.arange(n_docs + 1))
+
+    return np.asarray(vocab, dtype = object), indptr, indices, freq
+
+
+def _mask_term_ids(indptr: np.ndarray,
+                   indices: np.ndarray,
+                   keep_mask: np.ndarray
+                   ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Remove the term ids for which `keep_mask` is False from the encoded records.
+    """
+
+    keep = keep_mask[indices]
+    n_kept = np.concatenate([[0], np.cumsum(keep)])
+
+    return n_kept[indptr], indices[keep]
+
+
+def _drop_short_records(indptr: np.ndarray,
+                        indices: np.ndarray,
+                        min_terms: int
+                        ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Remove the encoded records with fewer than `min_terms` term ids.
+    """
+
+    lengths = np.diff(indptr)
+    keep_docs = lengths >= min_terms
+    indptr = np.concatenate([[0], np.cumsum(lengths[keep_docs])])
+
+    return indptr, indices[np.repeat(keep_docs, lengths)]
+
+
+def _count_term_pairs_chunk(chunk: Tuple[np.ndarray, np.ndarray, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Count the term id pairs in a shard of encoded records.
+
+    This runs in the worker processes of `count_term_pairs`. Each pair `(i, j)` with 
+    `i < j` is stored as the key `i * n_terms + j`, so the local accumulator is a pair of 
+    arrays with the unique keys and their counts.
+    """
+
+    indptr, indices, n_terms = chunk
+    triu_cache = {}     # upper triangle indices by record length
+    keys = []
+
+    for k in range(len(indptr) - 1):
+        ids = indices[indptr[k]:indptr[k + 1]]
+        n = len(ids)
+
+        if n > 1:
+            if n not in triu_cache:
+                triu_cache[n] = np.triu_indices(n, k = 1)
+            i, j = triu_cache[n]
+            keys.append(ids[i] * n_terms + ids[j])
+
+    if not keys:
+        return np.empty(0, dtype = np.int64), np.empty(0, dtype = np.int64)
+
+    return np.unique(np.concatenate(keys), return_counts = True)
+
+
+def count_term_pairs(indptr: np.ndarray,
+                     indices: np.ndarray,
+                     n_terms: int,
+                     n_workers: int = 1
+                     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Count how many records contain each pair of terms.
+
+    With `n_workers > 1`, the records are split into shards with about the same number 
+    of term pairs and counted in a process pool. The per-shard counts are summed at 
+    the end, so the result is the same for any number of workers. The workers are 
+    spawned and import this module first, which does not load the spaCy model.
+
+    Args:
+        indptr, indices: 
+            The encoded records returned by `encode_term_lists`.
+        n_terms: 
+            The size of the vocabulary.
+        n_workers: 
+            The number of worker processes (default: 1, counts in the current process).
+
+    Returns:
+        A tuple `(term_1, term_2, counts)` of arrays with the term ids of each pair 
+        (`term_1 < term_2`), sorted by pair, and the number of records with the pair.
+    """
+
+    n_docs = len(indptr) - 1
+    n_shards = max(1, min(n_workers, n_docs))
+
+    # Place the shard boundaries so that each shard has about the same number of pairs
+    lengths = np.diff(indptr)
+    cum_pairs = np.cumsum(lengths * (lengths - 1) // 2)
+    targets = np.linspace(0, cum_pairs[-1] if n_docs else 0, n_shards + 1)[1:-1]
+    bounds = np.concatenate([[0], np.searchsorted(cum_pairs, targets), [n_docs]])
+
+    chunks = [(indptr[a:b + 1] - indptr[a], indices[indptr[a]:indptr[b]], n_terms)
+              for a, b in zip(bounds[:-1], bounds[1:])]
+
+    # Start the workers with spawn, as forking after numba's threading layer is started (e.g. by UMAP) hangs the process
+    if n_shards > 1:
+        with ProcessPoolExecutor(max_workers = n_shards, mp_context = multiprocessing.get_context('spawn')) as executor:
+            results = list(executor.map(_count_term_pairs_chunk, chunks))
+    else:
+        results = [_count_term_pairs_chunk(chunk) for chunk in chunks]
+
+    # Reduce the shard accumulators
+    keys = np.concatenate([keys for keys, _ in results])
+    counts = np.concatenate([counts for _, counts in results])
+    pair_keys, inverse = np.unique(keys, return_inverse = True)
+    pair_counts = np.bincount(inverse, weights = counts, minlength = len(pair_keys)).astype(np.int64)
+
+    n_terms = max(n_terms, 1)
+
+    return pair_keys // n_terms, pair_keys % n_terms, pair_counts
+
+
+def count_co_terms(term_se: pd.Series,
+                   min_count: int = 0,
+                   singularise: bool = True,
+                   synonymise: bool = False,
+                   stem: bool = False,
+                   exclude_terms: Optional[List] = None,
+                   n_workers: int = 1) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Count the co-occurrences of the terms in `term_se`.
+
+    This is the counting stage of `create_co_term_graph`. The result is a sparse 
+    table of term pairs that can be turned into an igraph graph or written to a 
+    file with `write_co_term_graph`.
+
+    Args:
+        term_se: 
+            A Series with strings of terms separated by ';' (e.g. the keywords column).
+        min_count: 
+            Terms that occur in fewer than `min_count` records are removed. A negative 
+            value is a threshold for the pairs instead: only the pairs that occur in at 
+            least `|min_count|` records are kept.
+        singularise, synonymise, stem: 
+            Whether to singularise, synonymise, and stem the terms.
+        exclude_terms: 
+            Terms that are removed.
+        n_workers: 
+            The number of worker processes for counting the pairs (default: 1).
+
+    Returns:
+        A tuple `(terms_df, pairs_df)`. `terms_df` has a column `term` with the sorted 
+        terms that are in at least one pair, `doc_freq` with the number of records that 
+        contain the term, and `freq` with the number of occurrences of the term (counting 
+        duplicates within a record). `pairs_df` has the columns `term_1` and 
+        `term_2` with the row positions of the terms in `terms_df` and `count` with the 
+        number of records that contain both terms.
+    """
 
-    # TODO: Implement negative min_count for keyword pair frequency threshold
-    # TODO: Remove the graph.simplify() in create_co_term_graph, remove the
-    # paur_counter, and instead add the edge count to a new attribute 'count'
-    # to the edges, removing the code below that does that.
     # TODO: Raise an error if there are less then two terms in the dictionary after applying min_count
 
     # Convert term_df items to lists of terms
@@ -32,94 +220,407 @@ def create_co_term_graph(term_se: pd.Series,
     term_se = term_se.apply(lambda lst: lst if len(lst) > 0 else np.nan).dropna()
 
 
-    # Singularise the terms in term_df
+    # Singularise the terms in term_df. The language helpers load the spaCy model, so they 
+    # are only imported when needed (and not by the workers of count_term_pairs)
     if singularise:
+        from language import singularise_terms
+
         tqdm.pandas(desc = f"Singularising the keywords")   # lots of cool paramiters you can pass here. 
         term_se = term_se.progress_apply(singularise_terms)
 
-    # Create a set of all unique strings in term_df
-    unique_strings = np.sort(term_se.explode().unique())
-    unique_strings = [s.strip() for s in unique_strings if s.strip() != '']
+    # Encode the term lists as term ids. The encoding removes duplicate keywords 
+    # in the keyword lists (singularisation and stemming creates duplicates)
+    vocab, indptr, indices, freq = encode_term_lists(term_se)
 
-    # Create a dictionary to keep track of the count of occurrences for each string
-    string_counts_dict = {string: 0 for string in unique_strings}
-
-    # Iterate over term_se to add the individual terms to the string_counts dictionary
-    # and update their count (the frequency of overall occurrence of the term in term_df)
-    for terms in term_se:
-        terms_lst = [term.strip() for term in terms]
-        string_counts_dict.update({string: string_counts_dict.get(string, 0) + 1 for string in terms_lst if string.strip()})
+    # The document frequency of a term is the number of records that contain it
+    doc_freq = np.bincount(indices, minlength = len(vocab))
 
     # The dictionary is filtered if min_count > 0. If min_count < 0, filtering 
     # is done on the co-term pairs.
-    if min_count > 1:   # there are no entries with count = 0 in the dictionary
-        string_counts_dict = {key: value for key, value in string_counts_dict.items() if value >= min_count}
+    count_mask = doc_freq >= min_count if min_count > 1 else np.ones(len(vocab), dtype = bool)
+    string_counts_dict = dict(zip(vocab[count_mask].tolist(), doc_freq[count_mask].tolist()))
 
     if synonymise:
+        from language import synonymise_terms_dict
+
         string_counts_dict = synonymise_terms_dict(string_counts_dict = string_counts_dict)
 
     if stem:
+        from language import stem_terms_dict
+
         string_counts_dict = stem_terms_dict(string_counts_dict = string_counts_dict)
 
-    # Create a list of all the terms
-    terms = list(string_counts_dict.keys())
+    # Only keep the ids of the terms in string_counts_dict that are not in exclude_terms
+    vocab_idx = pd.Index(vocab)
+    keep_mask = vocab_idx.isin(list(string_counts_dict.keys()))
 
-    # Remove terms in exclude_terms
     if exclude_terms:
-        terms = [term for term in terms if term not in exclude_terms]
+        keep_mask &= ~vocab_idx.isin(exclude_terms)
 
-    # Create a new series containing only the terms that have at least one string from the filtered_strings list
-    term_se = term_se[term_se.apply(lambda entry: any(string in entry for string in terms))]
+    indptr, indices = _mask_term_ids(indptr, indices, keep_mask)
 
-    # Remove duplicate keywords in the keyword lists in_se (singularisation and stemming creates duplicates)
-    term_se = term_se.apply(lambda lst: sorted(list(set(lst))))
+    # Remove the records with less than two remaining terms, since they have no term pairs
+    indptr, indices = _drop_short_records(indptr, indices, min_terms = 2)
 
-    # Create an empty graph
-    # graph = nx.Graph()
-    g = ig.Graph()
-
-    # Add nodes to the graph
-    # graph.add_nodes_from(filtered_strings)
-    # g.add_vertices(terms)
-
-    # Create a counter to track the distinct pairs
-    pair_counter = Counter()
+    # Count the term pairs (term ids are sorted like the terms, so term_1 < term_2 as strings)
+    term_1, term_2, counts = count_term_pairs(indptr, indices, n_terms = len(vocab), n_workers = n_workers)
 
-    vs = [] # list of graph vertices
-
-    # Iterate over the values of the filtered Series and add edges to the graph
-    for se_terms in term_se:
-        for string1 in se_terms:
-            if string1 in terms:
-                for string2 in se_terms:
-                    if (string1 < string2) and  string2 in terms:   # the '<' prevents couble counting of string pairs
-                        vs += [string1, string2]
-                        pair_counter[frozenset([string1, string2])] += 1    # frozenset creates an immutble key
+    # If min_count < 0, use |min_count| as a threshold for the number of records with the pair
+    if min_count < 0:
+        pair_mask = counts >= np.abs(min_count)
+        term_1, term_2, counts = term_1[pair_mask], term_2[pair_mask], counts[pair_mask]
 
-    g.add_vertices(list(set(vs)))
+    # Only keep the terms that are in at least one pair and renumber the pairs
+    vertex_ids = np.unique(np.concatenate([term_1, term_2]))
+    terms_df = pd.DataFrame({'term': vocab[vertex_ids],
+                             'doc_freq': doc_freq[vertex_ids],
+                             'freq': freq[vertex_ids]})
+    pairs_df = pd.DataFrame({'term_1': np.searchsorted(vertex_ids, term_1),
+                             'term_2': np.searchsorted(vertex_ids, term_2),
+                             'count': counts})
 
-    for pair, _ in pair_counter.items():
-        v_ed = list(set(pair))
-        g.add_edge(v_ed[0], v_ed[1])
+    return terms_df, pairs_df
 
-    # for key, value in pair_counter.items():
-    #     print(key, value)
 
-    # for vertex in g.vs['name']:
-    #     print(vertex)
+def create_co_term_graph(term_se: pd.Series,
+                      min_count: int = 0,
+                      singularise: bool = True,
+                      synonymise: bool = False,
+                      stem: bool = False,
+                      exclude_terms: Optional[List] = None,
+                      n_workers: int = 1) -> Tuple[ig.Graph, List[str], Counter]:
+
+    # The graph keeps all the pairs, a negative min_count is only applied to pair_counter
+    terms_df, pairs_df = count_co_terms(term_se = term_se,
+                                        min_count = max(min_count, 0),
+                                        singularise = singularise,
+                                        synonymise = synonymise,
+                                        stem = stem,
+                                        exclude_terms = exclude_terms,
+                                        n_workers = n_workers)
+
+    terms = terms_df['term'].to_numpy()
+    term_1 = pairs_df['term_1'].to_numpy()
+    term_2 = pairs_df['term_2'].to_numpy()
+    counts = pairs_df['count'].to_numpy()
+
+    pair_counter = Counter({frozenset([terms[i], terms[j]]): int(count)     # frozenset creates an immutble key
+                            for i, j, count in zip(term_1, term_2, counts)})
+
+    # List of graph vertices, with each term repeated once for every pair it is in
+    vs = np.repeat(np.column_stack([terms[term_1], terms[term_2]]), counts, axis = 0).ravel().tolist()
+
+    # Create the graph with one vertex per term and one edge per pair
+    g = ig.Graph()
+    g.add_vertices(terms.tolist())
+    g.add_edges(list(zip(term_1.tolist(), term_2.tolist())))
+    g.vs['doc_freq'] = terms_df['doc_freq'].tolist()
+    g.vs['freq'] = terms_df['freq'].tolist()
+    g.es['count'] = counts.tolist()
 
     # If min_count < 0, use |min_count| as a threshold for the number of occurrences 
     # of string pairs (string1, string2)
     if min_count < 0:
         pair_counter = Counter({pair: count for pair, count in pair_counter.items() if count >= np.abs(min_count)})
 
-    # Remove multiple edges
-    # g.simplify()
-
     return g, vs, pair_counter
 
 
-
-
-
-
+def _graphml_type(dtype) -> str:
+    """
+    Map a pandas dtype to a GraphML attribute type.
+    """
+
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'boolean'
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'long'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'double'
+    return 'string'
+
+
+def _write_graphml_elements(f: TextIO,
+                            df: pd.DataFrame,
+                            tag: str,
+                            attrs: pd.Series,
+                            key_ids: Dict[str, str]
+                            ) -> None:
+    """
+    Write the GraphML `node` or `edge` elements for the rows of a chunk of `terms_df` or `pairs_df`.
+    """
+
+    lines = f'    <{tag} ' + attrs + '>'
+
+    for col, key_id in key_ids.items():
+        values = df[col]
+
+        if _graphml_type(values.dtype) == 'boolean':
+            values = values.map({True: 'true', False: 'false'})
+        elif _graphml_type(values.dtype) == 'string':
+            values = values.astype(str).map(escape)
+
+        lines = lines + f'<data key="{key_id}">' + values.astype(str) + '</data>'
+
+    f.write(''.join(lines + f'</{tag}>\n'))
+
+
+def write_co_term_graph(terms_df: pd.DataFrame,
+                        pairs_df: pd.DataFrame,
+                        biblio_project_dir: str,
+                        output_dir: str,
+                        output_file: str,
+                        chunk_size: int = 100_000
+                        ) -> None:
+    """
+    Write the co-term graph returned by `count_co_terms` to a file without building an 
+    igraph graph first.
+
+    The rows are written in chunks of `chunk_size`, so writing large graphs does not 
+    need much more memory than `terms_df` and `pairs_df`. The format is set by the 
+    extension of `output_file`:
+
+    - `.graphml`: GraphML file (e.g. for Gephi). The term is the node attribute `name`, 
+      as in the files written by igraph. All other columns of `terms_df` and `pairs_df` 
+      are written as node and edge attributes.
+    - `.csv`: Edge list with the terms in the columns `source` and `target`, followed 
+      by the other columns of `pairs_df`.
+    - `.npz`: NumPy archive with the array `terms` and the columns of `pairs_df`.
+    - `.parquet`: Edge list with dictionary-encoded `source` and `target` columns 
+      (requires pyarrow).
+
+    Args:
+        terms_df: 
+            The terms (nodes), with the term in the column `term`.
+        pairs_df: 
+            The term pairs (edges), with the row positions of the terms in the 
+            columns `term_1` and `term_2`.
+        biblio_project_dir: 
+            The name of the bibliometric project directory.
+        output_dir: 
+            The name of the output directory.
+        output_file: 
+            The name of the output file.
+        chunk_size: 
+            The number of rows written at a time.
+
+    Raises:
+        ValueError: If the output directory does not exist or the file extension is not supported.
+
+    Returns:
+        None
+    """
+
+    allowed_file_extensions = ['.graphml', '.csv', '.npz', '.parquet']
+    root_dir = get_root_dir()
+
+    validate_output_dir_and_ext(biblio_project_dir_name = biblio_project_dir,
+                                output_dir = output_dir,
+                                output_file = output_file,
+                                file_extensions = allowed_file_extensions)
+
+    output_path = Path(root_dir, data_root_dir, biblio_project_dir, output_dir, output_file)
+    suffix = Path(output_file).suffix
+
+    terms = terms_df['term'].to_numpy()
+    edge_cols = [col for col in pairs_df.columns if col not in ['term_1', 'term_2']]
+
+    logger.info(f"Writing co-term graph ({len(terms_df)} terms, {len(pairs_df)} pairs) to file '{output_file}'...")
+
+    if suffix == '.graphml':
+        node_keys = {col: f'v_{col}' for col in terms_df.columns}
+        node_keys['term'] = 'v_name'
+        edge_keys = {col: f'e_{col}' for col in edge_cols}
+
+        with open(output_path, 'w', encoding = 'utf-8') as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            f.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns" '
+                    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+                    'xsi:schemaLocation="http://graphml.graphdrawing.org/xmlns '
+                    'http://graphml.graphdrawing.org/xmlns/1.0/graphml.xsd">\n')
+
+            for col, key_id in node_keys.items():
+                name = 'name' if col == 'term' else col
+                f.write(f'  <key id="{key_id}" for="node" attr.name={quoteattr(name)} '
+                        f'attr.type="{_graphml_type(terms_df[col].dtype)}"/>\n')
+            for col, key_id in edge_keys.items():
+                f.write(f'  <key id="{key_id}" for="edge" attr.name={quoteattr(col)} '
+                        f'attr.type="{_graphml_type(pairs_df[col].dtype)}"/>\n')
+
+            f.write('  <graph id="G" edgedefault="undirected">\n')
+
+            for start in range(0, len(terms_df), chunk_size):
+                chunk = terms_df.iloc[start:start + chunk_size]
+                node_ids = pd.Series(np.arange(start, start + len(chunk)).astype(str), index = chunk.index)
+                _write_graphml_elements(f, chunk, 'node', 'id="n' + node_ids + '"', node_keys)
+
+            for start in range(0, len(pairs_df), chunk_size):
+                chunk = pairs_df.iloc[start:start + chunk_size]
+                edge_ends = 'source="n' + chunk['term_1'].astype(str) + '" target="n' + chunk['term_2'].astype(str) + '"'
+                _write_graphml_elements(f, chunk, 'edge', edge_ends, edge_keys)
+
+            f.write('  </graph>\n</graphml>\n')
+
+    elif suffix == '.csv':
+        with open(output_path, 'w', encoding = 'utf-8', newline = '') as f:
+            for start in range(0, max(len(pairs_df), 1), chunk_size):
+                chunk = pairs_df.iloc[start:start + chunk_size]
+                edges_df = pd.DataFrame({'source': terms[chunk['term_1'].to_numpy()],
+                                         'target': terms[chunk['term_2'].to_numpy()]})
+                for col in edge_cols:
+                    edges_df[col] = chunk[col].to_numpy()
+                edges_df.to_csv(f, index = False, header = (start == 0))
+
+    elif suffix == '.npz':
+        np.savez_compressed(output_path, 
+                            terms = terms.astype(str), 
+                            **{col: pairs_df[col].to_numpy() for col in pairs_df.columns})
+
+    elif suffix == '.parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Writing Parquet files requires the pyarrow package") from e
+
+        terms_arr = pa.array(terms.astype(str))
+        writer = None
+
+        try:
+            for start in range(0, max(len(pairs_df), 1), chunk_size):
+                chunk = pairs_df.iloc[start:start + chunk_size]
+                arrays = {'source': pa.DictionaryArray.from_arrays(pa.array(chunk['term_1'].to_numpy(), pa.int32()), terms_arr),
+                          'target': pa.DictionaryArray.from_arrays(pa.array(chunk['term_2'].to_numpy(), pa.int32()), terms_arr)}
+                for col in edge_cols:
+                    arrays[col] = pa.array(chunk[col].to_numpy())
+                table = pa.table(arrays)
+
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table)
+        except BaseException:
+            # Do not leave a truncated file behind
+            if writer is not None:
+                writer.close()
+                writer = None
+            output_path.unlink(missing_ok = True)
+            raise
+        finally:
+            if writer is not None:
+                writer.close()
+
+    return
+
+
+def hash_co_term_graph(g: ig.Graph, weights: Optional[str] = 'count') -> str:
+    """
+    Returns a hash of the vertex names, the edges, and the edge weights of a co-term graph.
+    """
+
+    h = hashlib.sha256()
+    h.update('\n'.join(g.vs['name'] if g.vcount() else []).encode('utf-8'))
+    h.update(np.array(g.get_edgelist(), dtype = np.int64).tobytes())
+
+    if weights and weights in g.es.attributes():
+        h.update(np.array(g.es[weights], dtype = np.float64).tobytes())
+
+    return h.hexdigest()
+
+
+def analyse_co_term_graph(g: ig.Graph,
+                          community_method: str = 'leiden',
+                          layout: str = 'fr',
+                          weights: Optional[str] = 'count',
+                          resolution: float = 1.0,
+                          seed: int = 42,
+                          cache_dir: Optional[Path] = None
+                          ) -> pd.DataFrame:
+    """
+    Compute the communities, the weighted degree, and a layout of a co-term graph.
+
+    These are the expensive steps before plotting the graph. The results are cached 
+    by the hash of the graph (`hash_co_term_graph`) and the analysis parameters, so 
+    that changing only the plot styling does not recompute them. The cache is kept in 
+    `co_term_analysis_cache` (up to `co_term_analysis_cache_size` results, use 
+    `co_term_analysis_cache.clear()` to free the memory) and, if `cache_dir` is given, 
+    also written to that directory so that it is reused across sessions.
+
+    The results are also added to the graph as the vertex attributes `community`, 
+    `strength`, `x`, and `y`.
+
+    Args:
+        g: 
+            The co-term graph returned by `create_co_term_graph`.
+        community_method: 
+            'leiden' (modularity) or 'louvain' (default: 'leiden').
+        layout: 
+            The name of the igraph layout, e.g. 'fr', 'kk', 'drl', or 'circle' (default: 'fr'). 
+            The edge weights are only used by the layouts in `weighted_layouts`.
+        weights: 
+            The edge attribute with the edge weights (default: 'count'). Use None for 
+            an unweighted analysis.
+        resolution: 
+            The resolution parameter of the community detection (default: 1.0).
+        seed: 
+            The random seed for the community detection and the layout.
+        cache_dir: 
+            Optional directory where the results are stored.
+
+    Raises:
+        ValueError: If `community_method` is not 'leiden' or 'louvain', or the weights 
+        attribute does not exist.
+
+    Returns:
+        A DataFrame with one row per vertex and the columns `term`, `community`, 
+        `strength`, `x`, and `y`.
+    """
+
+    if community_method not in ['leiden', 'louvain']:
+        raise ValueError(f"The community_method has to be 'leiden' or 'louvain'")
+
+    if weights and weights not in g.es.attributes():
+        raise ValueError(f"The graph has no edge attribute '{weights}'")
+
+    params_str = f'{community_method};{layout};{weights};{resolution};{seed}'
+    cache_key = hashlib.sha256((hash_co_term_graph(g, weights) + params_str).encode('utf-8')).hexdigest()
+    cache_path = Path(cache_dir, f'co_term_analysis_{cache_key[:16]}.pkl') if cache_dir else None
+
+    if cache_key in co_term_analysis_cache:
+        analysis_df = co_term_analysis_cache.pop(cache_key)
+    elif cache_path and cache_path.exists():
+        logger.info(f"Reading the co-term graph analysis from '{cache_path.name}'")
+        analysis_df = pd.read_pickle(cache_path)
+    else:
+        # igraph uses the random module for the community detection and the layouts
+        random.seed(seed)
+
+        if community_method == 'leiden':
+            clusters = g.community_leiden(objective_function = 'modularity', 
+                                          weights = weights, 
+                                          resolution = resolution,
+                                          n_iterations = -1)
+        else:
+            clusters = g.community_multilevel(weights = weights, resolution = resolution)
+
+        layout_kwargs = {'weights': weights} if layout in weighted_layouts else {}
+        coords = np.array(g.layout(layout, **layout_kwargs).coords) if g.vcount() else np.empty((0, 2))
+
+        analysis_df = pd.DataFrame({'term': g.vs['name'] if g.vcount() else [],
+                                    'community': clusters.membership,
+                                    'strength': g.strength(weights = weights),
+                                    'x': coords[:, 0],
+                                    'y': coords[:, 1]})
+
+        if cache_path:
+            analysis_df.to_pickle(cache_path)
+
+    # Keep the most recently used results
+    while co_term_analysis_cache and len(co_term_analysis_cache) >= co_term_analysis_cache_size:
+        co_term_analysis_cache.pop(next(iter(co_term_analysis_cache)))
+
+    co_term_analysis_cache[cache_key] = analysis_df
+
+    for col in ['community', 'strength', 'x', 'y']:
+        g.vs[col] = analysis_df[col].tolist()
+
+    return analysis_df
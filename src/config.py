@@ -9,6 +9,9 @@ project_root_markers = ['requirements.txt', '.gitignore', 'README.md']
 
 data_root_dir = 'data'
 model_root_dir = 'models'
+embedding_root_dir = 'embeddings'   # subdirectory of the project model directory with the cached embeddings
+
+default_embedding_model = 'all-MiniLM-L6-v2'    # sentence transformer used by BERTopic for English texts
 """
     str (int): Module level variable documented inline.
 """
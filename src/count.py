@@ -67,7 +67,14 @@ def generate_keyword_stats(biblio_df_: pd.DataFrame,
     if any(string not in biblio_df_.columns for string in cols):
         raise ValueError(f"Some columns in {cols} are not in biblio_df")
     
-    kws_df = biblio_df_[cols].copy()
+    # Compile the filter for the associated keywords once for all columns
+    if assoc_filter:
+        if not '{}' in assoc_filter:
+            raise ValueError(f"The assoc_filter needs to include place holders '{{}}' for the keyword column")
+        
+        assoc_query_plan = compile_query(assoc_filter.format('kw'))
+
+    kws_df = biblio_df_[cols]
     kws_count_df_dict = {}
     kws_assoc_count_df_dict = {}
     
@@ -105,11 +112,8 @@ def generate_keyword_stats(biblio_df_: pd.DataFrame,
         kws_count_df_dict[col] = kw_count_df
 
         if assoc_filter:
-            if not '{}' in assoc_filter:
-                raise ValueError(f"The assoc_filter needs to include place holders '{{}}' for the keyword column")
-            
             kw_assoc_count_df = filter_biblio_df(biblio_df_= kw_count_df,
-                                                 query_str = assoc_filter.format('kw'))
+                                                 query_str = assoc_query_plan)
             kws_count_df_dict[col + '_assoc'] = kw_assoc_count_df
 
     return kws_count_df_dict
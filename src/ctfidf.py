@@ -0,0 +1,300 @@
+"""
+Class-based TF-IDF (c-TF-IDF) keywords of topics, computed with sparse matrices.
+
+The documents are vectorised once into a document-term matrix (`get_doc_term_matrix`),
+which is cached. The top terms of the topics are then computed from the sums of the
+rows of the matrix per topic (`extract_topic_terms`), with the same weighting as
+BERTopic's `ClassTfidfTransformer`. Stopwords, n-gram lengths and custom keyword
+vocabularies are applied as masks on the columns of the cached matrix, so relabelling
+the topics does not vectorise the documents again.
+"""
+
+import pandas as pd
+import numpy as np
+import scipy.sparse as sp
+import hashlib
+import time
+
+from pathlib import Path
+from typing import Tuple, List, Dict, Optional, Union
+
+from config import *
+from utilities import *
+
+from sklearn.feature_extraction.text import CountVectorizer, ENGLISH_STOP_WORDS
+
+
+doc_term_matrix_cache: Dict[str, Tuple[sp.csr_matrix, np.ndarray]] = {}
+
+
+def get_doc_term_matrix(docs: List[str],
+                        n_gram_range: Tuple[int, int] = (1, 1),
+                        min_df: int = 1,
+                        cache_dir: Optional[Path] = None
+                        ) -> Tuple[sp.csr_matrix, np.ndarray]:
+    """
+    Vectorise the documents into a sparse document-term matrix.
+
+    The matrix is cached by the hashes of the documents and the parameters in
+    `doc_term_matrix_cache` and, if `cache_dir` is given, also written to that directory.
+    Build the matrix with the widest `n_gram_range` that you need and without stopword
+    removal; both are selected later in `extract_topic_terms`.
+
+    Args:
+        docs:
+            The texts, e.g. the titles or abstracts that the topics were fitted on.
+        n_gram_range:
+            The lengths of the n-grams (default: (1, 1)).
+        min_df:
+            The minimum number of documents containing a term (default: 1).
+        cache_dir:
+            Optional directory where the matrix is stored.
+
+    Returns:
+        A tuple `(dtm, terms)` with the document-term counts (one row per document) and
+        the terms of the columns.
+    """
+
+    params_str = f'{n_gram_range[0]};{n_gram_range[1]};{min_df}'
+    cache_key = hashlib.sha256(('\n'.join(hash_texts(docs)) + params_str).encode('utf-8')).hexdigest()
+    cache_path = Path(cache_dir, f'doc_term_matrix_{cache_key[:16]}.npz') if cache_dir else None
+
+    if cache_key in doc_term_matrix_cache:
+        return doc_term_matrix_cache[cache_key]
+
+    if cache_path and cache_path.exists():
+        logger.info(f"Reading the document-term matrix from '{cache_path.name}'")
+
+        with np.load(cache_path) as npz:
+            dtm = sp.csr_matrix((npz['data'], npz['indices'], npz['indptr']), shape = tuple(npz['shape']))
+            terms = npz['terms'].astype(object)
+    else:
+        start_time = time.time()
+
+        vectorizer = CountVectorizer(ngram_range = n_gram_range, min_df = min_df, dtype = np.int32)
+        dtm = vectorizer.fit_transform(docs).tocsr()
+        terms = vectorizer.get_feature_names_out().astype(object)
+
+        logger.info(f"Vectorised {len(docs)} documents into {len(terms)} terms in {time.time() - start_time:.2f} seconds")
+
+        if cache_path:
+            np.savez(cache_path,
+                     data = dtm.data,
+                     indices = dtm.indices,
+                     indptr = dtm.indptr,
+                     shape = np.array(dtm.shape),
+                     terms = terms.astype(str))
+
+    doc_term_matrix_cache[cache_key] = (dtm, terms)
+
+    return dtm, terms
+
+
+def select_terms(terms: np.ndarray,
+                 stop_words: Optional[Union[str, List[str]]] = None,
+                 n_gram_range: Optional[Tuple[int, int]] = None,
+                 vocabulary: Optional[List[str]] = None
+                 ) -> np.ndarray:
+    """
+    Returns a boolean mask of the terms to keep.
+
+    Args:
+        terms:
+            The terms of the document-term matrix.
+        stop_words:
+            'english' or a list of stopwords. Terms with a stopword are removed, including
+            n-grams such as 'risk of default' (default: None).
+        n_gram_range:
+            The lengths of the n-grams to keep (default: None, all n-grams).
+        vocabulary:
+            A custom vocabulary of keywords, e.g. the author keywords of the dataset.
+            Only the terms in the vocabulary are kept (default: None).
+
+    Raises:
+        ValueError: If `stop_words` is a string other than 'english'.
+    """
+
+    keep_mask = np.ones(len(terms), dtype = bool)
+
+    if len(terms) == 0:
+        return keep_mask
+
+    tokens_se = pd.Series(terms, dtype = object).str.split(' ')
+
+    if n_gram_range is not None:
+        n_grams = tokens_se.str.len().to_numpy()
+        keep_mask &= (n_grams >= n_gram_range[0]) & (n_grams <= n_gram_range[1])
+
+    if stop_words is not None:
+        if isinstance(stop_words, str):
+            if stop_words != 'english':
+                raise ValueError(f"The stop_words have to be 'english' or a list of words")
+            stop_words = list(ENGLISH_STOP_WORDS)
+
+        # Check each token of the n-grams
+        tokens_se = tokens_se.explode()
+        has_stop_word = tokens_se.isin([word.lower() for word in stop_words]).groupby(level = 0).any()
+        keep_mask &= ~has_stop_word.to_numpy()
+
+    if vocabulary is not None:
+        keep_mask &= pd.Index(terms).isin([term.lower() for term in vocabulary])
+
+    return keep_mask
+
+
+def calc_topic_term_counts(dtm: sp.csr_matrix,
+                           topics: Union[List[int], np.ndarray, pd.Series]
+                           ) -> Tuple[np.ndarray, sp.csr_matrix]:
+    """
+    Sum the rows of the document-term matrix per topic.
+
+    Returns:
+        A tuple `(topic_ids, counts)` with the sorted topic ids and the topic-term counts
+        (one row per topic id).
+    """
+
+    topics = np.asarray(topics)
+
+    if len(topics) != dtm.shape[0]:
+        raise ValueError(f"There are {len(topics)} topics, but the document-term matrix has {dtm.shape[0]} rows")
+
+    topic_ids, topic_codes = np.unique(topics, return_inverse = True)
+
+    # Sparse indicator matrix of the topics (topics x documents)
+    indicator = sp.csr_matrix((np.ones(len(topics), dtype = dtm.dtype), (topic_codes, np.arange(len(topics)))),
+                              shape = (len(topic_ids), len(topics)))
+
+    return topic_ids, (indicator @ dtm).tocsr()
+
+
+def calc_ctfidf(counts: sp.csr_matrix,
+                idf_counts: Optional[sp.csr_matrix] = None
+                ) -> sp.csr_matrix:
+    """
+    Returns the c-TF-IDF weights of the topic-term counts, as in BERTopic's
+    `ClassTfidfTransformer` with the default parameters.
+
+    Args:
+        counts:
+            The topic-term counts from `calc_topic_term_counts`.
+        idf_counts:
+            The topic-term counts used for the idf (default: None, uses `counts`). Pass
+            the counts of the whole corpus to weight the counts of a subset, e.g. of a
+            period, on the same scale.
+    """
+
+    counts = counts.astype(np.float64)
+    idf_counts = counts if idf_counts is None else idf_counts.astype(np.float64)
+
+    # The term frequency in all topics and the average number of words per topic
+    term_freqs = np.asarray(idf_counts.sum(axis = 0)).ravel()
+    avg_topic_size = int(np.asarray(idf_counts.sum(axis = 1)).mean()) if idf_counts.shape[0] else 0
+    topic_sizes = np.asarray(counts.sum(axis = 1)).ravel()
+
+    with np.errstate(divide = 'ignore'):
+        idf = np.log(avg_topic_size / term_freqs + 1)
+
+    # Normalise the rows (L1) and multiply with the idf
+    weights = sp.diags(np.divide(1, topic_sizes, out = np.zeros_like(topic_sizes), where = topic_sizes > 0)) @ counts
+
+    return (weights @ sp.diags(idf)).tocsr()
+
+
+def extract_topic_terms(dtm: sp.csr_matrix,
+                        terms: np.ndarray,
+                        topics: Union[List[int], np.ndarray, pd.Series],
+                        n_terms: int = 10,
+                        stop_words: Optional[Union[str, List[str]]] = None,
+                        n_gram_range: Optional[Tuple[int, int]] = None,
+                        vocabulary: Optional[List[str]] = None
+                        ) -> pd.DataFrame:
+    """
+    Compute the top c-TF-IDF terms of each topic from a document-term matrix.
+
+    Args:
+        dtm:
+            The document-term matrix from `get_doc_term_matrix`.
+        terms:
+            The terms of the columns of `dtm`.
+        topics:
+            The topic of each row of `dtm`, e.g. the `Topic` column returned by `generate_bert_topics`.
+        n_terms:
+            The number of terms per topic (default: 10).
+        stop_words, n_gram_range, vocabulary:
+            The selection of the terms, see `select_terms`.
+
+    Returns:
+        A tidy DataFrame with the columns `Topic`, `rank`, `term`, and `weight`, with
+        up to `n_terms` rows per topic.
+    """
+
+    keep_cols = np.flatnonzero(select_terms(terms, stop_words, n_gram_range, vocabulary))
+    topic_ids, counts = calc_topic_term_counts(dtm[:, keep_cols], topics)
+
+    top_terms_df = get_top_terms(calc_ctfidf(counts), terms[keep_cols], n_terms)
+    top_terms_df.insert(0, 'Topic', topic_ids[top_terms_df.pop('row').to_numpy()])
+
+    return top_terms_df
+
+
+def get_top_terms(weights: sp.csr_matrix,
+                  terms: np.ndarray,
+                  n_terms: int = 10
+                  ) -> pd.DataFrame:
+    """
+    Returns the `n_terms` terms with the highest weights in each row of `weights`, as a
+    tidy DataFrame with the columns `row`, `rank`, `term`, and `weight`. Ties are broken 
+    by the order of the terms.
+    """
+
+    weights = weights.tocsr()
+    weights.eliminate_zeros()
+
+    rows = np.repeat(np.arange(weights.shape[0]), np.diff(weights.indptr))
+
+    # Sort by row, then by descending weight and then by term
+    order = np.lexsort((weights.indices, -weights.data, rows))
+    rows = rows[order]
+    ranks = np.arange(len(order)) - weights.indptr[rows] + 1
+    top_mask = ranks <= n_terms
+
+    return pd.DataFrame({'row': rows[top_mask],
+                         'rank': ranks[top_mask],
+                         'term': terms[weights.indices[order[top_mask]]],
+                         'weight': weights.data[order[top_mask]]})
+
+
+def create_topic_labels_df(topic_terms_df: pd.DataFrame,
+                           n_words: int = 4
+                           ) -> pd.DataFrame:
+    """
+    Create BERTopic-style topic labels, e.g. '3_bank_loan_credit_capital', from the
+    output of `extract_topic_terms`.
+
+    Returns:
+        A DataFrame with the columns `Topic`, `Name`, and `Top_n_words`.
+    """
+
+    grouped = topic_terms_df.sort_values(['Topic', 'rank']).groupby('Topic', sort = True)['term']
+    top_n_words_se = grouped.agg(' - '.join)
+    name_words_se = grouped.agg(lambda terms: '_'.join(terms.iloc[:n_words]))
+
+    return pd.DataFrame({'Topic': top_n_words_se.index,
+                         'Name': top_n_words_se.index.astype(str) + '_' + name_words_se.to_numpy(),
+                         'Top_n_words': top_n_words_se.to_numpy()})
+
+
+def set_bert_topic_terms(model,
+                         topic_terms_df: pd.DataFrame
+                         ) -> None:
+    """
+    Replace the topic representations and labels of a fitted BERTopic model with the
+    terms from `extract_topic_terms`, without refitting or re-vectorising.
+    """
+
+    labels_df = create_topic_labels_df(topic_terms_df)
+
+    for topic_id, topic_df in topic_terms_df.groupby('Topic', sort = True):
+        model.topic_representations_[topic_id] = list(zip(topic_df['term'], topic_df['weight']))
+
+    model.topic_labels_.update(dict(zip(labels_df['Topic'], labels_df['Name'])))
@@ -0,0 +1,336 @@
+"""
+Document embeddings for the topic models in `topics.py`.
+
+Embedding the titles or abstracts with the sentence transformer is the slowest step 
+of fitting a BERTopic model. The embeddings are therefore stored per bibliometric 
+project in `models/biblio_project_dir/embeddings/<model name>/`:
+
+- `embeddings.npy`: the embeddings, one row per document, read as a memory map.
+- `index.csv`: the text hash (`text_hash`) and record id (`id`) of each row.
+
+A document is looked up by the hash of its text, so only new or changed documents 
+are embedded when the dataset is updated.
+"""
+
+import pandas as pd
+import numpy as np
+import os
+import re
+import time
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Tuple, List, Optional
+
+from config import *
+from utilities import *
+
+
+def get_embedding_store_dir(biblio_project_dir: str,
+                            embedding_model: str = default_embedding_model
+                            ) -> Path:
+    """
+    Returns the directory with the cached embeddings of `embedding_model` in a bibliometric 
+    project and creates it if it does not exist.
+
+    Args:
+        biblio_project_dir: 
+            The name of the bibliometric project directory.
+        embedding_model: 
+            The name of the sentence transformer model.
+
+    Returns:
+        A Path object representing the path to the embedding store.
+
+    Raises:
+        ValueError: If the model directory of the project does not exist.
+    """
+
+    model_slug = re.sub(r'[^\w.-]+', '_', embedding_model)
+    store_dir = get_model_dir(biblio_project_dir) / embedding_root_dir / model_slug
+    store_dir.mkdir(parents = True, exist_ok = True)
+
+    return store_dir
+
+
+def read_embedding_store(store_dir: Path) -> Tuple[pd.DataFrame, Optional[np.ndarray]]:
+    """
+    Read the index and the memory-mapped embeddings of an embedding store.
+
+    Returns:
+        A tuple `(index_df, embeddings)`. `embeddings` is None if the store is empty.
+    """
+
+    index_path = store_dir / 'index.csv'
+    embeddings_path = store_dir / 'embeddings.npy'
+
+    if not (index_path.exists() and embeddings_path.exists()):
+        return pd.DataFrame({'text_hash': pd.Series(dtype = str), 'id': pd.Series(dtype = str)}), None
+
+    index_df = pd.read_csv(index_path, dtype = str, keep_default_na = False)
+    embeddings = np.load(embeddings_path, mmap_mode = 'r')
+
+    if len(index_df) != len(embeddings):
+        raise ValueError(f"The embedding store in {store_dir} is corrupt: the index and the embeddings have different lengths")
+
+    return index_df, embeddings
+
+
+def _append_to_embedding_store(store_dir: Path,
+                               index_df: pd.DataFrame,
+                               new_index_df: pd.DataFrame,
+                               new_embeddings: np.ndarray,
+                               block_size: int = 100_000
+                               ) -> None:
+    """
+    Append new rows to an embedding store with the index `index_df`.
+
+    The existing embeddings are copied block by block into a new memory-mapped file, 
+    which then replaces the old file, so the store is never loaded into memory in full. 
+    The caller has to release its memory map of the store first, since an open file 
+    cannot be replaced on Windows.
+    """
+
+    n_old = len(index_df)
+    n_new, dim = new_embeddings.shape
+    embeddings_path = store_dir / 'embeddings.npy'
+    tmp_path = store_dir / 'embeddings.tmp.npy'
+
+    embeddings = np.load(embeddings_path, mmap_mode = 'r') if n_old > 0 else None
+
+    out = np.lib.format.open_memmap(tmp_path, mode = 'w+', dtype = np.float32, shape = (n_old + n_new, dim))
+
+    for start in range(0, n_old, block_size):
+        end = min(start + block_size, n_old)
+        out[start:end] = embeddings[start:end]    # type: ignore - embeddings is not None if n_old > 0
+    out[n_old:] = new_embeddings
+    out.flush()
+
+    # Close both memory maps before the old file is replaced
+    del out, embeddings
+
+    os.replace(tmp_path, embeddings_path)
+
+    pd.concat([index_df, new_index_df], ignore_index = True).to_csv(store_dir / 'index.csv', index = False)
+
+
+# The sentence transformer of a worker process in embed_documents
+_worker_model = None
+
+
+def _load_embedding_model(embedding_model: str):
+    """
+    Load a sentence transformer model on the CPU.
+    """
+
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(embedding_model, device = 'cpu')
+
+
+@contextmanager
+def _torch_num_threads(n_threads: Optional[int]):
+    """
+    Set the number of torch threads within the block and restore the previous number afterwards.
+    """
+
+    if not n_threads:
+        yield
+        return
+
+    import torch
+
+    prev_n_threads = torch.get_num_threads()
+    torch.set_num_threads(n_threads)
+
+    try:
+        yield
+    finally:
+        torch.set_num_threads(prev_n_threads)
+
+
+def _init_embedding_worker(embedding_model: str, n_threads: Optional[int]) -> None:
+    """
+    Load the model once per worker process of embed_documents and pin the number of torch threads of the worker.
+    """
+
+    global _worker_model
+
+    if n_threads:
+        import torch
+        torch.set_num_threads(n_threads)
+
+    _worker_model = _load_embedding_model(embedding_model)
+
+
+def _embed_batches(batches: List[List[str]], batch_size: int, model = None) -> List[np.ndarray]:
+    """
+    Embed batches of documents with `model` or, in a worker process, with the worker's model.
+    """
+
+    model = model if model is not None else _worker_model
+
+    return [np.asarray(model.encode(batch,     # type: ignore - the model is loaded by _init_embedding_worker
+                                    batch_size = batch_size, 
+                                    show_progress_bar = False, 
+                                    convert_to_numpy = True), dtype = np.float32) for batch in batches]
+
+
+def embed_documents(docs: List[str],
+                    embedding_model: str = default_embedding_model,
+                    batch_size: int = 32,
+                    n_processes: int = 1,
+                    n_threads: Optional[int] = None,
+                    verbose: bool = False
+                    ) -> np.ndarray:
+    """
+    Embed documents with a sentence transformer model on the CPU.
+
+    The documents are sorted by length before they are split into batches, so that the 
+    documents in a batch need little padding. With `n_processes > 1`, the batches are 
+    distributed over a process pool with one model per process. Set `n_threads` so that 
+    `n_processes * n_threads` does not exceed the number of CPU cores. The throughput 
+    (documents per second) is logged.
+
+    Args:
+        docs: 
+            The texts to embed.
+        embedding_model: 
+            The name of the sentence transformer model.
+        batch_size: 
+            The number of documents per model call.
+        n_processes: 
+            The number of worker processes (default: 1, embeds in the current process).
+        n_threads: 
+            The number of torch threads per process (default: None, torch default). With 
+            `n_processes = 1`, the previous number of threads is restored afterwards.
+        verbose: 
+            Whether to print the progress of the batches.
+
+    Returns:
+        A float32 array with one row per document, in the order of `docs`.
+    """
+
+    if len(docs) == 0:
+        return np.empty((0, 0), dtype = np.float32)
+
+    start_time = time.time()
+
+    # Sort the documents by length and split into batches
+    order = np.argsort([len(doc) for doc in docs], kind = 'stable')
+    batches = [[docs[i] for i in order[start:start + batch_size]] for start in range(0, len(docs), batch_size)]
+
+    if n_processes > 1:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Interleave the batches so that every process gets short and long documents
+        shards = [batches[k::n_processes] for k in range(n_processes)]
+
+        with ProcessPoolExecutor(max_workers = n_processes,
+                                 mp_context = multiprocessing.get_context('spawn'),
+                                 initializer = _init_embedding_worker,
+                                 initargs = (embedding_model, n_threads)) as executor:
+            shard_embeddings = list(executor.map(_embed_batches, shards, [batch_size] * n_processes))
+
+        # Undo the interleaving
+        batch_embeddings = [None] * len(batches)
+        for k, embeddings_lst in enumerate(shard_embeddings):
+            batch_embeddings[k::n_processes] = embeddings_lst
+    else:
+        model = _load_embedding_model(embedding_model)
+        batch_embeddings = []
+
+        # The number of threads of the current process is only changed while embedding
+        with _torch_num_threads(n_threads):
+            for i, batch in enumerate(batches):
+                batch_embeddings += _embed_batches([batch], batch_size, model = model)
+
+                if verbose:
+                    print(f'{min((i + 1) * batch_size, len(docs))} of {len(docs)} documents embedded', end = '\r')
+
+    sorted_embeddings = np.concatenate(batch_embeddings)    # type: ignore - all batches are embedded at this point
+    embeddings = np.empty_like(sorted_embeddings)
+    embeddings[order] = sorted_embeddings
+
+    seconds = max(time.time() - start_time, 1e-6)
+    logger.info(f"Embedded {len(docs)} documents in {seconds:.1f} seconds ({len(docs) / seconds:.1f} docs/sec, "
+                f"{n_processes} processes, {n_threads or 'default'} threads)")
+
+    return embeddings
+
+
+def get_cached_embeddings(docs: List[str],
+                          biblio_project_dir: str,
+                          ids: Optional[List] = None,
+                          embedding_model: str = default_embedding_model,
+                          batch_size: int = 32,
+                          n_processes: int = 1,
+                          n_threads: Optional[int] = None,
+                          verbose: bool = False
+                          ) -> np.ndarray:
+    """
+    Returns the embeddings of `docs`, embedding only the documents that are not in the 
+    embedding store of the bibliometric project yet.
+
+    The documents are looked up by the hash of their text. The embeddings of new or 
+    changed documents are added to the store.
+
+    Args:
+        docs: 
+            The texts to embed.
+        biblio_project_dir: 
+            The name of the bibliometric project directory.
+        ids: 
+            The record ids of the documents, stored in the index for reference (optional).
+        embedding_model: 
+            The name of the sentence transformer model.
+        batch_size: 
+            The number of documents per model call.
+        n_processes, n_threads: 
+            The number of worker processes and torch threads per process (see `embed_documents`).
+        verbose: 
+            Whether to print the progress.
+
+    Returns:
+        A float32 array with one row per document in `docs`.
+    """
+
+    if ids is not None and len(ids) != len(docs):
+        raise ValueError(f"The number of ids ({len(ids)}) and documents ({len(docs)}) is different")
+
+    store_dir = get_embedding_store_dir(biblio_project_dir, embedding_model)
+    index_df, stored_embeddings = read_embedding_store(store_dir)
+
+    text_hashes = pd.Index(hash_texts(docs))
+    rows = pd.Index(index_df['text_hash']).get_indexer(text_hashes)
+
+    # Embed the documents that are not in the store (each distinct text only once)
+    missing = np.flatnonzero(rows < 0)
+    _, first_missing = np.unique(text_hashes[missing], return_index = True)
+    new_docs = missing[np.sort(first_missing)]
+
+    logger.info(f"Embeddings: {len(docs) - len(missing)} documents cached, {len(new_docs)} to embed")
+
+    if len(new_docs) > 0:
+        new_embeddings = embed_documents([docs[i] for i in new_docs], 
+                                         embedding_model = embedding_model, 
+                                         batch_size = batch_size,
+                                         n_processes = n_processes,
+                                         n_threads = n_threads,
+                                         verbose = verbose)
+
+        new_index_df = pd.DataFrame({'text_hash': text_hashes[new_docs],
+                                     'id': [str(ids[i]) for i in new_docs] if ids is not None else ''})
+
+        # Release the memory map of the store, so that its file can be replaced
+        del stored_embeddings
+        _append_to_embedding_store(store_dir, index_df, new_index_df, new_embeddings)
+
+        index_df, stored_embeddings = read_embedding_store(store_dir)
+        rows = pd.Index(index_df['text_hash']).get_indexer(text_hashes)
+
+    if stored_embeddings is None:
+        return np.empty((0, 0), dtype = np.float32)
+
+    return np.asarray(stored_embeddings[rows])
@@ -1,8 +1,44 @@
 import pandas as pd
+import numpy as np
 import re
+import tokenize
+
+from abc import ABC, abstractmethod
+from typing import List, Dict, Tuple, Union, Optional
 
 from config import *
 from utilities import *
+from text_index import TextIndex, build_text_index
+
+
+# Query plans of compile_query, keyed by the query string. Only the query_plan_cache_size most 
+# recently used plans are kept, query_plan_cache.clear() frees them all.
+query_plan_cache: Dict[str, 'QueryPlan'] = {}
+query_plan_cache_size = 256
+
+
+def _split_query_parts(query_str: str) -> List[str]:
+    """
+    Validate the `in*` operations of a query string and split it into parts at the 
+    characters ()|&~.
+    """
+
+    # Define the characters to split query string
+    split_at = r"()|&~"
+    split_at_escaped = re.escape(split_at)
+
+    if re.search(r'\[[^\]]*~[^\]]*\]', query_str):
+        raise ValueError(f"The not operator '~' is not allowed inside square brackets '[...]'")
+    
+    if re.search(r'in\*\s*~', query_str):
+        raise ValueError(f"Applying the not operator '~' on the columns is not allowed")
+    
+    # Split the query string into parts at the split_at characters
+    pattern = fr"(?=[{split_at_escaped}])|(?<=[{split_at_escaped}])"
+    query_parts = re.split(pattern, query_str)
+
+    return [item.strip() for item in query_parts if item.strip()]
+
 
 def generate_pandas_query_string(query_str: str) -> str:
     """
@@ -57,6 +93,9 @@ def generate_pandas_query_string(query_str: str) -> str:
     - Outside the `in*` binary operations, you can use the query() operators such as &, |, ~~
       in the normal way. See the last example above.
 
+    `filter_biblio_df` does not use the pandas query string anymore. It parses the same 
+    syntax with `QueryParser` and evaluates it directly to boolean masks.
+
     Args:
         query_str: Input query string to be modified.
 
@@ -68,21 +107,8 @@ def generate_pandas_query_string(query_str: str) -> str:
 
     """
 
-    # Define the characters to split query string
-    split_at = r"()|&~"
     pad = r"|&~"
-    split_at_escaped = re.escape(split_at)
-
-    if re.search(r'\[[^\]]*~[^\]]*\]', query_str):
-        raise ValueError(f"The not operator '~' is not allowed inside square brackets '[...]'")
-    
-    if re.search(r'in\*\s*~', query_str):
-        raise ValueError(f"Applying the not operator '~' on the columns is not allowed")
-    
-    # Split the query string into parts at the split_at characters
-    pattern = fr"(?=[{split_at_escaped}])|(?<=[{split_at_escaped}])"
-    query_parts = re.split(pattern, query_str)
-    query_parts = [item.strip() for item in query_parts if item.strip()]
+    query_parts = _split_query_parts(query_str)
 
     modified_query_parts = []
 
@@ -177,18 +203,646 @@ def generate_pandas_query_string(query_str: str) -> str:
     return modified_query
 
 
+def _match_values(regex: re.Pattern, col_se: pd.Series, row_idx: np.ndarray) -> np.ndarray:
+    """
+    Returns a boolean array that is True where `regex` is found in the rows `row_idx` 
+    of `col_se`. Missing values do not match, and non-string values are converted to 
+    strings.
+    """
+
+    values_se = col_se if len(row_idx) == len(col_se) else col_se.iloc[row_idx]
+
+    # Arrow-backed strings are matched with Arrow's regex engine where pandas supports the regex
+    if getattr(values_se.dtype, 'storage', None) == 'pyarrow':
+        return values_se.str.contains(regex.pattern, case = False, regex = True, na = False).to_numpy(dtype = bool)
+
+    values = values_se.to_numpy(dtype = object)
+    matches = np.zeros(len(values), dtype = bool)
+    not_na_idx = np.flatnonzero(~pd.isna(values))
+    search = regex.search
+
+    matches[not_na_idx] = [search(value if isinstance(value, str) else str(value)) is not None 
+                           for value in values[not_na_idx]]
+
+    return matches
+
+
+class QueryNode(ABC):
+    """
+    A node of the syntax tree of a filter query.
+
+    `evaluate` returns the boolean mask of the rows that match the node. Only the rows 
+    in `active` are evaluated and the mask is False for all the other rows, which lets 
+    `AndNode` and `OrNode` skip the rows whose result is already known. The optional 
+    `text_index` of biblio_df is used by `InNode` to resolve the search strings.
+    """
+
+    @abstractmethod
+    def evaluate(self, biblio_df: pd.DataFrame, active: np.ndarray, text_index: Optional[TextIndex] = None) -> np.ndarray:
+        pass
+
+
+class AndNode(QueryNode):
+
+    def __init__(self, children: List[QueryNode]):
+        self.children = children
+
+    def evaluate(self, biblio_df: pd.DataFrame, active: np.ndarray, text_index: Optional[TextIndex] = None) -> np.ndarray:
+        mask = active.copy()
+
+        for child in self.children:
+            # Only the rows that match all the previous children are evaluated
+            if not mask.any():
+                break
+            mask &= child.evaluate(biblio_df, mask, text_index)
+
+        return mask
+
+
+class OrNode(QueryNode):
+
+    def __init__(self, children: List[QueryNode]):
+        self.children = children
+
+    def evaluate(self, biblio_df: pd.DataFrame, active: np.ndarray, text_index: Optional[TextIndex] = None) -> np.ndarray:
+        mask = np.zeros(len(active), dtype = bool)
+
+        for child in self.children:
+            # Only the rows that do not match any of the previous children are evaluated
+            remaining = active & ~mask
+            if not remaining.any():
+                break
+            mask |= child.evaluate(biblio_df, remaining, text_index)
+
+        return mask
+
+
+class NotNode(QueryNode):
+
+    def __init__(self, child: QueryNode):
+        self.child = child
+
+    def evaluate(self, biblio_df: pd.DataFrame, active: np.ndarray, text_index: Optional[TextIndex] = None) -> np.ndarray:
+        return active & ~self.child.evaluate(biblio_df, active, text_index)
+
+
+class ExprNode(QueryNode):
+    """
+    A pandas expression, such as `year == 2014`, evaluated with `DataFrame.eval`.
+    """
+
+    def __init__(self, expr: str):
+        self.expr = expr
+
+    def evaluate(self, biblio_df: pd.DataFrame, active: np.ndarray, text_index: Optional[TextIndex] = None) -> np.ndarray:
+        try:
+            mask = biblio_df.eval(self.expr)
+        except (SyntaxError, tokenize.TokenError, ValueError, KeyError, TypeError, pd.errors.UndefinedVariableError) as e:
+            raise ValueError(f"Invalid query string '{self.expr}'") from e
+
+        return active & np.asarray(mask, dtype = bool)
+
+
+class InNode(QueryNode):
+    """
+    A `STRINGS in* COLUMNS` operation.
+
+    Each search string is compiled into its own regular expression. For *all* matches 
+    (double square brackets), the masks of the search strings are intersected, and each 
+    search string is only matched against the rows that matched the previous ones. For 
+    *any* matches, the search strings are combined into a single regular expression.
+
+    If a text index of the column is provided, the search strings are resolved against 
+    the index (see `text_index.py`), and the column is only scanned for the search strings 
+    that the index cannot resolve.
+    """
+
+    def __init__(self, search_strs: List[str], whole_words: List[bool], cols: List[str], match_all: bool):
+        self.search_strs = search_strs
+        self.whole_words = whole_words
+        self.cols = cols
+        self.match_all = match_all
+
+        regex_strs = [fr"\b{search_str}\b" if whole_word else search_str 
+                      for search_str, whole_word in zip(search_strs, whole_words)]
+        self.search_regexes = [re.compile(regex_str, re.IGNORECASE) for regex_str in regex_strs]
+
+        if match_all:
+            self.regexes = self.search_regexes
+        else:
+            self.regexes = [re.compile('|'.join(regex_strs), re.IGNORECASE)]
+
+    def evaluate(self, biblio_df: pd.DataFrame, active: np.ndarray, text_index: Optional[TextIndex] = None) -> np.ndarray:
+        mask = np.zeros(len(active), dtype = bool)
+
+        for col in self.cols:
+            if col not in biblio_df.columns:
+                raise ValueError(f"{col} is not a column in biblio_df")
+
+            col_se = biblio_df[col]
+
+            # The rows that have not matched in the previous columns
+            remaining = active & ~mask
+
+            if text_index is not None:
+                col_mask = self._evaluate_with_index(col, col_se, remaining, text_index)
+
+                if col_mask is not None:
+                    mask |= col_mask
+                    continue
+
+            row_idx = np.flatnonzero(remaining)
+
+            for regex in self.regexes:
+                if len(row_idx) == 0:
+                    break
+                row_idx = row_idx[_match_values(regex, col_se, row_idx)]
+
+            mask[row_idx] = True
+
+        return mask
+
+    def _evaluate_with_index(self, 
+                             col: str, 
+                             col_se: pd.Series, 
+                             active: np.ndarray, 
+                             text_index: TextIndex
+                             ) -> Optional[np.ndarray]:
+        """
+        Returns the mask of the active rows that match in `col`, or None if the index 
+        cannot resolve all the search strings.
+        """
+
+        lookups = [text_index.lookup(col, search_str, whole_word) 
+                   for search_str, whole_word in zip(self.search_strs, self.whole_words)]
+
+        if any(lookup is None for lookup in lookups):
+            return None
+
+        mask = np.zeros(len(active), dtype = bool) if not self.match_all else active.copy()
+
+        for (rows, exact), regex in zip(lookups, self.search_regexes):
+            search_mask = np.zeros(len(active), dtype = bool)
+            search_mask[rows] = True
+            search_mask &= (mask if self.match_all else active & ~mask)
+
+            # Check the candidates of search strings with several words with the regex
+            if not exact:
+                row_idx = np.flatnonzero(search_mask)
+                search_mask[row_idx] = _match_values(regex, col_se, row_idx)
+
+            if self.match_all:
+                mask = search_mask
+            else:
+                mask |= search_mask
+
+        return mask
+
+
+class QueryParser:
+    """
+    A recursive descent parser for filter queries (see `generate_pandas_query_string` 
+    for the syntax). The grammar is:
+
+        or_expr   := and_expr ('|' and_expr)*
+        and_expr  := unary ('&' unary)*
+        unary     := '~' unary | '(' or_expr ')' | operation
+        operation := STRINGS 'in*' COLUMNS | pandas expression
+
+    An operation extends to the next `&`, `|` or unmatched `)` outside quotes and 
+    brackets. It is an `in*` operation if it contains `in*`, and a pandas expression 
+    otherwise.
+    """
+
+    def __init__(self, query_str: str):
+        self.query_str = query_str
+        self.pos = 0
+
+    def parse(self) -> QueryNode:
+        node = self._parse_or()
+        self._skip_spaces()
+
+        if self.pos < len(self.query_str):
+            raise ValueError(f"Invalid query string: unexpected '{self.query_str[self.pos]}' at position {self.pos}")
+
+        return node
+
+    def _skip_spaces(self) -> None:
+        while self.pos < len(self.query_str) and self.query_str[self.pos].isspace():
+            self.pos += 1
+
+    def _peek(self) -> str:
+        self._skip_spaces()
+        return self.query_str[self.pos] if self.pos < len(self.query_str) else ''
+
+    def _parse_or(self) -> QueryNode:
+        children = [self._parse_and()]
+
+        while self._peek() == '|':
+            self.pos += 1
+            children.append(self._parse_and())
+
+        return children[0] if len(children) == 1 else OrNode(children)
+
+    def _parse_and(self) -> QueryNode:
+        children = [self._parse_unary()]
+
+        while self._peek() == '&':
+            self.pos += 1
+            children.append(self._parse_unary())
+
+        return children[0] if len(children) == 1 else AndNode(children)
+
+    def _parse_unary(self) -> QueryNode:
+        char = self._peek()
+
+        if char == '~':
+            self.pos += 1
+            return NotNode(self._parse_unary())
+
+        if char == '(':
+            self.pos += 1
+            node = self._parse_or()
+
+            if self._peek() != ')':
+                raise ValueError(f"Invalid query string: missing ')' in '{self.query_str}'")
+
+            self.pos += 1
+            return node
+
+        return self._parse_operation()
+
+    def _parse_operation(self) -> QueryNode:
+        start = self.pos
+        end = _find_top_level(self.query_str, '&|)', start)
+        self.pos = end
+
+        operation_str = self.query_str[start:end].strip()
+
+        if not operation_str:
+            raise ValueError(f"Invalid query string: missing operand at position {start} in '{self.query_str}'")
+
+        in_pos = _find_top_level(operation_str, 'in*', 0)
+
+        if in_pos == len(operation_str):
+            return ExprNode(operation_str)
+
+        return _parse_in_operation(operation_str[:in_pos].strip(), operation_str[in_pos + 3:].strip())
+
+
+def _find_top_level(text: str, stop: str, start: int) -> int:
+    """
+    Returns the position of the first `stop` (any of its characters, or the string 
+    'in*') in `text` from `start` that is outside quotes, brackets and parentheses, or 
+    the length of `text`.
+    """
+
+    depth = 0
+    pos = start
+
+    while pos < len(text):
+        char = text[pos]
+
+        if char in '\'"':
+            # Skip quoted strings
+            close_pos = text.find(char, pos + 1)
+            pos = close_pos + 1 if close_pos >= 0 else pos + 1
+            continue
+
+        if depth == 0:
+            if stop == 'in*' and text.startswith('in*', pos):
+                return pos
+            if stop != 'in*' and char in stop:
+                return pos
+
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+
+        pos += 1
+
+    return len(text)
+
+
+def _split_top_level(text: str) -> List[str]:
+    """
+    Split `text` at the commas outside quotes.
+    """
+
+    parts = []
+    start = 0
+
+    while True:
+        comma_pos = _find_top_level(text, ',', start)
+        parts.append(text[start:comma_pos].strip())
+
+        if comma_pos == len(text):
+            return parts
+
+        start = comma_pos + 1
+
+
+def _parse_in_operation(search_str: str, col_str: str) -> InNode:
+    """
+    Parse the search strings and the columns of an `in*` operation.
+    """
+
+    if not search_str or not col_str:
+        raise ValueError(f"Invalid query string: '{search_str} in* {col_str}'")
+
+    if col_str.startswith('~'):
+        raise ValueError(f"Applying the not operator '~' on the columns is not allowed")
+
+    if col_str.startswith('[['):
+        raise ValueError(f"Double brackets '[[...]]' are not allowed for the columns")
+
+    if col_str.startswith('[') and col_str.endswith(']'):
+        cols = [col.strip() for col in col_str[1:-1].split(',')]
+    else:
+        cols = [col_str]
+
+    # Single brackets for any matches, double brackets for all matches
+    match_all = search_str.startswith('[[') and search_str.endswith(']]')
+
+    if match_all:
+        search_strs = _split_top_level(search_str[2:-2])
+    elif search_str.startswith('[') and search_str.endswith(']'):
+        search_strs = _split_top_level(search_str[1:-1])
+    else:
+        search_strs = [search_str]
+
+    if any(string.startswith('~') for string in search_strs):
+        raise ValueError(f"The not operator '~' is not allowed inside square brackets '[...]'")
+
+    # Quotes enforce a whole word match
+    whole_words = [bool(re.match(r"^(['\"]).*\1$", string)) for string in search_strs]
+    search_strs = [string[1:-1] if whole_word else string for string, whole_word in zip(search_strs, whole_words)]
+
+    return InNode(search_strs, whole_words, cols, match_all)
+
+
+class QueryPlan:
+    """
+    A filter query compiled into a syntax tree with precompiled regular expressions.
+
+    The plan is created once per query string by `compile_query` and can be evaluated 
+    on any number of DataFrames without parsing the query or compiling the regular 
+    expressions again. The query is evaluated directly to NumPy boolean masks.
+    """
+
+    def __init__(self, query_str: str):
+        self.query_str = query_str
+        self.root = QueryParser(query_str).parse()
+
+    def evaluate(self, biblio_df: pd.DataFrame, text_index: Optional[TextIndex] = None) -> np.ndarray:
+        """
+        Returns the boolean mask of the rows of `biblio_df` that match the query.
+
+        Args:
+            biblio_df: 
+                The DataFrame to filter.
+            text_index: 
+                Optional text index of biblio_df from `text_index.get_text_index`.
+
+        Raises:
+            ValueError: If the query is not valid for `biblio_df`.
+        """
+
+        text_index = _check_text_index(biblio_df, text_index)
+
+        return self.root.evaluate(biblio_df, np.ones(len(biblio_df), dtype = bool), text_index)
+
+
+def _iter_in_nodes(node: QueryNode) -> List[InNode]:
+    """
+    Returns the `in*` operations of a syntax tree.
+    """
+
+    if isinstance(node, InNode):
+        return [node]
+
+    children = node.children if isinstance(node, (AndNode, OrNode)) else [node.child] if isinstance(node, NotNode) else []
+
+    return [in_node for child in children for in_node in _iter_in_nodes(child)]
+
+
+def _check_text_index(biblio_df: pd.DataFrame, text_index: Optional[TextIndex]) -> Optional[TextIndex]:
+    """
+    Returns `text_index` if it was built on the current values of biblio_df. Otherwise 
+    the columns are scanned, as the index would return the rows of other texts.
+    """
+
+    if text_index is not None and not text_index.is_index_of(biblio_df):
+        logger.info("The text index was not built on biblio_df and is not used, build it again with get_text_index")
+        return None
+
+    return text_index
+
+
+class MatchMatrix(TextIndex):
+    """
+    The matches of all the search strings of several queries in biblio_df.
+
+    The distinct search strings of each column are matched together. Without a text 
+    index, a column with at least `min_index_searches` distinct search strings is 
+    tokenised once into a temporary text index (see `text_index.py`), which resolves 
+    all the whole-word and partial-word search strings. By default, this is 10 search 
+    strings for object columns and 100 for Arrow-backed string columns, which pandas 
+    scans much faster. The other search strings 
+    (regexes, or all of them in a column with few search strings) are matched with a 
+    single regex that combines them, which finds the rows with any match in one scan of 
+    the column, and each search string is then only checked on these rows. The queries 
+    are then evaluated on the matches, by passing the match matrix as their text index.
+    """
+
+    def __init__(self, 
+                 biblio_df: pd.DataFrame, 
+                 in_nodes: List[InNode], 
+                 text_index: Optional[TextIndex] = None,
+                 min_index_searches: Optional[int] = None):
+        super().__init__({}, len(biblio_df))
+        self.matches: Dict[Tuple[str, str, bool], np.ndarray] = {}
+
+        text_index = _check_text_index(biblio_df, text_index)
+
+        # The distinct search strings of each column
+        col_searches: Dict[str, Dict[Tuple[str, bool], re.Pattern]] = {}
+
+        for in_node in in_nodes:
+            for col in in_node.cols:
+                for search_str, whole_word, regex in zip(in_node.search_strs, in_node.whole_words, in_node.search_regexes):
+                    col_searches.setdefault(col, {})[(search_str, whole_word)] = regex
+
+        if any(col not in biblio_df.columns for col in col_searches):
+            raise ValueError(f"Some columns in {list(col_searches)} are not in biblio_df")
+
+        # Index the columns with many search strings that are not in the text index
+        index_cols = []
+
+        for col, searches in col_searches.items():
+            if text_index is not None and col in text_index.col_indexes:
+                continue
+
+            if min_index_searches is not None:
+                col_min_searches = min_index_searches
+            else:
+                col_min_searches = 100 if getattr(biblio_df[col].dtype, 'storage', None) == 'pyarrow' else 10
+
+            if len(searches) >= col_min_searches:
+                index_cols.append(col)
+
+        if index_cols:
+            batch_index = build_text_index(biblio_df, index_cols)
+
+            if text_index is not None:
+                batch_index.col_indexes.update(text_index.col_indexes)
+
+            text_index = batch_index
+
+        for col, searches in col_searches.items():
+            col_se = biblio_df[col]
+            scan_searches = {}
+
+            for (search_str, whole_word), regex in searches.items():
+                lookup = text_index.lookup(col, search_str, whole_word) if text_index is not None else None
+
+                if lookup is None:
+                    scan_searches[(search_str, whole_word)] = regex
+                    continue
+
+                rows, exact = lookup
+                rows = np.unique(rows)
+                self.matches[(col, search_str, whole_word)] = rows if exact else rows[_match_values(regex, col_se, rows)]
+
+            if not scan_searches:
+                continue
+
+            # Scan the column once for the rows that match any of the search strings
+            row_idx = np.arange(len(biblio_df))
+
+            if len(scan_searches) > 1:
+                any_regex = re.compile('|'.join(f'(?:{regex.pattern})' for regex in scan_searches.values()), re.IGNORECASE)
+                row_idx = row_idx[_match_values(any_regex, col_se, row_idx)]
+
+            for (search_str, whole_word), regex in scan_searches.items():
+                self.matches[(col, search_str, whole_word)] = row_idx[_match_values(regex, col_se, row_idx)]
+
+    def is_index_of(self, biblio_df: pd.DataFrame) -> bool:
+        # The match matrix is only evaluated on the DataFrame it was created for
+        return self.n_rows == len(biblio_df)
+
+    def lookup(self, col: str, search_str: str, whole_word: bool) -> Optional[Tuple[np.ndarray, bool]]:
+        rows = self.matches.get((col, search_str, whole_word))
+
+        return None if rows is None else (rows, True)
+
+
+def compile_query(query_str: str) -> QueryPlan:
+    """
+    Compile a filter query (see `generate_pandas_query_string` for the syntax) into a 
+    `QueryPlan`. The plans are cached by the query string in `query_plan_cache` (up to 
+    `query_plan_cache_size` plans).
+
+    Raises:
+        ValueError: If the query string is not valid.
+    """
+
+    if query_str in query_plan_cache:
+        query_plan = query_plan_cache.pop(query_str)
+    else:
+        query_plan = QueryPlan(query_str)
+
+    # Keep the most recently used plans
+    while query_plan_cache and len(query_plan_cache) >= query_plan_cache_size:
+        query_plan_cache.pop(next(iter(query_plan_cache)))
+
+    query_plan_cache[query_str] = query_plan
+
+    return query_plan
+
+
+class FilterResult:
+    """
+    The rows of biblio_df that match a filter query, as a boolean mask.
+
+    The result refers to biblio_df without copying it. The filtered DataFrame is only 
+    created by `to_df`, so the matches can be counted, combined or used as labels 
+    without materialising the selected rows.
+    """
+
+    def __init__(self, biblio_df: pd.DataFrame, mask: np.ndarray):
+        self.biblio_df = biblio_df
+        self.mask = mask
+
+    def __len__(self) -> int:
+        return int(self.mask.sum())
+
+    @property
+    def positions(self) -> np.ndarray:
+        """
+        The row positions of the matches in biblio_df.
+        """
+
+        return np.flatnonzero(self.mask)
+
+    @property
+    def index(self) -> pd.Index:
+        """
+        The index labels of the matches in biblio_df.
+        """
+
+        return self.biblio_df.index[self.mask]
+
+    def to_df(self, cols: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Returns the filtered DataFrame, optionally only with the columns `cols`.
+        """
+
+        biblio_df = self.biblio_df if cols is None else self.biblio_df[cols]
+
+        return biblio_df[self.mask]
+
+
+def select_biblio_rows(biblio_df: pd.DataFrame, 
+                       query_str: Union[str, QueryPlan],
+                       text_index: Optional[TextIndex] = None
+                       ) -> FilterResult:
+    """
+    Returns the rows of biblio_df that match a query string, without copying biblio_df.
+    See `filter_biblio_df` for the parameters.
+
+    Raises:
+        ValueError: If the query string is not valid, or if any of the column names
+        referred to in the query string do not exist in the DataFrame.
+    """
+
+    # Compile the query or get the plan from the cache
+    query_plan = query_str if isinstance(query_str, QueryPlan) else compile_query(query_str)
+
+    return FilterResult(biblio_df, query_plan.evaluate(biblio_df, text_index))
+
+
 def filter_biblio_df(biblio_df_: pd.DataFrame, 
-                     query_str: str
+                     query_str: Union[str, QueryPlan],
+                     text_index: Optional[TextIndex] = None
                      ) -> pd.DataFrame:
     """
     Filter biblio_df using a query string.
 
+    Only the matching rows are copied into the filtered DataFrame. To get the matches 
+    as a boolean mask or as row positions instead, use `select_biblio_rows`.
+
     Parameters:
 
     biblio_df (pd.DataFrame): 
         The DataFrame to filter.
-    query_str (str): 
-        The query string to use for filtering.
+    query_str (Union[str, QueryPlan]): 
+        The query string to use for filtering, or a query plan from `compile_query`.
+    text_index (Optional[TextIndex]):
+        The text index of biblio_df from `text_index.get_text_index` (default: None). 
+        With an index, whole-word and partial-word searches do not scan the texts. An 
+        index that was not built on the current values of biblio_df is not used.
 
     Raises:
         ValueError: If the query string is not valid, or if any of the column names
@@ -200,16 +854,68 @@ def filter_biblio_df(biblio_df_: pd.DataFrame,
         The filtered DataFrame.
     """
 
-    biblio_df = biblio_df_.copy()
+    return select_biblio_rows(biblio_df_, query_str, text_index).to_df()
+
+
+def filter_biblio_df_batch(biblio_df_: pd.DataFrame,
+                           queries: Dict[str, Union[str, QueryPlan]],
+                           output: str = 'frames',
+                           text_index: Optional[TextIndex] = None,
+                           min_index_searches: Optional[int] = None
+                           ) -> Union[Dict[str, pd.DataFrame], Dict[str, FilterResult], pd.DataFrame]:
+    """
+    Filter biblio_df with several named queries, e.g. to label the publications by topic.
+
+    The search strings of all the queries are matched together (see `MatchMatrix`), so 
+    each text column is scanned or tokenised once instead of once per query, and a search 
+    string that occurs in several queries is only matched once. The boolean logic of 
+    each query is then evaluated on the shared matches.
+
+    Parameters:
+
+    biblio_df (pd.DataFrame): 
+        The DataFrame to filter.
+    queries (Dict[str, Union[str, QueryPlan]]): 
+        The query strings or query plans by name.
+    output (str):
+        'frames' for the filtered DataFrames, 'results' for the matches as `FilterResult`s 
+        (the DataFrames are only created on demand), or 'labels' for a boolean label 
+        matrix (default: 'frames').
+    text_index (Optional[TextIndex]):
+        The text index of biblio_df from `text_index.get_text_index` (default: None). An 
+        index that was not built on the current values of biblio_df is not used.
+    min_index_searches (Optional[int]):
+        The number of distinct search strings in a column from which the column is 
+        tokenised into a temporary text index instead of being scanned (default: None, 
+        see `MatchMatrix`).
+
+    Raises:
+        ValueError: If a query string is not valid, or `output` is not 'frames', 'results' or 'labels'.
+
+    Returns:
+
+    Union[Dict[str, pd.DataFrame], Dict[str, FilterResult], pd.DataFrame]: 
+        The filtered DataFrames or the results by query name, or a DataFrame with the index of biblio_df 
+        and one boolean column per query.
+    """
+
+    if output not in ['frames', 'results', 'labels']:
+        raise ValueError(f"The output has to be 'frames', 'results' or 'labels'")
+
+    query_plans = {name: query if isinstance(query, QueryPlan) else compile_query(query) 
+                   for name, query in queries.items()}
+
+    in_nodes = [in_node for query_plan in query_plans.values() for in_node in _iter_in_nodes(query_plan.root)]
+    match_matrix = MatchMatrix(biblio_df_, in_nodes, text_index, min_index_searches)
+
+    masks = {name: query_plan.evaluate(biblio_df_, match_matrix) for name, query_plan in query_plans.items()}
+
+    if output == 'labels':
+        return pd.DataFrame(masks, index = biblio_df_.index)
 
-    # Build pandas query string
-    filter_pandas_query = generate_pandas_query_string(query_str = query_str)
+    results = {name: FilterResult(biblio_df_, mask) for name, mask in masks.items()}
 
-    # Check that the query string is valid
-    try:
-        filtered_df = biblio_df.query(filter_pandas_query)
-    except (SyntaxError, ValueError) as e:
-        raise ValueError("Invalid query string") from e
+    if output == 'results':
+        return results
 
-    # Return the filtered DataFrame
-    return filtered_df
+    return {name: result.to_df() for name, result in results.items()}
\ No newline at end of file
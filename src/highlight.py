@@ -1,19 +1,153 @@
+"""
+Highlighting of keywords in the text columns of a bibliographic dataset.
+
+The highlights of a text are computed as spans, a list of `(start, end, colour)` tuples 
+with the positions of the highlighted words in the text (see `find_highlight_spans`). 
+The spans are rendered to HTML with `render_highlights_html` and to Excel rich text with 
+`create_rich_text`, so the Excel export does not have to parse the HTML.
+"""
+
 import pandas as pd
 import re
 import webcolors
 import logging
+import multiprocessing
 
-from typing import Union, List, Tuple, Dict, Optional, Any
+from typing import Union, List, Tuple, Dict, Optional, Any, Callable
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 from IPython.core.display import HTML
 
 # Warning: openpyxl needs lxml installed, otherwise it throws an error
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, colors, Alignment
 from openpyxl.cell.text import InlineFont
 from openpyxl.cell.rich_text import TextBlock, CellRichText
 
 from config import *
 
+
+# The highlighted words of a text as (start, end, colour), sorted by position
+HighlightSpans = List[Tuple[int, int, str]]
+
+highlight_pattern_cache: Dict[Tuple[Tuple[str, ...], bool], re.Pattern] = {}
+
+_html_span_pattern = re.compile(r'<span style="color: ([^;"]*); font-weight: bold">(.*?)</span>', re.DOTALL)
+
+
+def compile_highlight_pattern(strings: List[str], 
+                              partial: bool = True
+                              ) -> re.Pattern:
+    """
+    Compile the strings of a colour group into a single regex that matches any of them, 
+    so that a text is searched once for all the strings. The patterns are cached in 
+    `highlight_pattern_cache`.
+
+    With `partial`, the words that contain a string are highlighted. Otherwise, only the 
+    words that start with the string are highlighted. If the matches of several strings 
+    overlap, the match that starts first is highlighted.
+    """
+
+    cache_key = (tuple(strings), partial)
+
+    if cache_key not in highlight_pattern_cache:
+        if partial: # highlight partial and full matches
+            patterns = [r"\b\w*{}+\w*\b".format(k) for k in strings]
+        else:   # highlight full matches only
+            patterns = [r"\b" + k + r"[\w-]*\b" for k in strings]
+
+        alternation = '|'.join(f'(?:{pattern})' for pattern in patterns)
+        highlight_pattern_cache[cache_key] = re.compile(f'(?<!>)(?:{alternation})(?!<)', re.IGNORECASE)
+
+    return highlight_pattern_cache[cache_key]
+
+
+def find_highlight_spans(text: str,
+                         strings: Union[List[str], str],
+                         colour: str,
+                         partial: bool = True,
+                         spans: Optional[HighlightSpans] = None
+                         ) -> HighlightSpans:
+    """
+    Find the words to highlight in a text.
+
+    Args:
+        text: The text to search.
+        strings: The strings to highlight (see `compile_highlight_pattern`).
+        colour: The colour of the highlights, e.g. 'red'.
+        partial: Whether to highlight the words that contain a string, or only the words 
+            that start with it (default: True).
+        spans: The existing highlights of the text, e.g. from another colour group 
+            (default: None). They are kept, and only the text between them is searched.
+
+    Returns:
+        The existing and the new highlights, sorted by position.
+    """
+
+    spans = spans or []
+
+    if isinstance(strings, str):
+        strings = [strings]
+
+    strings = [k for k in strings if k != ""]
+
+    if len(strings) == 0:
+        return spans
+
+    pattern = compile_highlight_pattern(strings, partial)
+    new_spans = []
+    pos = 0
+
+    # Search the gaps between the existing highlights
+    for gap_end, next_pos in [(start, end) for start, end, _ in spans] + [(len(text), len(text))]:
+        new_spans.extend((match.start(), match.end(), colour) for match in pattern.finditer(text, pos, gap_end))
+        pos = next_pos
+
+    return sorted(spans + new_spans) if spans else new_spans
+
+
+def render_highlights_html(text: str, spans: HighlightSpans) -> str:
+    """
+    Returns the text with the highlights as HTML `<span>` elements.
+    """
+
+    parts = []
+    pos = 0
+
+    for start, end, colour in spans:
+        parts.append(text[pos:start])
+        parts.append(f'<span style="color: {colour}; font-weight: bold">{text[start:end]}</span>')
+        pos = end
+
+    parts.append(text[pos:])
+
+    return ''.join(parts)
+
+
+def parse_highlights_html(html: str) -> Tuple[str, HighlightSpans]:
+    """
+    Returns the text and the highlights of a text highlighted with `render_highlights_html`.
+    """
+
+    parts = []
+    spans = []
+    pos = 0
+    text_len = 0
+
+    for match in _html_span_pattern.finditer(html):
+        parts.append(html[pos:match.start()])
+        text_len += match.start() - pos
+        parts.append(match.group(2))
+        spans.append((text_len, text_len + len(match.group(2)), match.group(1)))
+        text_len += len(match.group(2))
+        pos = match.end()
+
+    parts.append(html[pos:])
+
+    return ''.join(parts), spans
+
+
 def highlight_selected_text(text: str, 
                             strings: Union[List[str], str], 
                             colour: str, 
@@ -22,29 +156,79 @@ def highlight_selected_text(text: str,
                             ) -> str:
     text = str(text)
 
-    if isinstance(strings, str):
-        strings = [strings]
-    
     if i_row and (i_row % 100 == 0) and (logger.get_level() == logging.INFO): # print row index
         print(f'{i_row}', end = '\r')
 
-    if len(strings) == 0:
-        return text
-    
-    if (len(strings) == 1) and (strings[0] == ""):
-        return text
+    # Keep the existing highlights, e.g. from another colour group
+    text, spans = parse_highlights_html(text)
 
-    for k in strings:
-        if partial: # highlight partial and full matches
-            # pattern = r"\b\w*{}+\w*\b".format(k)
-            pattern = r"(?<!>)\b\w*{}+\w*\b(?!<)".format(k)
-            text = re.sub(pattern, lambda match: f'<span style="color: {colour}; font-weight: bold">{match.group()}</span>', text, flags = re.IGNORECASE)
-        else:   # highlight full matches only
-            # pattern = r"(?i)\b"+k+r"[\w-]*"
-            pattern = r"(?i)(?<!>)\b"+k+r"[\w-]*\b(?!<)"
-            text = re.sub(pattern, lambda match: f'<span style="color: {colour}; font-weight: bold">{match.group()}</span>', text)
+    return render_highlights_html(text, find_highlight_spans(text, strings, colour, partial, spans))
+
+
+def _highlight_texts_chunk(args: Tuple[List[str], List[Tuple[Union[List[str], str], str]], bool]) -> List[HighlightSpans]:
+    texts, groups, partial = args
+    spans_lst = []
+
+    for text in texts:
+        spans = []
+
+        for strings, colour in groups:
+            spans = find_highlight_spans(text, strings, colour, partial, spans)
+
+        spans_lst.append(spans)
 
-    return text
+    return spans_lst
+
+
+def highlight_column(text_se: pd.Series,
+                     groups: List[Tuple[Union[List[str], str], str]],
+                     partial: bool = True,
+                     n_workers: int = 1,
+                     chunk_size: int = 1000,
+                     progress_callback: Optional[Callable[[int, int], None]] = None
+                     ) -> List[HighlightSpans]:
+    """
+    Find the highlights of several colour groups in a text column.
+
+    The texts are processed in chunks of `chunk_size`. With `n_workers > 1`, the chunks 
+    are highlighted in a process pool, which pays off for long texts such as abstracts.
+
+    Args:
+        text_se: The texts (other values are converted with `str`).
+        groups: The colour groups as `(strings, colour)` tuples. A group does not 
+            highlight the words that an earlier group has highlighted.
+        partial: See `find_highlight_spans` (default: True).
+        n_workers: The number of worker processes (default: 1, highlights in the current process).
+        chunk_size: The number of texts per chunk (default: 1000).
+        progress_callback: Optional function that is called with the number of texts 
+            done and the total number of texts after each chunk.
+
+    Returns:
+        The highlights of each text, in the order of `text_se`.
+    """
+
+    texts = [str(text) for text in text_se]
+    chunks = [(texts[start:start + chunk_size], groups, partial) for start in range(0, len(texts), chunk_size)]
+    spans_lst = []
+
+    # Start the workers with spawn, as forking after numba's threading layer is started (e.g. by UMAP) hangs the process
+    if n_workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers = n_workers, mp_context = multiprocessing.get_context('spawn')) as executor:
+            chunk_results = executor.map(_highlight_texts_chunk, chunks)
+
+            for chunk_spans_lst in chunk_results:
+                spans_lst += chunk_spans_lst
+
+                if progress_callback:
+                    progress_callback(len(spans_lst), len(texts))
+    else:
+        for chunk in chunks:
+            spans_lst += _highlight_texts_chunk(chunk)
+
+            if progress_callback:
+                progress_callback(len(spans_lst), len(texts))
+
+    return spans_lst
 
 
 def colour_name_to_hex(colour_name):
@@ -70,163 +254,262 @@ def get_excel_column(number):
     return column
 
 
-def excel_highlights_builder(biblio_highlights_df: pd.DataFrame,
-                             excel_params: Optional[Any]) -> Workbook:
+def get_highlight_font(colour: str) -> InlineFont:
+    """
+    Returns the bold Excel font of a highlight colour.
+    """
 
-    # FIXME: This needs the lxml package installed for Workbook.save to work. Add that to the requirements.txt
+    return InlineFont(b = True, color = '00' + colour_name_to_hex(colour_name = colour)[1:])
+
+
+def create_rich_text(text: str, 
+                     spans: HighlightSpans, 
+                     fonts: Dict[str, InlineFont]
+                     ) -> CellRichText:
+    """
+    Returns the text with the highlights as Excel rich text, using the `fonts` of the 
+    highlight colours from `get_highlight_font`.
+    """
+
+    blocks = []
+    pos = 0
+
+    for start, end, colour in spans:
+        if start > pos:
+            blocks.append(text[pos:start])
+
+        blocks.append(TextBlock(fonts[colour], text[start:end]))  # type: ignore (the Pylance issue is caused by the TextBlock constructor typing)
+        pos = end
+
+    if pos < len(text):
+        blocks.append(text[pos:])
+
+    return CellRichText(blocks)
+
+
+class ExcelColumnSpec:
+    """
+    The header, width and alignment of a column of the highlights Excel sheet. The width 
+    and alignment are None for the columns that are not formatted in `excel_params`.
+    """
+
+    def __init__(self, 
+                 col: str, 
+                 header: str, 
+                 width: Optional[float] = None, 
+                 alignment: Optional[Alignment] = None):
+        self.col = col
+        self.header = header
+        self.width = width
+        self.alignment = alignment
+
+
+class HighlightFonts(dict):
+    """
+    The Excel fonts of the highlight colours, created on first use with `get_highlight_font`.
+    """
+
+    def __missing__(self, colour: str) -> InlineFont:
+        self[colour] = get_highlight_font(colour)
+        return self[colour]
+
+
+class ExcelExportSpec:
+    """
+    The layout of the highlights Excel sheet, compiled once from `excel_params`.
+
+    The spec can be passed instead of `excel_params` to `highlight_keywords` and 
+    `excel_highlights_builder` and reused across exports. It caches the column layout for 
+    each set of columns and the font of each highlight colour, so that writing a cell 
+    only converts its value.
 
-    excel_sheet_name = 'Highlights' # default name for the new Excel sheet with the highlights
-    excel_zoom = 100    # default zoom of the sheet
-    excel_freeze_panes = None   # default freeze for horizontal panes
-    excel_cols = None
-    excel_highlighted_cols = None
+    The items of `excel_params` are:
+        cols: The formatted columns, in the order of the sheet, as a list of dictionaries 
+            with the keys 'col', 'heading', 'width' (default: 15) and 'wrap' (default: False). 
+            The other columns are added after them as-is.
+        sheet_name: The name of the sheet (default: 'Highlights').
+        zoom: The zoom of the sheet (default: 100).
+        freeze_panes: The top-left cell of the scrollable pane, e.g. 'A2' (default: None).
+        write_only: Whether to stream the rows to a temporary file, in which case the 
+            workbook can only be saved once (default: True).
+        highlighted_cols: The columns with HTML highlights, for `excel_highlights_builder` 
+            without highlight spans (default: None).
+
+    Raises:
+        ValueError: If `excel_params` is not a dictionary, or its item 'cols' is not a list.
+    """
 
     default_width = 15
     default_wrap = False
 
-    # Unpack the parameters
-    if isinstance(excel_params, Dict):
-        excel_cols = excel_params.get('cols', None)
-        excel_sheet_name = excel_params.get('sheet_name', None)
-        excel_zoom = excel_params.get('zoom', excel_zoom)
-        excel_freeze_panes = excel_params.get('freeze_panes', excel_freeze_panes)
-        excel_highlighted_cols = excel_params.get('highlighted_cols', None)
-    elif excel_params != None:
-        raise ValueError(f"The function argument excel_params has to be a dictionary")
-    
-    formatted_cols = []
-    remaining_cols = []
-
-    # Get the columns to be added first (the remaining columns are added as-is to the Excel sheet)
-    if isinstance(excel_cols, List):
-        formatted_cols = [d['col'] for d in excel_cols if d['col'] in biblio_highlights_df.columns]
-        remaining_cols = [col for col in biblio_highlights_df.columns if col not in formatted_cols]
-    elif excel_cols == None:  # if no columns have been provided in excel_params, use all columns from biblio_highlights_df
-        remaining_cols = biblio_highlights_df.columns
-    else:
-        raise ValueError(f"The item 'excel_cols' in the dictionary has to be a list")
+    def __init__(self, excel_params: Optional[Dict[str, Any]] = None):
+        self.sheet_name = 'Highlights'  # default name for the new Excel sheet with the highlights
+        self.zoom = 100     # default zoom of the sheet
+        self.freeze_panes = None    # default freeze for horizontal panes
+        self.write_only = True
+        self.highlighted_cols = None
+        excel_cols = None
 
-    # Reorder the columns in biblio_highlights_df
-    reorder_cols = formatted_cols + remaining_cols
-    biblio_highlights_df = biblio_highlights_df[reorder_cols]
+        # Unpack the parameters
+        if isinstance(excel_params, Dict):
+            excel_cols = excel_params.get('cols', None)
+            self.sheet_name = excel_params.get('sheet_name', self.sheet_name)
+            self.zoom = excel_params.get('zoom', self.zoom)
+            self.freeze_panes = excel_params.get('freeze_panes', self.freeze_panes)
+            self.write_only = excel_params.get('write_only', self.write_only)
+            self.highlighted_cols = excel_params.get('highlighted_cols', None)
+        elif excel_params != None:
+            raise ValueError(f"The function argument excel_params has to be a dictionary")
 
-    # Create a new workbook
-    wb = Workbook()
+        if excel_cols is not None and not isinstance(excel_cols, List):
+            raise ValueError(f"The item 'excel_cols' in the dictionary has to be a list")
 
-    # Create a new sheet
-    ws = wb.create_sheet(excel_sheet_name)
+        # The formats of the formatted columns by column name, in the order of the sheet
+        self.col_formats: Dict[str, Dict[str, Any]] = {}
 
-    # Remove the default sheet
-    if wb["Sheet"]:
-        wb.remove(wb["Sheet"])
+        for col_info in excel_cols or []:
+            self.col_formats.setdefault(col_info['col'], col_info)
 
-    # Make a copy of titles_highlights_df
-    tak_excel_df = biblio_highlights_df.copy()
+        self.header_font = Font(bold = True)
+        self.fonts = HighlightFonts()
+        self._columns_cache: Dict[Tuple[str, ...], List[ExcelColumnSpec]] = {}
 
-    # Excel column headers
-    for j, col in enumerate(formatted_cols):
-        # header = str(tak_excel_df.columns[j])
-        header = col
+    def get_columns(self, cols: List[str]) -> List[ExcelColumnSpec]:
+        """
+        Returns the columns of the sheet for a DataFrame with the columns `cols`: the 
+        formatted columns in the order of `excel_params`, followed by the other columns.
+        """
 
-        if excel_cols is not None:
-            header = next((col_info.get('heading', col) for col_info in excel_cols if col_info['col'] == col), col)
+        cache_key = tuple(cols)
 
-        ws.cell(row = 1, column = j + 1, value = header).font = Font(bold = True)
+        if cache_key not in self._columns_cache:
+            formatted_cols = [ExcelColumnSpec(col = col, 
+                                              header = col_info.get('heading', col),
+                                              width = col_info.get('width', self.default_width),
+                                              alignment = Alignment(wrap_text = col_info.get('wrap', self.default_wrap)))
+                              for col, col_info in self.col_formats.items() if col in cols]
+            remaining_cols = [ExcelColumnSpec(col = col, header = col) for col in cols if col not in self.col_formats]
 
-    cursor = len(formatted_cols)
+            self._columns_cache[cache_key] = formatted_cols + remaining_cols
 
-    for j, col in enumerate(remaining_cols):
-        header = col
+        return self._columns_cache[cache_key]
 
-        if excel_cols is not None:
-            header = next((col_info.get('heading', col) for col_info in excel_cols if col_info['col'] == col), col)
 
-        ws.cell(row = 1, column = j + cursor + 1, value = header).font = Font(bold = True)
+def excel_highlights_builder(biblio_highlights_df: pd.DataFrame,
+                             excel_params: Optional[Union[Dict[str, Any], ExcelExportSpec]],
+                             highlight_spans: Optional[Dict[str, List[HighlightSpans]]] = None
+                             ) -> Workbook:
+    """
+    Build an Excel workbook with the highlighted texts as rich text.
+
+    The highlights are passed as `highlight_spans`, the spans of each row of the highlighted 
+    columns (see `highlight_keywords`). Without `highlight_spans`, the columns listed in the 
+    item 'highlighted_cols' of `excel_params` are expected to contain HTML highlights, 
+    which are parsed.
+
+    The layout of the sheet is given by `excel_params` or by a compiled `ExcelExportSpec`. 
+    By default, the workbook is created in write-only mode: the rows are streamed to a 
+    temporary file instead of being kept as cells in memory, and the workbook can only be 
+    saved once. Set the item 'write_only' of `excel_params` to False for a workbook that 
+    can be edited.
+    """
 
-    # Apply findall() to split a string at '<span.../span>'
-    def split_string_at_span(string):
-        lst = re.findall(r"(.*?)(<span.*?/span>|$)", string)
-        lst = [elem for tup in lst for elem in tup]
-        lst = [x for x in lst if x.strip()]
-        return lst
+    # FIXME: This needs the lxml package installed for Workbook.save to work. Add that to the requirements.txt
 
-    def replace_span_with_textblock(lst: List[str]) -> List[str]:
-        is_prev_kw = False  # need to add a space between two consecutive keywords
-        rich_text_lst = []
+    spec = excel_params if isinstance(excel_params, ExcelExportSpec) else ExcelExportSpec(excel_params)
+    columns = spec.get_columns(list(biblio_highlights_df.columns))
 
-        for string in lst:
-            if string.startswith('<span'):
-                colour_name = re.findall(r'color: (\w+)', string)[0] if re.findall(r'color: (\w+)', string) else None
-                colour_hex = '00' + colour_name_to_hex(colour_name = colour_name)[1:]
-                # span_string = '<span style="color: {}; font-weight: bold">'.format(colour_name)
-                text = (' ' if is_prev_kw else '') + string.split('>')[1].split('<')[0]
-                text_block = TextBlock(InlineFont(b = True, color = colour_hex), text)  # type: ignore (the Pylance issue is caused by the TextBlock constructor typing)
-                rich_text_lst.append(text_block)
-                is_prev_kw = True
-            else:
-                rich_text_lst.append(string)
-                is_prev_kw = False
+    # Reorder the columns in biblio_highlights_df
+    tak_excel_df = biblio_highlights_df[[column.col for column in columns]]
 
-        return rich_text_lst
+    # Create a new workbook (in write-only mode, the rows are streamed to a temporary file)
+    wb = Workbook(write_only = spec.write_only)
 
-    if excel_highlighted_cols is not None:
-        excel_highlighted_cols = [col for col in excel_highlighted_cols if col in biblio_highlights_df.columns]
+    # Create a new sheet
+    ws = wb.create_sheet(spec.sheet_name)
 
-        for col in excel_highlighted_cols:
-            # Create a list of each cell content by splitting at '<span...>some text</span>' using findall()
-            tak_excel_df[col] = tak_excel_df[col].apply(split_string_at_span)
+    # Remove the default sheet
+    if not spec.write_only and wb["Sheet"]:
+        wb.remove(wb["Sheet"])
 
-            # Replace all '<span...>some text</span>' with the results of calling TextBlock(bold_red, 'some text')
-            tak_excel_df[col] = tak_excel_df[col].apply(replace_span_with_textblock)
+    if highlight_spans is None:
+        highlight_spans = {}
+        tak_excel_df = tak_excel_df.copy()
 
-    numeric_cols = biblio_highlights_df.select_dtypes(include = "number").columns.tolist()
+        # Parse the HTML highlights into the texts and the spans
+        for col in spec.highlighted_cols or []:
+            if col in tak_excel_df.columns:
+                parsed_lst = [parse_highlights_html(str(html)) for html in tak_excel_df[col]]
+                tak_excel_df[col] = [text for text, _ in parsed_lst]
+                highlight_spans[col] = [spans for _, spans in parsed_lst]
 
-    # Loop through rows and columns of the dataframe
-    for i in range(len(tak_excel_df)):
-        for col in tak_excel_df.columns:
-            j = tak_excel_df.columns.get_loc(col)
+    numeric_cols = tak_excel_df.select_dtypes(include = "number").columns.tolist()
 
-            if col in excel_highlighted_cols:
-                rs = CellRichText(tak_excel_df.iloc[i, j])  # type: ignore - not sure how to avoid the Pylance typing warning
-            elif col in numeric_cols:
-                # rs = str(tak_excel_df.iloc[i, j])
-                rs = tak_excel_df.iloc[i, j]
-            else:
-                rs = str(tak_excel_df.iloc[i, j])
+    # The column widths have to be set before the rows are written
+    for idx, column in enumerate(columns):
+        if column.width is not None:
+            ws.column_dimensions[get_excel_column(idx + 1)].width = column.width
+
+    ws.sheet_view.zoomScale = spec.zoom
 
-            ws.cell(row = i + 2, column = j + 1, value = rs)
+    if spec.freeze_panes:
+        ws.freeze_panes = spec.freeze_panes
 
-    for idx, col in enumerate(formatted_cols):
-        col_letter = get_excel_column(idx + 1)
-        width = default_width
-        wrap = default_wrap
+    def create_cell(value: Any, alignment: Optional[Alignment], font: Optional[Font] = None) -> Any:
+        if alignment is None and font is None:
+            return value
 
-        if excel_cols is not None:
-            width = next((col_info.get('width', default_width) for col_info in excel_cols if col_info['col'] == col), default_width)
-            wrap = next((col_info.get('wrap', default_wrap) for col_info in excel_cols if col_info['col'] == col), default_wrap)
+        cell = WriteOnlyCell(ws, value = value)
 
-        ws.column_dimensions[col_letter].width = width
+        if alignment is not None:
+            cell.alignment = alignment
+        if font is not None:
+            cell.font = font
 
-        for cell in ws[col_letter]:
-            cell.alignment = Alignment(wrap_text = wrap)
+        return cell
 
-    ws.sheet_view.zoomScale = excel_zoom
+    # Excel column headers
+    ws.append([create_cell(column.header, column.alignment, spec.header_font) for column in columns])
+
+    # How the values of each column are written
+    def get_value_converter(col: str):
+        if col in highlight_spans:
+            spans_lst = highlight_spans[col]
+            return lambda value, i: create_rich_text(str(value), spans_lst[i], spec.fonts)
+        elif col in numeric_cols:
+            return lambda value, i: value
+        else:
+            return lambda value, i: str(value)
+
+    converters = [get_value_converter(column.col) for column in columns]
+    alignments = [column.alignment for column in columns]
 
-    if excel_freeze_panes:
-        ws.freeze_panes = excel_freeze_panes
+    # Write the rows
+    for i, row in enumerate(tak_excel_df.itertuples(index = False, name = None)):
+        ws.append([create_cell(convert(value, i), alignment) 
+                   for value, convert, alignment in zip(row, converters, alignments)])
+
+    # Finish the streamed sheet, so that a workbook that is not saved is discarded cleanly
+    if spec.write_only:
+        ws.close()
 
     return wb
 
 
-def highlight_keywords(biblio_df_: pd.DataFrame,
-                        highlight_params: List[Dict[str, Union[List[str], str]]],
-                        html_cols: Optional[List] = None,
-                        xlsx_cols: Optional[List] = None,
-                        excel_params: Optional[Any] = None
-                        ) -> Tuple[Optional[HTML], Optional[Workbook]]:
-    biblio_highlights_df = biblio_df_.copy()
+def get_target_groups(highlight_params: List[Dict[str, Union[List[str], str]]],
+                      cols: List[str]
+                      ) -> Dict[str, List[Tuple[Union[List[str], str], str]]]:
+    """
+    Returns the colour groups of `highlight_params` (see `highlight_keywords`) by target 
+    column, as `(strings, colour)` tuples in the order of `highlight_params`. The targets 
+    that are not in `cols` are skipped.
+
+    Raises:
+        ValueError: If a parameter dictionary has no 'strings' or 'targets'.
+    """
 
-    highlighted_cols = []
+    # The colour groups of each target column, in the order of highlight_params
+    target_groups: Dict[str, List[Tuple[Union[List[str], str], str]]] = {}
 
     for param in highlight_params:
         if not all([key in param for key in ['strings', 'targets']]):
@@ -247,39 +530,238 @@ def highlight_keywords(biblio_df_: pd.DataFrame,
         else:
             targets = [param.get('targets')]
 
-        # Highlight the strings provided in param
         for target in targets:
-            if target in biblio_highlights_df.columns:
-                highlighted_cols.append(target)
-                print(f'Highlighting strings in {colour} in the {target}...')
-                biblio_highlights_df[target] = biblio_highlights_df \
-                    .apply(lambda x: highlight_selected_text(
-                            text = x[target], 
-                            strings = strings, 
-                            colour = str(colour), 
-                            i_row = biblio_highlights_df.index.get_loc(x.name)), axis = 1)
+            if target in cols:
+                target_groups.setdefault(target, []).append((strings, str(colour)))
+
+    return target_groups
+
+
+class HighlightPager:
+    """
+    A paginated HTML view of the highlights of a bibliographic dataset.
+
+    The rows of a page are only highlighted and rendered when the page is shown, so that 
+    a large dataset can be browsed in Jupyter without rendering all of it. The pager 
+    displays its first page; show the other pages with `page` (the page numbers start 
+    at 1), or write all the pages to HTML files with `export_pages`.
+    """
+
+    max_cached_pages = 10
+
+    def __init__(self, 
+                 biblio_df: pd.DataFrame,
+                 target_groups: Dict[str, List[Tuple[Union[List[str], str], str]]],
+                 html_cols: Optional[List[str]] = None,
+                 page_size: int = 50,
+                 highlight_spans: Optional[Dict[str, List[HighlightSpans]]] = None):
+        if page_size < 1:
+            raise ValueError(f"The page size has to be at least 1")
+
+        self.biblio_df = biblio_df[html_cols] if html_cols else biblio_df
+        self.target_groups = {col: groups for col, groups in target_groups.items() if col in self.biblio_df.columns}
+        self.page_size = page_size
+        self.highlight_spans = highlight_spans or {}
+        self._page_cache: Dict[int, str] = {}
+
+    @property
+    def n_pages(self) -> int:
+        return max(1, -(-len(self.biblio_df) // self.page_size))
+
+    def highlight_page(self, page: int) -> pd.DataFrame:
+        """
+        Returns the rows of a page with the highlighted columns as HTML.
+
+        Raises:
+            ValueError: If the page does not exist.
+        """
+
+        if not 1 <= page <= self.n_pages:
+            raise ValueError(f"The page has to be between 1 and {self.n_pages}")
+
+        start = (page - 1) * self.page_size
+        page_df = self.biblio_df.iloc[start:start + self.page_size].copy()
+
+        for col, groups in self.target_groups.items():
+            texts = [str(text) for text in page_df[col]]
+
+            if col in self.highlight_spans:
+                spans_lst = self.highlight_spans[col][start:start + self.page_size]
+            else:
+                spans_lst = highlight_column(page_df[col], groups)
+
+            page_df[col] = [render_highlights_html(text, spans) for text, spans in zip(texts, spans_lst)]
+
+        return page_df
+
+    def _render_page(self, page: int, nav_links: Optional[Callable[[int], str]] = None) -> str:
+        start = (page - 1) * self.page_size
+        end = min(start + self.page_size, len(self.biblio_df))
+        caption = f'Page {page} of {self.n_pages} (rows {start + 1 if end else 0} to {end} of {len(self.biblio_df)})'
+
+        if nav_links:
+            links = [f'<a href="{nav_links(target)}">{label}</a>' 
+                     for label, target in [('first', 1), ('previous', page - 1), ('next', page + 1), ('last', self.n_pages)]
+                     if 1 <= target <= self.n_pages and target != page]
+            caption += ' ' + ' | '.join(links)
+
+        return f'<p>{caption}</p>\n' + self.highlight_page(page).to_html(escape = False)
+
+    def render_page(self, page: int) -> str:
+        """
+        Returns the HTML of a page. The last `max_cached_pages` pages are cached.
+        """
+
+        if page not in self._page_cache:
+            if len(self._page_cache) >= self.max_cached_pages:
+                self._page_cache.pop(next(iter(self._page_cache)))
+
+            self._page_cache[page] = self._render_page(page)
+
+        return self._page_cache[page]
+
+    def page(self, page: int) -> HTML:
+        """
+        Returns a page for display in Jupyter.
+        """
+
+        return HTML(self.render_page(page))
+
+    def _repr_html_(self) -> str:
+        return self.render_page(1)
+
+    def export_pages(self, 
+                     output_dir: Union[str, Path], 
+                     file_prefix: str = 'highlights'
+                     ) -> List[Path]:
+        """
+        Write the pages to the HTML files `<file_prefix>_0001.html`, ... in `output_dir`, 
+        with links to the first, previous, next and last page. The pages are highlighted 
+        and written one at a time.
+
+        Returns:
+            The paths of the page files.
+        """
+
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents = True, exist_ok = True)
+
+        page_file_name = lambda page: f'{file_prefix}_{page:04d}.html'
+        page_paths = []
+
+        for page in range(1, self.n_pages + 1):
+            page_path = output_dir / page_file_name(page)
+            html = self._render_page(page, nav_links = page_file_name)
+
+            with open(page_path, 'w', encoding = 'utf-8') as f:
+                f.write(f'<!DOCTYPE html>\n<html>\n<head><meta charset="utf-8"><title>{file_prefix} {page}</title></head>\n'
+                        f'<body>\n{html}\n</body>\n</html>\n')
+
+            page_paths.append(page_path)
+
+        logger.info(f"Wrote {self.n_pages} pages of highlights to '{output_dir}'")
+
+        return page_paths
+
+
+def create_highlight_pager(biblio_df: pd.DataFrame,
+                           highlight_params: List[Dict[str, Union[List[str], str]]],
+                           html_cols: Optional[List[str]] = None,
+                           page_size: int = 50
+                           ) -> HighlightPager:
+    """
+    Returns a paginated HTML view of the highlights (see `HighlightPager`), without 
+    highlighting the dataset upfront. The parameters are the same as in `highlight_keywords`.
+    """
+
+    return HighlightPager(biblio_df, get_target_groups(highlight_params, list(biblio_df.columns)), html_cols, page_size)
+
+
+def highlight_keywords(biblio_df_: pd.DataFrame,
+                        highlight_params: List[Dict[str, Union[List[str], str]]],
+                        html_cols: Optional[List] = None,
+                        xlsx_cols: Optional[List] = None,
+                        excel_params: Optional[Any] = None,
+                        n_workers: int = 1,
+                        progress_callback: Optional[Callable[[str, int, int], None]] = None,
+                        html_page_size: Optional[int] = None
+                        ) -> Tuple[Optional[Union[HTML, HighlightPager]], Optional[Workbook]]:
+    """
+    Highlight strings in the text columns of biblio_df, as HTML and in an Excel workbook.
+
+    Each target column is highlighted in one pass over its texts with `highlight_column`, 
+    using all the colour groups in `highlight_params` that target the column.
+
+    Args:
+        biblio_df_: The bibliographic dataset.
+        highlight_params: The colour groups, as dictionaries with the keys 'strings' (the 
+            strings to highlight), 'targets' (the columns) and 'colour' (default: 'red').
+        html_cols: The columns of the HTML output, [] for all the columns (default: None, 
+            no HTML output).
+        xlsx_cols: The columns of the Excel output (default: None, all the columns).
+        excel_params: The Excel parameters or an `ExcelExportSpec`.
+        n_workers: The number of worker processes for the highlighting (default: 1).
+        progress_callback: Optional function that is called with the column, the number 
+            of texts done and the total number of texts (default: None, prints the 
+            progress if the log level is INFO).
+        html_page_size: The number of rows per page of the HTML output (default: None, 
+            a single HTML table). With a page size, the HTML output is a `HighlightPager`.
+            To browse the highlights without computing them for the whole dataset, 
+            use `create_highlight_pager` instead.
+
+    Returns:
+        A tuple with the HTML output and the Excel workbook.
+    """
+
+    biblio_highlights_df = biblio_df_.copy()
+
+    target_groups = get_target_groups(highlight_params, list(biblio_highlights_df.columns))
+
+    if progress_callback is None and logger.get_level() == logging.INFO:
+        progress_callback = lambda col, n_done, n_total: print(f'{n_done} of {n_total}', end = '\r')
+
+    # The highlights of each row of the highlighted columns
+    highlight_spans: Dict[str, List[HighlightSpans]] = {}
+
+    for target, groups in target_groups.items():
+        print(f"Highlighting strings in {', '.join(colour for _, colour in groups)} in the {target}...")
+
+        column_callback = None
+
+        if progress_callback:
+            column_callback = lambda n_done, n_total, target = target: progress_callback(target, n_done, n_total)
+
+        biblio_highlights_df[target] = [str(text) for text in biblio_highlights_df[target]]
+        highlight_spans[target] = highlight_column(biblio_highlights_df[target], 
+                                                   groups, 
+                                                   n_workers = n_workers, 
+                                                   progress_callback = column_callback)
 
     html_out = None
     xlsx_out = None
 
-    if html_cols != None:
-        if html_cols == []:
-            html_out = HTML(biblio_highlights_df.to_html(escape = False))
-        else:
-             html_out = HTML(biblio_highlights_df[html_cols].to_html(escape = False))
+    if html_cols != None and html_page_size:
+        html_out = HighlightPager(biblio_highlights_df, target_groups, html_cols, html_page_size, highlight_spans)
+    elif html_cols != None:
+        html_df = (biblio_highlights_df[html_cols] if html_cols else biblio_highlights_df).copy()
+
+        for col, spans_lst in highlight_spans.items():
+            if col in html_df.columns:
+                html_df[col] = [render_highlights_html(text, spans) for text, spans in zip(html_df[col], spans_lst)]
 
-    if excel_params != None:
-        excel_params['highlighted_cols'] = list(set(highlighted_cols))
+        html_out = HTML(html_df.to_html(escape = False))
 
     if xlsx_cols != None:
         if xlsx_cols == []:
             xlsx_cols = list(biblio_highlights_df.columns)
         
         xlsx_out = excel_highlights_builder(biblio_highlights_df = biblio_highlights_df[xlsx_cols],
-                                            excel_params = excel_params)
+                                            excel_params = excel_params,
+                                            highlight_spans = highlight_spans)
     else:
         xlsx_out = excel_highlights_builder(biblio_highlights_df = biblio_highlights_df,
-                                            excel_params = excel_params)
+                                            excel_params = excel_params,
+                                            highlight_spans = highlight_spans)
 
     return html_out, xlsx_out
 
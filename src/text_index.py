@@ -0,0 +1,343 @@
+"""
+Inverted index over the text columns of a bibliographic dataset, used by `filter.py`.
+
+Each indexed column is split into lower-case word tokens (`\\w+`, the same word characters
+as the `\\b` word boundaries of the `in*` operator). For each token, the index stores the
+sorted row positions of the records that contain it (the posting list). The vocabulary
+is sorted, so that a word is found with a binary search.
+
+A search string is resolved against the index as follows:
+
+- A whole word ('equity'): the posting list of the word.
+- A partial word (equity): the union of the posting lists of all the words in the
+  vocabulary that contain it. Only the vocabulary is scanned, not the texts.
+- Several words ('systemic risk', systemic risk): the intersection of the posting lists
+  of the words gives the candidate rows, which are then checked with the regex.
+- Regular expressions: not resolved, `filter.py` scans the column instead.
+
+The index is built once with `build_text_index` and stored next to the dataset with
+`get_text_index`, which rebuilds it when the indexed columns change.
+"""
+
+import pandas as pd
+import numpy as np
+import scipy.sparse as sp
+import hashlib
+import re
+import time
+import weakref
+
+from pathlib import Path
+from typing import Tuple, List, Dict, Optional
+
+from config import *
+from utilities import *
+
+
+_token_pattern = re.compile(r'\w+')
+_plain_text_pattern = re.compile(r'[\w\s\-]+')
+
+
+class ColumnIndex:
+    """
+    The inverted index of one column: the sorted vocabulary and the posting lists
+    in CSR layout (the rows of the word `vocab[i]` are `rows[indptr[i]:indptr[i + 1]]`).
+    """
+
+    def __init__(self, vocab: np.ndarray, indptr: np.ndarray, rows: np.ndarray):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.rows = rows
+        self._partial_cache: Dict[str, np.ndarray] = {}
+
+    def word_ids(self, word: str) -> np.ndarray:
+        """
+        Returns the id of `word` in the vocabulary, as an array that is empty if the word
+        is not in the vocabulary.
+        """
+
+        pos = np.searchsorted(self.vocab, word)
+
+        if pos < len(self.vocab) and self.vocab[pos] == word:
+            return np.array([pos])
+
+        return np.array([], dtype = np.int64)
+
+    def partial_word_ids(self, substring: str) -> np.ndarray:
+        """
+        Returns the ids of the words in the vocabulary that contain `substring`.
+        """
+
+        if substring not in self._partial_cache:
+            vocab_se = pd.Series(self.vocab, dtype = 'string')
+            self._partial_cache[substring] = np.flatnonzero(vocab_se.str.contains(substring, regex = False).to_numpy(dtype = bool))
+
+        return self._partial_cache[substring]
+
+    def posting_rows(self, word_ids: np.ndarray) -> np.ndarray:
+        """
+        Returns the concatenated rows of the posting lists of `word_ids` (with duplicates).
+        """
+
+        starts = self.indptr[word_ids]
+        lengths = self.indptr[word_ids + 1] - starts
+
+        # Positions in `rows` of all the postings of the words
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+
+        return self.rows[offsets + np.arange(lengths.sum())]
+
+
+class TextIndex:
+    """
+    The inverted indexes of the text columns of a DataFrame with `n_rows` rows.
+    """
+
+    def __init__(self, col_indexes: Dict[str, ColumnIndex], n_rows: int, fingerprint: str = ''):
+        self.col_indexes = col_indexes
+        self.n_rows = n_rows
+        self.fingerprint = fingerprint
+        self.checked_arrays: List[weakref.ref] = []
+
+    def is_index_of(self, biblio_df: pd.DataFrame) -> bool:
+        """
+        Returns True if the index was built on the current values of the indexed columns 
+        of biblio_df.
+
+        The values are compared by their hash. Arrow arrays cannot be changed, so if the 
+        columns are backed by the Arrow arrays of the last check, they are not hashed again.
+        """
+
+        cols = list(self.col_indexes)
+
+        if self.n_rows != len(biblio_df) or any(col not in biblio_df.columns for col in cols):
+            return False
+
+        col_arrays = [biblio_df[col].array.__arrow_array__() if getattr(biblio_df[col].dtype, 'storage', None) == 'pyarrow' else None 
+                      for col in cols]
+
+        if self.checked_arrays and all(col_array is not None and ref() is col_array for ref, col_array in zip(self.checked_arrays, col_arrays)):
+            return True
+
+        if self.fingerprint != hash_text_columns(biblio_df, cols):
+            return False
+
+        if all(col_array is not None for col_array in col_arrays):
+            self.checked_arrays = [weakref.ref(col_array) for col_array in col_arrays]
+
+        return True
+
+    def lookup(self, col: str, search_str: str, whole_word: bool) -> Optional[Tuple[np.ndarray, bool]]:
+        """
+        Resolve a search string of the `in*` operator against the index of `col`.
+
+        Returns:
+            None if the search string cannot be resolved with the index (the column is
+            not indexed or the search string is a regex). Otherwise, a tuple `(rows, exact)`
+            with the candidate row positions (possibly with duplicates) and whether they
+            are exactly the rows that match. If `exact` is False, the candidates still
+            have to be checked with the regex.
+        """
+
+        col_index = self.col_indexes.get(col)
+
+        if col_index is None or not _plain_text_pattern.fullmatch(search_str):
+            return None
+
+        words = _token_pattern.findall(search_str.lower())
+
+        if not words:
+            return None
+
+        # A single word without separators is resolved exactly
+        exact = len(words) == 1 and words[0] == search_str.lower()
+        candidate_mask = None
+
+        for word in words:
+            word_ids = col_index.word_ids(word) if whole_word else col_index.partial_word_ids(word)
+            word_mask = np.zeros(self.n_rows, dtype = bool)
+            word_mask[col_index.posting_rows(word_ids)] = True
+            candidate_mask = word_mask if candidate_mask is None else candidate_mask & word_mask
+
+        return np.flatnonzero(candidate_mask), exact
+
+
+def _build_column_index(col_se: pd.Series) -> ColumnIndex:
+    """
+    Build the inverted index of a text column.
+    """
+
+    tokens_se = col_se.astype('string').str.lower().str.findall(_token_pattern.pattern)
+    lengths = tokens_se.str.len().fillna(0).to_numpy(dtype = np.int64)
+    tokens = tokens_se.explode().dropna().to_numpy(dtype = object)
+    row_ids = np.repeat(np.arange(len(col_se), dtype = np.int32), lengths)
+
+    # Sort the vocabulary and renumber the tokens accordingly
+    word_ids, vocab = pd.factorize(tokens)
+    vocab = np.asarray(vocab, dtype = object)
+    vocab_order = np.argsort(vocab)
+    vocab_ranks = np.empty(len(vocab), dtype = np.int64)
+    vocab_ranks[vocab_order] = np.arange(len(vocab))
+
+    # The posting lists are the columns of the sparse row-word matrix, without the repeated words of a row
+    postings = sp.csc_matrix((np.ones(len(tokens), dtype = np.int32), (row_ids, vocab_ranks[word_ids])),
+                             shape = (len(col_se), len(vocab)))
+    postings.sum_duplicates()
+
+    return ColumnIndex(vocab[vocab_order], postings.indptr.astype(np.int64), postings.indices.astype(np.int32))
+
+
+def hash_text_columns(biblio_df: pd.DataFrame, cols: List[str]) -> str:
+    """
+    Returns a hash of the values of `cols`, which identifies the data an index was built on.
+
+    With pyarrow, the hash is computed from the Arrow buffers of the columns, which is 
+    about ten times faster than hashing the values one by one. Missing values are hashed 
+    as empty strings, as they are not indexed either.
+    """
+
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        hashes = pd.util.hash_pandas_object(biblio_df[cols].astype('string'), index = False).to_numpy()
+
+        return hashlib.sha1(hashes.tobytes() + ';'.join(cols).encode('utf-8')).hexdigest()
+
+    text_hash = hashlib.sha1(';'.join(cols).encode('utf-8'))
+
+    for col in cols:
+        col_se = biblio_df[col]
+
+        try:
+            col_arr = pa.array(col_se, from_pandas = True).cast(pa.large_string())
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            col_arr = pa.array(col_se.astype('string'), from_pandas = True).cast(pa.large_string())
+
+        if isinstance(col_arr, pa.ChunkedArray):
+            col_arr = col_arr.combine_chunks()
+
+        col_arr = pc.fill_null(col_arr, '')
+
+        if len(col_arr) == 0:
+            continue
+
+        # Hash the offsets and the characters of the rows, without the rest of the buffers of a slice
+        _, offsets_buf, data_buf = col_arr.buffers()
+        offsets = np.frombuffer(offsets_buf, dtype = np.int64)[col_arr.offset:col_arr.offset + len(col_arr) + 1]
+
+        text_hash.update((offsets - offsets[0]).tobytes())
+
+        if data_buf is not None:
+            text_hash.update(memoryview(data_buf)[offsets[0]:offsets[-1]])
+
+    return text_hash.hexdigest()
+
+
+def build_text_index(biblio_df: pd.DataFrame, cols: List[str]) -> TextIndex:
+    """
+    Build the inverted index of the text columns `cols` of biblio_df.
+
+    Raises:
+        ValueError: If some columns are not in biblio_df.
+    """
+
+    if any(col not in biblio_df.columns for col in cols):
+        raise ValueError(f"Some columns in {cols} are not in biblio_df")
+
+    start_time = time.time()
+
+    col_indexes = {col: _build_column_index(biblio_df[col]) for col in cols}
+
+    logger.info(f"Indexed the columns {cols} of {len(biblio_df)} records in {time.time() - start_time:.2f} seconds")
+
+    return TextIndex(col_indexes, len(biblio_df), hash_text_columns(biblio_df, cols))
+
+
+def save_text_index(text_index: TextIndex, index_path: Path) -> None:
+    """
+    Save a text index to a `.npz` file.
+    """
+
+    arrays = {'cols': np.array(list(text_index.col_indexes.keys())),
+              'n_rows': np.array(text_index.n_rows),
+              'fingerprint': np.array(text_index.fingerprint)}
+
+    for i, col_index in enumerate(text_index.col_indexes.values()):
+        # The words do not contain line breaks, so the vocabulary is stored as one string
+        arrays[f'vocab_{i}'] = np.frombuffer('\n'.join(col_index.vocab).encode('utf-8'), dtype = np.uint8)
+        arrays[f'indptr_{i}'] = col_index.indptr
+        arrays[f'rows_{i}'] = col_index.rows
+
+    np.savez(index_path, **arrays)
+
+
+def load_text_index(index_path: Path) -> TextIndex:
+    """
+    Load a text index saved with `save_text_index`.
+    """
+
+    with np.load(index_path) as npz:
+        col_indexes = {}
+
+        for i, col in enumerate(npz['cols'].tolist()):
+            vocab_str = npz[f'vocab_{i}'].tobytes().decode('utf-8')
+            vocab = np.array(vocab_str.split('\n') if vocab_str else [], dtype = object)
+            col_indexes[col] = ColumnIndex(vocab, npz[f'indptr_{i}'], npz[f'rows_{i}'])
+
+        return TextIndex(col_indexes, int(npz['n_rows']), str(npz['fingerprint']))
+
+
+def get_text_index_path(biblio_project_dir: str,
+                        input_dir: str,
+                        input_file: str
+                        ) -> Path:
+    """
+    Returns the path of the text index of a dataset, which is stored next to the dataset
+    as `<input_file stem>.index.npz`.
+    """
+
+    return get_data_dir(biblio_project_dir) / input_dir / f'{Path(input_file).stem}.index.npz'
+
+
+def get_text_index(biblio_df: pd.DataFrame,
+                   cols: List[str] = ['title', 'abstract', 'kws'],
+                   index_path: Optional[Path] = None
+                   ) -> TextIndex:
+    """
+    Returns the text index of biblio_df for `filter_biblio_df`.
+
+    If `index_path` exists and was built on the same values of `cols`, the index is read
+    from the file. Otherwise it is built and, if `index_path` is given, saved. Use
+    `get_text_index_path` to store the index next to the dataset.
+
+    Args:
+        biblio_df:
+            The DataFrame to index. The index refers to the row positions, so it can only
+            be used for this DataFrame.
+        cols:
+            The text columns to index (default: ['title', 'abstract', 'kws']).
+        index_path:
+            Optional path of the index file.
+
+    Returns:
+        The text index.
+    """
+
+    cols = [col for col in cols if col in biblio_df.columns]
+
+    if index_path and Path(index_path).exists():
+        text_index = load_text_index(index_path)
+
+        if text_index.fingerprint == hash_text_columns(biblio_df, cols):
+            logger.info(f"Read the text index from '{Path(index_path).name}'")
+            return text_index
+
+        logger.info(f"The text index '{Path(index_path).name}' is out of date and will be rebuilt")
+
+    text_index = build_text_index(biblio_df, cols)
+
+    if index_path:
+        save_text_index(text_index, index_path)
+
+    return text_index
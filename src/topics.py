@@ -1,14 +1,168 @@
 import pandas as pd
+import numpy as np
 import time
 
+from pathlib import Path
+
 from config import *
-from typing import Tuple, Optional, List
+from utilities import get_model_dir, get_peak_memory_mb
+from embed import get_cached_embeddings
+from ctfidf import get_doc_term_matrix, select_terms, calc_topic_term_counts, calc_ctfidf, get_top_terms
+from typing import Tuple, Optional, List, Union
 
 from bertopic import BERTopic
+from bertopic.vectorizers import OnlineCountVectorizer
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import IncrementalPCA
 from sklearn.feature_extraction.text import CountVectorizer
 
-# TODO:
-# Add the stitching. Currently the merged_df doesn't actually include the merged dataframe
+
+def _select_text_rows(biblio_df_: pd.DataFrame,
+                      input_col: Optional[str],
+                      id_col: Optional[str] = None,
+                      extra_cols: Optional[List[str]] = None,
+                      embeddings: Optional[np.ndarray] = None
+                      ) -> Tuple[pd.DataFrame, str, Optional[np.ndarray]]:
+    """
+    Validate the input columns and select the rows with text in `input_col`.
+
+    Only the columns `id_col`, `input_col` and `extra_cols` are taken from `biblio_df_`, 
+    so the other columns (e.g. long abstracts when fitting on titles) are never copied.
+
+    Returns:
+        A tuple `(text_df, input_col, embeddings)`. The index of `text_df` is the row 
+        position in `biblio_df_`, and the embeddings (if provided) are those of the 
+        selected rows.
+    """
+
+    if embeddings is not None and len(embeddings) != len(biblio_df_):
+        raise ValueError(f"The embeddings have {len(embeddings)} rows, but biblio_df has {len(biblio_df_)} rows")
+    
+    # If input_col is not provided, use the first/only column of biblio_df
+    if input_col is None:
+        input_col = str(biblio_df_.columns[0])
+        logger.info(f"Using column {input_col} as the texts for BERTopic")
+    else:
+        # Check that input_col is a column in biblio_df
+        if input_col not in biblio_df_.columns:
+            raise ValueError(f"{input_col} is not a column in biblio_df")
+        
+    if id_col is not None and id_col not in biblio_df_.columns:
+        raise ValueError(f"{id_col} is not a column in biblio_df")
+
+    _check_unique_keys(biblio_df_, id_col)
+
+    if extra_cols and any(col not in biblio_df_.columns for col in extra_cols):
+        raise ValueError(f"Some columns in {extra_cols} are not in biblio_df")
+
+    # Project biblio_df_ on the needed columns; the index is the row position in biblio_df_
+    cols = list(dict.fromkeys([col for col in [id_col, input_col] + (extra_cols or []) if col is not None]))
+    text_df = biblio_df_[cols].set_axis(pd.RangeIndex(len(biblio_df_)), axis = 0)
+
+    # Check that the column input_col contains text data
+    texts = text_df[input_col]
+
+    if pd.api.types.infer_dtype(texts, skipna = True) not in ['string', 'empty']:
+        raise ValueError(f"The '{input_col}' column must contain text data")
+
+    # Keep the rows where input_col has at least one non-whitespace character
+    if texts.isna().all():
+        has_text = np.zeros(len(texts), dtype = bool)
+    else:
+        has_text = texts.str.contains(r'\S', regex = True, na = False).to_numpy(dtype = bool)
+
+    if not has_text.any():
+        raise ValueError(f"The '{input_col}' column has no text")
+
+    text_df = text_df[has_text]
+
+    # Select the embeddings of the remaining rows
+    if embeddings is not None:
+        embeddings = embeddings[has_text]
+
+    return text_df, input_col, embeddings
+
+
+def _check_unique_keys(biblio_df: pd.DataFrame, id_col: Optional[str]) -> None:
+    """
+    Raise a ValueError if the keys of the topics, the ids in `id_col` or otherwise the 
+    index labels of biblio_df, have duplicates, as joining the topics would repeat rows.
+    """
+
+    if id_col is not None:
+        if not biblio_df[id_col].is_unique:
+            raise ValueError(f"The '{id_col}' column has duplicate ids")
+    elif not biblio_df.index.is_unique:
+        raise ValueError("The index of biblio_df has duplicate labels, use id_col or reset the index")
+
+
+def _get_topic_keys(biblio_df_: pd.DataFrame,
+                    text_df: pd.DataFrame,
+                    id_col: Optional[str]
+                    ) -> pd.Index:
+    """
+    Returns the keys of the rows of `text_df`: the ids in `id_col` if provided, 
+    otherwise the index labels of the same rows in `biblio_df_`.
+    """
+
+    if id_col is not None:
+        return pd.Index(text_df[id_col], name = id_col)
+
+    return biblio_df_.index[text_df.index.to_numpy()]
+
+
+def _log_time_and_memory(start_time: float) -> None:
+    logger.info("--- %s seconds ---" % (time.time() - start_time))
+
+    peak_memory_mb = get_peak_memory_mb()
+
+    if peak_memory_mb is not None:
+        logger.info(f"Peak memory: {peak_memory_mb:.0f} MB")
+
+
+def _get_embeddings(docs: List[str],
+                    biblio_df: pd.DataFrame,
+                    biblio_project_dir: Optional[str],
+                    id_col: Optional[str],
+                    embedding_model: Optional[str],
+                    verbose: bool
+                    ) -> Optional[np.ndarray]:
+    """
+    Returns the cached embeddings of `docs` if a bibliometric project is provided, otherwise None.
+    """
+
+    if not biblio_project_dir:
+        return None
+
+    return get_cached_embeddings(docs = docs,
+                                 biblio_project_dir = biblio_project_dir,
+                                 ids = biblio_df[id_col].to_list() if id_col else None,
+                                 embedding_model = embedding_model,
+                                 verbose = verbose)
+
+
+def _stratified_sample(biblio_df: pd.DataFrame,
+                       sample_size: int,
+                       stratify_cols: List[str]
+                       ) -> pd.DataFrame:
+    """
+    Randomly sample `sample_size` rows so that each stratum (a combination of the values 
+    in `stratify_cols`, e.g. year and bib_src) has the same share as in `biblio_df`.
+    """
+
+    shuffled_df = biblio_df.sample(frac = 1)
+    grouped = shuffled_df.groupby(stratify_cols, dropna = False, sort = False)
+    strata = grouped.ngroup().to_numpy()
+    ranks = grouped.cumcount().to_numpy()
+
+    # Allocate the sample to the strata with the largest remainder method
+    quotas = np.bincount(strata) * min(sample_size / len(biblio_df), 1)
+    n_per_stratum = np.floor(quotas).astype(int)
+    n_missing = min(sample_size, len(biblio_df)) - n_per_stratum.sum()
+    n_per_stratum[np.argsort(n_per_stratum - quotas, kind = 'stable')[:n_missing]] += 1
+
+    return shuffled_df[ranks < n_per_stratum[strata]]
+
 
 def generate_bert_topics(biblio_df_: pd.DataFrame,
                          input_col: Optional[str] = None,
@@ -16,11 +170,27 @@ def generate_bert_topics(biblio_df_: pd.DataFrame,
                          sample_size: Optional[int] = None,
                          verbose: bool = False,
                          calc_probs: bool = False,
-                         remove_stopwords: bool = False
+                         remove_stopwords: bool = False,
+                         biblio_project_dir: Optional[str] = None,
+                         id_col: Optional[str] = None,
+                         embedding_model: Optional[str] = default_embedding_model,
+                         embeddings: Optional[np.ndarray] = None,
+                         stratify_cols: Optional[List[str]] = None,
+                         assign_all: bool = False,
+                         assign_batch_size: int = 50_000
                          ) -> Tuple[BERTopic, pd.DataFrame]:
     """
     Generate BERTopic topics from the titles or abstracts of a biblio_df.
 
+    For large datasets, fit the model on a sample (`sample_size`, optionally stratified 
+    with `stratify_cols`) and set `assign_all = True` to assign the topics of the fitted 
+    model to all the other documents in batches. Only the sample goes through UMAP and 
+    HDBSCAN, so the time and memory needed to fit the model are bounded by `sample_size`.
+
+    Only the text column (and `id_col` and `stratify_cols`) is read from biblio_df, and 
+    the topics are returned without the texts, keyed by record. Use `merge_bert_topics` 
+    to join them to biblio_df.
+
     Parameters:
 
     biblio_df (pd.DataFrame): 
@@ -36,71 +206,392 @@ def generate_bert_topics(biblio_df_: pd.DataFrame,
     calc_probs (bool): 
         Whether to calculate topic probabilities (default: False).
     remove_stopwords (bool)
-        Whether to remove the English stopwords from the topics (default: False).
+        Whether to remove the English stopwords from the topics (default: False). To 
+        relabel the topics later with other stopwords, n-grams or a keyword vocabulary, 
+        use `ctfidf.extract_topic_terms` and `ctfidf.set_bert_topic_terms`.
+    biblio_project_dir (Optional[str]):
+        The name of the bibliometric project directory. If provided, the document embeddings
+        are cached in the project model directory and only new or changed documents are 
+        embedded (default: None, BERTopic embeds all documents).
+    id_col (Optional[str]):
+        The name of the column with the record ids, which are stored with the cached 
+        embeddings and used as the keys of the topics (default: None, the topics are 
+        keyed by the index of biblio_df).
+    embedding_model (Optional[str]):
+        The name of the sentence transformer model (default: `default_embedding_model` in `config.py`). 
+        Use None for a model that is only used with precomputed `embeddings`.
+    embeddings (Optional[np.ndarray]):
+        Precomputed embeddings with one row per row of biblio_df, e.g. from `embed.embed_documents` 
+        or `embed.get_cached_embeddings` with several processes (default: None).
+    stratify_cols (Optional[List[str]]):
+        The columns used to stratify the sample, e.g. ['year', 'bib_src'] (default: None, 
+        simple random sample).
+    assign_all (bool):
+        Whether to assign topics to the documents that are not in the sample (default: False).
+    assign_batch_size (int):
+        The number of documents per `transform` call when assigning topics (default: 50000).
 
     Returns:
 
     BERTopic: 
         The fitted BERTopic model.
 
-    docs:
-        The list of texts used to fit the BERTopic model.
+    pd.DataFrame:
+        The topics (columns Topic, Name, Top_n_words, Probability) of the documents with 
+        text, in the order of biblio_df and indexed by `id_col` or the index of biblio_df.
     """
 
-    biblio_df = biblio_df_.copy()
-    
-    # If input_col is not provided, use the first/only column of biblio_df
-    if input_col is None:
-        input_col = str(biblio_df.columns[0])
-        logger.info(f"Using column {input_col} as the texts for BERTopic")
-    else:
-        # Check that input_col is a column in biblio_df
-        if input_col not in biblio_df.columns:
-            raise ValueError(f"{input_col} is not a column in biblio_df")
-        
-    # Check that the column input_col contains text data
-    if not biblio_df[input_col].dropna().apply(lambda x: isinstance(x, str)).all():
-        raise ValueError(f"The '{input_col}' column must contain text data")
+    # Set the timer
+    start_time = time.time()
 
-    # Remove rows where input_col is NaN, empty, or an empty string
-    biblio_df = biblio_df.dropna(subset = [input_col])
-    biblio_df = biblio_df[biblio_df[input_col].apply(lambda x: (x != '') and not x.isspace())]
+    text_df, input_col, embeddings = _select_text_rows(biblio_df_ = biblio_df_,
+                                                       input_col = input_col,
+                                                       id_col = id_col,
+                                                       extra_cols = stratify_cols,
+                                                       embeddings = embeddings)
 
     # Sample from the document if sample_size is provided
+    fit_df = text_df
+    fit_embeddings = embeddings
+    remaining_df = None
+    remaining_embeddings = None
+
     if sample_size:
-        biblio_df = biblio_df.sample(n = sample_size)
+        if stratify_cols:
+            fit_df = _stratified_sample(text_df, sample_size, stratify_cols)
+        else:
+            fit_df = text_df.sample(n = sample_size)
 
-    biblio_df.reset_index(drop = True, inplace = True)
+        if assign_all:
+            remaining_df = text_df.drop(index = fit_df.index)
+            remaining_embeddings = embeddings[text_df.index.get_indexer(remaining_df.index)] if embeddings is not None else None
+
+        if embeddings is not None:
+            fit_embeddings = embeddings[text_df.index.get_indexer(fit_df.index)]
 
     # Create a list of the titles
-    docs = biblio_df[input_col].to_list()
+    docs = fit_df[input_col].to_list()
 
-    # Set the timer
-    start_time = time.time()
+    # Get the document embeddings from the project's embedding store
+    if fit_embeddings is None:
+        fit_embeddings = _get_embeddings(docs, fit_df, biblio_project_dir, id_col, embedding_model, verbose)
+
+    # Remove the stopwords when the topics are vectorised, rather than updating the topics afterwards
+    vectorizer_model = CountVectorizer(ngram_range = n_gram_range, stop_words = "english") if remove_stopwords else None
 
     # Create topics
     model = BERTopic(language = "english", 
+                     embedding_model = embedding_model,
                      n_gram_range = n_gram_range, 
+                     vectorizer_model = vectorizer_model,
                      verbose = verbose, 
                      calculate_probabilities = calc_probs)
-    topics, probs = model.fit_transform(docs)
+    topics, probs = model.fit_transform(docs, embeddings = fit_embeddings)
 
-    # Remove stopwords
-    if remove_stopwords:
-        vectorizer_model = CountVectorizer(stop_words = "english")
-        model.update_topics(docs, vectorizer_model = vectorizer_model)
+    # The topics are indexed by the row position in biblio_df_ until they are keyed
+    topics_dfs = [_create_doc_topics_df(model, topics, probs, index = fit_df.index)]
 
-    doc_info_df = model.get_document_info(docs)
+    # Assign the topics to the documents that are not in the sample, batch by batch
+    if remaining_df is not None and len(remaining_df) > 0:
+        logger.info(f"Assigning topics to the remaining {len(remaining_df)} documents...")
 
-    # Reset the indices of both dataframes and then merge horizontally
-    # biblio_stripped_se.reset_index(drop = True, inplace = True)
-    # doc_info_df.reset_index(drop = True, inplace = True)
-    merged_df = pd.concat([biblio_df, doc_info_df], axis = 1)
+        for start in range(0, len(remaining_df), assign_batch_size):
+            batch_df = remaining_df.iloc[start:start + assign_batch_size]
+            batch_docs = batch_df[input_col].to_list()
 
-    # Calculate the time needed to dit the BERTopic model
-    logger.info("--- %s seconds ---" % (time.time() - start_time))
+            if remaining_embeddings is not None:
+                batch_embeddings = remaining_embeddings[start:start + assign_batch_size]
+            else:
+                batch_embeddings = _get_embeddings(batch_docs, batch_df, biblio_project_dir, id_col, embedding_model, verbose)
+
+            batch_topics, batch_probs = model.transform(batch_docs, embeddings = batch_embeddings)
+            topics_dfs.append(_create_doc_topics_df(model, batch_topics, batch_probs, index = batch_df.index))
 
-    return model, merged_df
+    # Restore the order of the rows in biblio_df and key the topics
+    topics_df = pd.concat(topics_dfs).sort_index()
+    topics_df.index = _get_topic_keys(biblio_df_, text_df.loc[topics_df.index], id_col)
+
+    # Calculate the time and memory needed to fit the BERTopic model
+    _log_time_and_memory(start_time)
+
+    return model, topics_df
+
+
+def merge_bert_topics(biblio_df: pd.DataFrame,
+                      topics_df: pd.DataFrame,
+                      id_col: Optional[str] = None
+                      ) -> pd.DataFrame:
+    """
+    Join the topics returned by `generate_bert_topics`, `assign_bert_topics` or 
+    `generate_online_bert_topics` to biblio_df.
+
+    Args:
+        biblio_df: 
+            The DataFrame that the topics were generated from.
+        topics_df: 
+            The topics, indexed by `id_col` or the index of biblio_df.
+        id_col: 
+            The column used as `id_col` when generating the topics (default: None).
+
+    Raises:
+        ValueError: If the ids in `id_col`, the index of biblio_df or the index of 
+            topics_df have duplicates.
+
+    Returns:
+        biblio_df with the topic columns. Rows without a topic (no text) have NaN topics.
+    """
+
+    _check_unique_keys(biblio_df, id_col)
+
+    if not topics_df.index.is_unique:
+        raise ValueError("The index of topics_df has duplicate keys")
+
+    return biblio_df.join(topics_df, on = id_col)
+
+
+def save_bert_model(model: BERTopic,
+                    biblio_project_dir: str,
+                    model_name: str,
+                    embedding_model: Optional[str] = default_embedding_model,
+                    serialization: str = 'safetensors'
+                    ) -> Path:
+    """
+    Save a fitted BERTopic model in the model directory of a bibliometric project.
+
+    By default, the model is saved with safetensors, together with the c-TF-IDF weights, 
+    so that `assign_bert_topics` can later assign topics to new documents. Only the name 
+    of the embedding model is stored, not the model itself. A safetensors model assigns 
+    topics by the similarity to the topic embeddings. Use `serialization = 'pickle'` to 
+    keep the dimensionality reduction and clustering models, which is needed to update 
+    an online model (`generate_online_bert_topics`) after loading it.
+
+    Args:
+        model: 
+            The fitted BERTopic model.
+        biblio_project_dir: 
+            The name of the bibliometric project directory.
+        model_name: 
+            The name of the model directory in `models/biblio_project_dir`.
+        embedding_model: 
+            The name of the sentence transformer model that was used to fit the model, 
+            or None to save the model without it.
+        serialization:
+            'safetensors' or 'pickle' (default: 'safetensors').
+
+    Returns:
+        The path to the saved model.
+    """
+
+    model_path = get_model_dir(biblio_project_dir) / model_name
+
+    logger.info(f"Saving the BERTopic model to '{model_path}'...")
+    model.save(str(model_path), 
+               serialization = serialization,     # type: ignore - checked by BERTopic
+               save_ctfidf = True, 
+               save_embedding_model = embedding_model)
+
+    return model_path
+
+
+def load_bert_model(biblio_project_dir: str,
+                    model_name: str,
+                    embedding_model: Optional[str] = default_embedding_model
+                    ) -> BERTopic:
+    """
+    Load a BERTopic model saved with `save_bert_model`.
+
+    Args:
+        biblio_project_dir: 
+            The name of the bibliometric project directory.
+        model_name: 
+            The name of the model directory in `models/biblio_project_dir`.
+        embedding_model: 
+            The name of the sentence transformer model that was used to fit the model, 
+            or None to load the model without it.
+
+    Raises:
+        ValueError: If the model does not exist.
+
+    Returns:
+        The BERTopic model.
+    """
+
+    model_path = get_model_dir(biblio_project_dir) / model_name
+
+    if not model_path.exists():
+        raise ValueError(f"The model '{model_path}' does not exist")
+
+    return BERTopic.load(str(model_path), embedding_model = embedding_model)
+
+
+def _create_doc_topics_df(model: BERTopic,
+                          topics: List[int],
+                          probs: Optional[np.ndarray],
+                          index: pd.Index
+                          ) -> pd.DataFrame:
+    """
+    Create a document topics DataFrame, like `BERTopic.get_document_info` without the 
+    documents, with the given index.
+    """
+
+    topic_info_df = model.get_topic_info().set_index('Topic')[['Name', 'Representation']]
+    topic_info_df['Top_n_words'] = topic_info_df['Representation'].map(lambda words: ' - '.join(words))
+
+    # Look up the names of the topics of all documents in one go
+    doc_topics_df = topic_info_df[['Name', 'Top_n_words']].reindex(np.asarray(topics))
+    doc_topics_df = doc_topics_df.reset_index().set_axis(index, axis = 0)
+
+    if probs is not None and np.ndim(probs) == 1:
+        doc_topics_df['Probability'] = probs
+    elif probs is not None:
+        doc_topics_df['Probability'] = np.max(probs, axis = 1)
+
+    return doc_topics_df
+
+
+def assign_bert_topics(model: BERTopic,
+                       biblio_df_: pd.DataFrame,
+                       input_col: Optional[str] = None,
+                       verbose: bool = False,
+                       biblio_project_dir: Optional[str] = None,
+                       id_col: Optional[str] = None,
+                       embedding_model: Optional[str] = default_embedding_model,
+                       embeddings: Optional[np.ndarray] = None
+                       ) -> pd.DataFrame:
+    """
+    Assign the topics of a fitted BERTopic model to new documents without refitting the model.
+
+    This is the incremental mode for updates of a dataset: fit the model once with 
+    `generate_bert_topics`, save it with `save_bert_model`, and for every update, load 
+    it with `load_bert_model` and call this function on the new publications.
+
+    Parameters:
+
+    model (BERTopic): 
+        The fitted BERTopic model.
+    biblio_df_ (pd.DataFrame): 
+        The pandas DataFrame containing the new texts.
+    input_col (Optional[str]): 
+        The name of the column containing the text (default: None, uses first/only column).
+    verbose (bool): 
+        Whether to print verbose output (default: False).
+    biblio_project_dir, id_col, embedding_model, embeddings:
+        See `generate_bert_topics`.
+
+    Returns:
+
+    pd.DataFrame: 
+        The assigned topics of the rows of biblio_df with text, keyed like the topics of 
+        `generate_bert_topics`.
+    """
+
+    start_time = time.time()
+
+    text_df, input_col, embeddings = _select_text_rows(biblio_df_ = biblio_df_,
+                                                       input_col = input_col,
+                                                       id_col = id_col,
+                                                       embeddings = embeddings)
+
+    docs = text_df[input_col].to_list()
+
+    if embeddings is None:
+        embeddings = _get_embeddings(docs, text_df, biblio_project_dir, id_col, embedding_model, verbose)
+
+    topics, probs = model.transform(docs, embeddings = embeddings)
+    topics_df = _create_doc_topics_df(model, topics, probs, index = _get_topic_keys(biblio_df_, text_df, id_col))
+
+    _log_time_and_memory(start_time)
+
+    return topics_df
+
+
+def generate_online_bert_topics(biblio_df_: pd.DataFrame,
+                                input_col: Optional[str] = None,
+                                n_topics: int = 50,
+                                n_components: int = 5,
+                                batch_size: int = 10_000,
+                                model: Optional[BERTopic] = None,
+                                verbose: bool = False,
+                                biblio_project_dir: Optional[str] = None,
+                                id_col: Optional[str] = None,
+                                embedding_model: Optional[str] = default_embedding_model,
+                                embeddings: Optional[np.ndarray] = None
+                                ) -> Tuple[BERTopic, pd.DataFrame]:
+    """
+    Fit or update an online BERTopic model for a growing corpus.
+
+    The online model uses incremental PCA instead of UMAP, mini-batch k-means instead 
+    of HDBSCAN, and an online count vectorizer, which can all be updated with new 
+    documents (`BERTopic.partial_fit`). The documents are fed to the model in batches 
+    of `batch_size`. To add new publications later, pass the returned model (or the model 
+    loaded with `load_bert_model`) as `model` together with the new publications.
+
+    Parameters:
+
+    biblio_df_ (pd.DataFrame): 
+        The pandas DataFrame containing the text.
+    input_col (Optional[str]): 
+        The name of the column containing the text (default: None, uses first/only column).
+    n_topics (int):
+        The number of clusters of the mini-batch k-means model (default: 50).
+    n_components (int):
+        The number of dimensions of the incremental PCA (default: 5).
+    batch_size (int):
+        The number of documents per partial fit (default: 10000). The first batch needs 
+        at least `n_topics` documents.
+    model (Optional[BERTopic]):
+        An online BERTopic model to update (default: None, creates a new model).
+    verbose (bool): 
+        Whether to print verbose output (default: False).
+    biblio_project_dir, id_col, embedding_model, embeddings:
+        See `generate_bert_topics`.
+
+    Returns:
+
+    BERTopic: 
+        The online BERTopic model.
+
+    pd.DataFrame:
+        The topics assigned by the updated model to the rows of biblio_df with text, keyed 
+        like the topics of `generate_bert_topics`.
+    """
+
+    start_time = time.time()
+
+    text_df, input_col, embeddings = _select_text_rows(biblio_df_ = biblio_df_,
+                                                       input_col = input_col,
+                                                       id_col = id_col,
+                                                       embeddings = embeddings)
+
+    docs = text_df[input_col].to_list()
+
+    if embeddings is None:
+        embeddings = _get_embeddings(docs, text_df, biblio_project_dir, id_col, embedding_model, verbose)
+
+    if model is None:
+        model = BERTopic(language = "english",
+                         embedding_model = embedding_model,
+                         umap_model = IncrementalPCA(n_components = n_components),
+                         hdbscan_model = MiniBatchKMeans(n_clusters = n_topics, random_state = 0, n_init = 3),
+                         vectorizer_model = OnlineCountVectorizer(stop_words = "english"),
+                         verbose = verbose)
+
+    # Update the model with batches of about the same size (partial_fit fails on very small batches)
+    n_batches = max(1, int(np.ceil(len(docs) / batch_size)))
+
+    for batch_idx in np.array_split(np.arange(len(docs)), n_batches):
+        # The incremental PCA returns float32 for the first float32 batch only, which breaks the k-means update
+        model.partial_fit([docs[i] for i in batch_idx], 
+                          embeddings = embeddings[batch_idx].astype(np.float64) if embeddings is not None else None)
+        logger.info(f"Online topic model updated with {batch_idx[-1] + 1} of {len(docs)} documents")
+
+    # Assign the topics of the updated model to all documents
+    topics, probs = model.transform(docs, embeddings = embeddings)
+    topics_df = _create_doc_topics_df(model, topics, probs, index = _get_topic_keys(biblio_df_, text_df, id_col))
+
+    _log_time_and_memory(start_time)
+
+    return model, topics_df
 
 
 def create_topic_summary_df(topic_info_df: pd.DataFrame) -> pd.DataFrame:
@@ -129,4 +620,131 @@ def create_topic_summary_df(topic_info_df: pd.DataFrame) -> pd.DataFrame:
     topic_summary_info_df = counts[['n_articles', 'tp_num', 'tp_name', 'top_n_words']] \
                                 .drop_duplicates().sort_values('n_articles', ascending=False)
     
-    return topic_summary_info_df
\ No newline at end of file
+    return topic_summary_info_df
+
+
+def calc_topics_over_time(biblio_df: pd.DataFrame,
+                          topics_df: pd.DataFrame,
+                          input_col: str,
+                          id_col: Optional[str] = None,
+                          period_col: str = 'year',
+                          period_length: int = 1,
+                          n_terms: int = 5,
+                          n_gram_range: Tuple = (1,1),
+                          stop_words: Optional[Union[str, List[str]]] = 'english',
+                          vocabulary: Optional[List[str]] = None,
+                          cache_dir: Optional[Path] = None
+                          ) -> pd.DataFrame:
+    """
+    Compute the frequency and the keywords of the topics of one fitted model per period.
+
+    The topics are fitted once (`generate_bert_topics`) and then bucketed by `period_col`, 
+    so the topics are the same in all periods. The keywords of a topic in a period are 
+    its top c-TF-IDF terms in the documents of that period, weighted with the idf of the 
+    whole corpus. They are computed from the cached document-term matrix 
+    (`ctfidf.get_doc_term_matrix`), so the documents are vectorised only once.
+
+    Parameters:
+
+    biblio_df (pd.DataFrame): 
+        The DataFrame that the topics were generated from. The ids in `id_col`, or else 
+        the index labels, must be unique so that each article is counted once.
+    topics_df (pd.DataFrame): 
+        The topics returned by `generate_bert_topics`.
+    input_col (str): 
+        The name of the column with the texts of the topics.
+    id_col (Optional[str]):
+        The column used as `id_col` when generating the topics (default: None).
+    period_col (str):
+        The column with the publication year (default: 'year').
+    period_length (int):
+        The number of years per period (default: 1).
+    n_terms (int):
+        The number of keywords per topic and period (default: 5).
+    n_gram_range (Tuple):
+        The range of n-grams of the keywords (default: (1,1)).
+    stop_words, vocabulary:
+        The selection of the keywords, see `ctfidf.select_terms` (default: 'english', None).
+    cache_dir (Optional[Path]):
+        Optional directory where the document-term matrix is stored.
+
+    Returns:
+
+    pd.DataFrame:
+        A tidy DataFrame with one row per period and topic with articles, and the columns 
+        `period`, `Topic`, `Name`, `n_articles`, `share` (of the articles of the period), 
+        and `Top_n_words`.
+    """
+
+    if period_col not in biblio_df.columns:
+        raise ValueError(f"{period_col} is not a column in biblio_df")
+
+    cols = list(dict.fromkeys([col for col in [id_col, input_col, period_col] if col is not None]))
+    docs_df = merge_bert_topics(biblio_df[cols], topics_df[['Topic', 'Name']], id_col)
+
+    # Filter the documents and their periods by position, as the index of biblio_df may have duplicate labels
+    periods = pd.to_numeric(docs_df[period_col], errors = 'coerce')
+    has_topic_and_period = (docs_df['Topic'].notna() & periods.notna()).to_numpy()
+    docs_df = docs_df[has_topic_and_period]
+    periods = (periods[has_topic_and_period] // period_length * period_length).astype(int)
+
+    dtm, terms = get_doc_term_matrix(docs_df[input_col].to_list(), n_gram_range = n_gram_range, cache_dir = cache_dir)
+    keep_cols = np.flatnonzero(select_terms(terms, stop_words = stop_words, vocabulary = vocabulary))
+    dtm = dtm[:, keep_cols]
+
+    # Group the documents by topic and period
+    topic_codes, topic_ids = pd.factorize(docs_df['Topic'].astype(int), sort = True)
+    period_codes, period_ids = pd.factorize(periods, sort = True)
+    group_ids, counts = calc_topic_term_counts(dtm, topic_codes * len(period_ids) + period_codes)
+    _, topic_counts = calc_topic_term_counts(dtm, topic_codes)
+
+    top_terms_df = get_top_terms(calc_ctfidf(counts, idf_counts = topic_counts), terms[keep_cols], n_terms)
+    top_n_words = top_terms_df.groupby('row')['term'].agg(' - '.join).reindex(range(len(group_ids)), fill_value = '')
+
+    n_articles = np.bincount(topic_codes * len(period_ids) + period_codes)[group_ids]
+    n_period_articles = np.bincount(period_codes)[group_ids % len(period_ids)]
+    topic_names = docs_df.drop_duplicates('Topic').set_index('Topic')['Name']
+
+    topics_over_time_df = pd.DataFrame({'period': np.asarray(period_ids)[group_ids % len(period_ids)],
+                                        'Topic': np.asarray(topic_ids)[group_ids // len(period_ids)],
+                                        'n_articles': n_articles,
+                                        'share': n_articles / n_period_articles,
+                                        'Top_n_words': top_n_words.to_numpy()})
+    topics_over_time_df.insert(2, 'Name', topics_over_time_df['Topic'].map(topic_names))
+
+    return topics_over_time_df.sort_values(['period', 'Topic'], ignore_index = True)
+
+
+def create_topic_time_summary_df(topics_over_time_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Creates a topic summary dataframe with the number of articles per period.
+
+    Extends the columns of `create_topic_summary_df` (`n_articles`, `tp_num`, `tp_name`) 
+    with one column per period with the number of articles, and the first period and the 
+    period with the most articles of each topic (`first_period`, `peak_period`).
+
+    Parameters:
+    topics_over_time_df : pd.DataFrame
+        The output of `calc_topics_over_time`.
+
+    Returns:
+    pd.DataFrame
+        The pandas DataFrame containing the summary information grouped by topic.
+    """
+
+    counts_df = topics_over_time_df.pivot_table(index = ['Topic', 'Name'], 
+                                                columns = 'period', 
+                                                values = 'n_articles', 
+                                                aggfunc = 'sum', 
+                                                fill_value = 0)
+    period_counts = counts_df.to_numpy()
+
+    topic_summary_df = pd.DataFrame({'n_articles': period_counts.sum(axis = 1),
+                                     'tp_num': counts_df.index.get_level_values('Topic'),
+                                     'tp_name': counts_df.index.get_level_values('Name'),
+                                     'first_period': counts_df.columns[np.argmax(period_counts > 0, axis = 1)],
+                                     'peak_period': counts_df.columns[np.argmax(period_counts, axis = 1)]})
+    topic_summary_df = pd.concat([topic_summary_df, counts_df.reset_index(drop = True)], axis = 1)
+    topic_summary_df.columns = [str(col) for col in topic_summary_df.columns]
+
+    return topic_summary_df.sort_values('n_articles', ascending = False)
\ No newline at end of file
@@ -1,5 +1,7 @@
 import pandas as pd
 import numpy as np
+import sys
+import hashlib
 # import nltk
 # import spacy
 
@@ -190,6 +192,33 @@ def validate_output_dir_and_ext(biblio_project_dir_name: str,
         raise ValueError(f"The file name '{output_file}' needs to end in {ext_str}")
 
 
+def hash_texts(docs: List[str]) -> List[str]:
+    """
+    Returns the SHA-1 hashes of the texts in `docs`.
+    """
+
+    return [hashlib.sha1(doc.encode('utf-8')).hexdigest() for doc in docs]
+
+
+def get_peak_memory_mb() -> Optional[float]:
+    """
+    Returns the peak resident memory of the current process in MB.
+
+    Returns:
+        The peak memory, or None on platforms without the `resource` module (Windows).
+    """
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
 def is_none_nan_empty(value: Any) -> bool:
     if pd.isna(value) or value is None or not str(value).strip():
         return True
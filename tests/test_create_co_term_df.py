@@ -3,9 +3,12 @@ import os
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 
+import tempfile
 import pandas as pd
 import numpy as np
-from co_terms import create_co_term_graph
+import igraph as ig
+import co_terms
+from co_terms import create_co_term_graph, count_co_terms, write_co_term_graph, hash_co_term_graph, analyse_co_term_graph
 
 def test_create_co_term_df():
 
@@ -22,5 +25,155 @@ def test_create_co_term_df():
                       synonymise = True,
                       stem = True,
                       min_count = 2)
-    
-test_create_co_term_df()
+
+
+def test_create_co_term_graph_parallel():
+
+    se = pd.Series([
+        'risk; assets; statistical',
+        'banks; systemic; financial; risk',
+        'spread; bank; risk; assets',
+        'asset management; systemic; risk',
+        'financial; assets; systemic'
+    ] * 3)
+
+    g_1, vs_1, pair_counter_1 = create_co_term_graph(term_se = se, singularise = False, n_workers = 1)
+    g_2, vs_2, pair_counter_2 = create_co_term_graph(term_se = se, singularise = False, n_workers = 2)
+
+    assert pair_counter_1 == pair_counter_2
+    assert sorted(vs_1) == sorted(vs_2)
+    assert pair_counter_1[frozenset(['risk', 'systemic'])] == 6
+    assert g_1.es[g_1.get_eid('risk', 'systemic')]['count'] == 6
+
+
+def test_count_co_terms_frequencies():
+
+    se = pd.Series([
+        'risk; assets; risk',
+        'risk; banks',
+        'assets; banks; banks'
+    ])
+
+    terms_df, pairs_df = count_co_terms(term_se = se, singularise = False)
+
+    assert terms_df['term'].tolist() == ['assets', 'banks', 'risk']
+    assert terms_df['doc_freq'].tolist() == [2, 2, 2]
+    assert terms_df['freq'].tolist() == [2, 3, 3]
+    assert pairs_df['count'].tolist() == [1, 1, 1]
+
+def test_count_co_terms_negative_min_count():
+
+    se = pd.Series([
+        'risk; assets; banks',
+        'risk; banks',
+        'risk; banks; spread'
+    ])
+
+    terms_df, pairs_df = count_co_terms(term_se = se, singularise = False, min_count = -2)
+
+    assert terms_df['term'].tolist() == ['banks', 'risk']
+    assert pairs_df['count'].tolist() == [3]
+
+    # The graph keeps all the pairs, only the pair_counter is filtered
+    g, vs, pair_counter = create_co_term_graph(term_se = se, singularise = False, min_count = -2)
+
+    assert g.ecount() == 5
+    assert pair_counter == {frozenset(['banks', 'risk']): 3}
+
+
+def test_write_co_term_graph():
+
+    se = pd.Series([
+        'risk; assets; banks & co',
+        'risk; banks & co',
+        'assets; risk; spread'
+    ])
+
+    terms_df, pairs_df = count_co_terms(term_se = se, singularise = False)
+    edges = [(terms_df['term'][i], terms_df['term'][j], count) for i, j, count in pairs_df.itertuples(index = False)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # GraphML file that igraph can read, with the node and edge attributes
+        write_co_term_graph(terms_df, pairs_df, tmp_dir, '', 'co_terms.graphml', chunk_size = 2)
+        g = ig.Graph.Read_GraphML(os.path.join(tmp_dir, 'co_terms.graphml'))
+
+        assert g.vs['name'] == terms_df['term'].tolist()
+        assert g.vs['doc_freq'] == terms_df['doc_freq'].tolist()
+        assert g.vs['freq'] == terms_df['freq'].tolist()
+        assert [(g.vs[e.source]['name'], g.vs[e.target]['name'], e['count']) for e in g.es] == edges
+
+        # Edge list with the terms
+        write_co_term_graph(terms_df, pairs_df, tmp_dir, '', 'co_terms.csv', chunk_size = 2)
+        edges_df = pd.read_csv(os.path.join(tmp_dir, 'co_terms.csv'))
+
+        assert edges_df.columns.tolist() == ['source', 'target', 'count']
+        assert list(edges_df.itertuples(index = False, name = None)) == edges
+
+        # NumPy archive with the terms and the pair columns
+        write_co_term_graph(terms_df, pairs_df, tmp_dir, '', 'co_terms.npz')
+
+        with np.load(os.path.join(tmp_dir, 'co_terms.npz')) as npz:
+            assert npz['terms'].tolist() == terms_df['term'].tolist()
+            assert npz['term_1'].tolist() == pairs_df['term_1'].tolist()
+            assert npz['term_2'].tolist() == pairs_df['term_2'].tolist()
+            assert npz['count'].tolist() == pairs_df['count'].tolist()
+
+        # Parquet edge list with dictionary-encoded terms
+        write_co_term_graph(terms_df, pairs_df, tmp_dir, '', 'co_terms.parquet', chunk_size = 2)
+        edges_df = pd.read_parquet(os.path.join(tmp_dir, 'co_terms.parquet'))
+
+        assert list(edges_df.astype({'source': str, 'target': str}).itertuples(index = False, name = None)) == edges
+
+
+def test_analyse_co_term_graph():
+
+    se = pd.Series([
+        'risk; assets; banks',
+        'risk; banks',
+        'risk; banks; spread',
+        'assets; spread'
+    ])
+
+    g, _, _ = create_co_term_graph(term_se = se, singularise = False)
+    g_same, _, _ = create_co_term_graph(term_se = se, singularise = False)
+
+    # The hash only depends on the terms, the edges, and the weights
+    assert hash_co_term_graph(g) == hash_co_term_graph(g_same)
+    assert hash_co_term_graph(g) != hash_co_term_graph(g, weights = None)
+
+    g_other, _, _ = create_co_term_graph(term_se = se.iloc[:3], singularise = False)
+    assert hash_co_term_graph(g) != hash_co_term_graph(g_other)
+
+    # Layouts without edge weights
+    co_terms.co_term_analysis_cache.clear()
+    analysis_df = analyse_co_term_graph(g, layout = 'circle')
+
+    assert analysis_df['term'].tolist() == g.vs['name']
+    assert analysis_df['strength'].tolist() == [3, 5, 5, 3]
+    assert g.vs['x'] == analysis_df['x'].tolist()
+
+    # The results are reused from the memory cache
+    assert analyse_co_term_graph(g_same, layout = 'circle') is analysis_df
+    assert len(co_terms.co_term_analysis_cache) == 1
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # The results are written to cache_dir and read from there after clearing the memory cache
+        analysis_df = analyse_co_term_graph(g, layout = 'kk', cache_dir = tmp_dir)
+        cache_files = os.listdir(tmp_dir)
+        assert len(cache_files) == 1
+
+        cached_df = analysis_df.assign(community = -1)
+        cached_df.to_pickle(os.path.join(tmp_dir, cache_files[0]))
+        co_terms.co_term_analysis_cache.clear()
+
+        assert analyse_co_term_graph(g, layout = 'kk', cache_dir = tmp_dir).equals(cached_df)
+        assert g.vs['community'] == [-1] * 4
+
+    # Only the most recently used results are kept
+    for seed in range(co_terms.co_term_analysis_cache_size + 2):
+        analyse_co_term_graph(g, layout = 'circle', seed = seed)
+
+    assert len(co_terms.co_term_analysis_cache) == co_terms.co_term_analysis_cache_size
+
+
+test_create_co_term_df()
\ No newline at end of file
@@ -0,0 +1,41 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import pandas as pd
+import numpy as np
+from ctfidf import get_doc_term_matrix, select_terms, extract_topic_terms, create_topic_labels_df
+
+def test_extract_topic_terms():
+
+    docs = ['the bank loan and the credit risk',
+            'bank capital and loan losses',
+            'the virus and the patient health',
+            'covid virus health risk']
+    topics = [0, 0, 1, 1]
+
+    dtm, terms = get_doc_term_matrix(docs, n_gram_range = (1, 2))
+
+    topic_terms_df = extract_topic_terms(dtm, terms, topics, n_terms = 3, stop_words = 'english', n_gram_range = (1, 1))
+
+    assert topic_terms_df['Topic'].tolist() == [0, 0, 0, 1, 1, 1]
+    assert topic_terms_df['rank'].tolist() == [1, 2, 3, 1, 2, 3]
+    assert topic_terms_df[topic_terms_df['Topic'] == 0]['term'].tolist() == ['bank', 'loan', 'capital']
+    assert topic_terms_df[topic_terms_df['Topic'] == 1]['term'].tolist() == ['health', 'virus', 'covid']
+    assert 'the' not in topic_terms_df['term'].tolist()
+
+    labels_df = create_topic_labels_df(topic_terms_df, n_words = 2)
+    assert labels_df['Name'].tolist() == ['0_bank_loan', '1_health_virus']
+
+
+def test_select_terms():
+
+    terms = np.array(['bank', 'bank loan', 'the bank', 'credit risk', 'risk'], dtype = object)
+
+    assert select_terms(terms, stop_words = 'english').tolist() == [True, True, False, True, True]
+    assert select_terms(terms, n_gram_range = (2, 2)).tolist() == [False, True, True, True, False]
+    assert select_terms(terms, vocabulary = ['Credit Risk', 'bank']).tolist() == [True, False, False, True, False]
+
+
+test_extract_topic_terms()
\ No newline at end of file
@@ -0,0 +1,95 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import tempfile
+import pandas as pd
+import numpy as np
+import embed
+from embed import embed_documents, get_cached_embeddings, get_embedding_store_dir, read_embedding_store
+
+
+class FakeEncoder:
+    """
+    Stands in for a sentence transformer and embeds a text as its length and the sum of its characters.
+    """
+
+    def __init__(self):
+        self.n_encoded = 0
+        self.batches = []
+
+    def encode(self, docs, batch_size = 32, show_progress_bar = False, convert_to_numpy = True):
+        self.n_encoded += len(docs)
+        self.batches.append(docs)
+        return np.array([fake_embedding(doc) for doc in docs])
+
+
+def fake_embedding(doc):
+    return [len(doc), sum(map(ord, doc)), 1.0]
+
+
+def test_get_cached_embeddings():
+
+    encoder = FakeEncoder()
+    load_embedding_model = embed._load_embedding_model
+    embed._load_embedding_model = lambda embedding_model: encoder
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Test case 1: Empty store, each distinct text is embedded once
+            docs = ['bank risk', 'virus', 'bank risk']
+            embeddings = get_cached_embeddings(docs, tmp_dir, ids = [1, 2, 3])
+
+            assert embeddings.dtype == np.float32
+            assert embeddings.tolist() == [fake_embedding(doc) for doc in docs]
+            assert encoder.n_encoded == 2
+
+            index_df, stored_embeddings = read_embedding_store(get_embedding_store_dir(tmp_dir))
+            assert index_df['id'].tolist() == ['1', '2']
+            assert len(stored_embeddings) == 2
+            del stored_embeddings
+
+            # Test case 2: The cached rows are looked up by the text hash, only the new text is embedded and appended
+            docs = ['virus', 'credit spread', 'bank risk']
+            embeddings = get_cached_embeddings(docs, tmp_dir, ids = [2, 4, 1])
+
+            assert embeddings.tolist() == [fake_embedding(doc) for doc in docs]
+            assert encoder.n_encoded == 3
+
+            store_dir = get_embedding_store_dir(tmp_dir)
+            index_df, stored_embeddings = read_embedding_store(store_dir)
+            assert index_df['id'].tolist() == ['1', '2', '4']
+            assert np.asarray(stored_embeddings).tolist() == [fake_embedding(doc) for doc in ['bank risk', 'virus', 'credit spread']]
+            assert sorted(os.listdir(store_dir)) == ['embeddings.npy', 'index.csv']
+            del stored_embeddings
+
+            # Test case 3: All texts are cached
+            embeddings = get_cached_embeddings(['credit spread', 'virus'], tmp_dir)
+
+            assert embeddings.tolist() == [fake_embedding(doc) for doc in ['credit spread', 'virus']]
+            assert encoder.n_encoded == 3
+    finally:
+        embed._load_embedding_model = load_embedding_model
+
+
+def test_embed_documents():
+
+    encoder = FakeEncoder()
+    load_embedding_model = embed._load_embedding_model
+    embed._load_embedding_model = lambda embedding_model: encoder
+
+    try:
+        docs = ['a long text about systemic risk', 'bank', 'credit risk', '', 'a virus', 'bank', 'contagion in networks']
+        embeddings = embed_documents(docs, batch_size = 3)
+
+        # The batches are sorted by the length of the documents, the embeddings are in the order of docs
+        assert [len(batch) for batch in encoder.batches] == [3, 3, 1]
+        assert [len(doc) for batch in encoder.batches for doc in batch] == sorted(len(doc) for doc in docs)
+        assert embeddings.tolist() == [fake_embedding(doc) for doc in docs]
+
+        assert embed_documents([]).shape == (0, 0)
+    finally:
+        embed._load_embedding_model = load_embedding_model
+
+test_get_cached_embeddings()
\ No newline at end of file
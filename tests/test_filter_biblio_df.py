@@ -0,0 +1,168 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import pandas as pd
+import numpy as np
+from filter import filter_biblio_df, filter_biblio_df_batch, select_biblio_rows, compile_query, QueryNode, query_plan_cache, query_plan_cache_size
+from text_index import build_text_index
+
+def test_filter_biblio_df():
+
+    df = pd.DataFrame({
+        'title': ['Systemic risk in banks', 'Equity markets', 'Systemic equity risk', 'Extreme events', None],
+        'abstract': ['public banks', 'the extreme modules', 'equities', 'public module', 'systemic'],
+        'year': [2014, 2014, 2015, 2016, 2014]
+    })
+
+    assert filter_biblio_df(df, "systemic in* title").index.tolist() == [0, 2]
+    assert filter_biblio_df(df, "~systemic in* title").index.tolist() == [1, 3, 4]
+    assert filter_biblio_df(df, "'equity' in* [title, abstract]").index.tolist() == [1, 2]
+    assert filter_biblio_df(df, "['modules', extreme] in* [title, abstract]").index.tolist() == [1, 3]
+    assert filter_biblio_df(df, "[[systemic, 'equity']] in* title").index.tolist() == [2]
+    assert filter_biblio_df(df, "(risk in* title) & (year == 2014)").index.tolist() == [0]
+    assert filter_biblio_df(df, "~(~public in* abstract | extreme in* title)").index.tolist() == [0]
+
+
+def test_compile_query():
+
+    df = pd.DataFrame({'title': ['Systemic risk', 'Market risk', 'Equity'], 'year': [2014, 2015, 2016]})
+
+    query_plan = compile_query("risk in* title & year > 2014")
+    assert compile_query("risk in* title & year > 2014") is query_plan
+    assert query_plan.evaluate(df).tolist() == [False, True, False]
+    assert filter_biblio_df(df, query_plan).index.tolist() == [1]
+
+    try:
+        filter_biblio_df(df, "risk in* abstract")
+        assert False
+    except ValueError:
+        pass
+
+    # Only the most recently used plans are cached
+    for year in range(2 * query_plan_cache_size):
+        query_plan = compile_query(f"risk in* title & year > {year}")
+
+    assert len(query_plan_cache) == query_plan_cache_size
+    assert "risk in* title & year > 2014" not in query_plan_cache
+    assert query_plan_cache[f"risk in* title & year > {year}"] is query_plan
+
+
+
+def test_query_parser():
+
+    df = pd.DataFrame({
+        'title': ['Systemic risk\nand equity', 'Equity', 'risk & return', 'Bank loans'],
+        'bib_src': ['lens', 'scopus', 'lens', 'dims']
+    })
+
+    # The search strings of an 'and' search are matched on all lines of a text
+    assert filter_biblio_df(df, "[[systemic, 'equity']] in* title").index.tolist() == [0]
+    assert filter_biblio_df(df, "'&' in* title").index.tolist() == []
+    assert filter_biblio_df(df, "[bank, 'return'] in* title & ~(bib_src == 'lens')").index.tolist() == [3]
+    assert filter_biblio_df(df, "~(risk in* title | (bib_src == 'dims'))").index.tolist() == [1]
+
+    for query_str in ["(risk in* title", "risk in* ~title", "[~risk, bank] in* title", "risk in* [[title]]"]:
+        try:
+            compile_query(query_str)
+            assert False
+        except ValueError:
+            pass
+
+    # Malformed pandas expressions are only found when the query is evaluated
+    for query_str in ["ris[ in* title", "bib_src == (lens", "bib_src == 'lens"]:
+        try:
+            filter_biblio_df(df, query_str)
+            assert False
+        except ValueError:
+            pass
+
+    # The nodes of the syntax tree implement evaluate
+    try:
+        QueryNode()
+        assert False
+    except TypeError:
+        pass
+
+
+
+def test_filter_biblio_df_text_index():
+
+    df = pd.DataFrame({
+        'title': ['Systemic risk in banks', 'Equity markets', 'Systemic equity risk', 'Extreme events', ''],
+        'abstract': ['public banks', 'the extreme modules', 'equities', 'public module', 'systemic-risk']
+    })
+
+    text_index = build_text_index(df, ['title', 'abstract'])
+
+    for query_str in ["systemic in* title",
+                      "'equity' in* [title, abstract]",
+                      "[[systemic, 'equity']] in* title",
+                      "['modules', extreme] in* [title, abstract]",
+                      "'systemic risk' in* [title, abstract]",
+                      "systemic.risk in* abstract",
+                      "~(~public in* abstract | extreme in* title)"]:
+        assert filter_biblio_df(df, query_str, text_index = text_index).index.tolist() == \
+               filter_biblio_df(df, query_str).index.tolist()
+
+    # An index of other texts of the same length is not used
+    edited_df = df.assign(title = df['title'][::-1].to_numpy())
+
+    assert filter_biblio_df(edited_df, "systemic in* title", text_index = text_index).index.tolist() == [2, 4]
+    assert filter_biblio_df_batch(edited_df, {'systemic': "systemic in* title"}, text_index = text_index)['systemic'].index.tolist() == [2, 4]
+
+    # Nor is it used after a value of biblio_df was changed
+    assert filter_biblio_df(df, "systemic in* title", text_index = text_index).index.tolist() == [0, 2]
+    df.loc[1, 'title'] = 'Systemic equity'
+    assert filter_biblio_df(df, "systemic in* title", text_index = text_index).index.tolist() == [0, 1, 2]
+
+
+
+def test_filter_biblio_df_batch():
+
+    df = pd.DataFrame({
+        'title': ['Systemic risk in banks', 'Equity markets', 'Systemic equity risk', 'Extreme events'],
+        'abstract': ['public banks', 'the extreme modules', 'equities', 'public module'],
+        'year': [2014, 2014, 2015, 2016]
+    })
+
+    queries = {'systemic': "systemic in* title",
+               'equity': "['equity', equities] in* [title, abstract]",
+               'modules': "[[extreme, 'modules']] in* [title, abstract] | (year > 2015)",
+               'no_banks': "~bank in* [title, abstract]"}
+
+    for min_index_searches in [None, 1]:
+        filtered_dfs = filter_biblio_df_batch(df, queries, min_index_searches = min_index_searches)
+
+        for name, query_str in queries.items():
+            assert filtered_dfs[name].equals(filter_biblio_df(df, query_str))
+
+    labels_df = filter_biblio_df_batch(df, queries, output = 'labels')
+    assert labels_df.columns.tolist() == list(queries.keys())
+    assert labels_df['equity'].tolist() == [False, True, True, False]
+
+
+
+def test_select_biblio_rows():
+
+    df = pd.DataFrame({
+        'title': ['Systemic risk in banks', 'Equity markets', 'Systemic equity risk', 'Extreme events'],
+        'year': [2014, 2014, 2015, 2016]
+    }, index = [10, 11, 12, 13])
+
+    result = select_biblio_rows(df, "systemic in* title | (year > 2015)")
+
+    assert result.biblio_df is df
+    assert result.mask.tolist() == [True, False, True, True]
+    assert result.positions.tolist() == [0, 2, 3]
+    assert result.index.tolist() == [10, 12, 13]
+    assert len(result) == 3
+    assert result.to_df().equals(filter_biblio_df(df, "systemic in* title | (year > 2015)"))
+    assert result.to_df(['year']).columns.tolist() == ['year']
+
+    results = filter_biblio_df_batch(df, {'systemic': "systemic in* title"}, output = 'results')
+    assert results['systemic'].index.tolist() == [10, 12]
+
+
+test_filter_biblio_df()
\ No newline at end of file
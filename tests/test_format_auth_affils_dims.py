@@ -42,3 +42,20 @@ def test_format_auth_affils_dims():
     expected_output_str = np.nan
     output_str = format_auth_affils_dims(input_str)
     assert pd.isna(output_str) and pd.isna(expected_output_str)
+
+
+def test_format_auth_affils():
+
+    # Test case with nested parentheses, ';' between affiliations and an unmatched ')'
+    input_str = 'Doe, J. (Lab (LAB); Institute); Roe, Kim) (CERN (Geneva));Poe, A.'
+    assert split_auth_affils_dims(input_str) == ['Doe, J. (Lab (LAB); Institute)', ' Roe, Kim) (CERN (Geneva))', 'Poe, A.']
+
+    # Test case with repeated records and missing values
+    input_se = pd.Series(['Schweizer, Pia‐Johanna (Institute for Advanced Sustainability Studies (IASS), Potsdam, Germany); Goble, Robert (Clark University, Worcester, MA, USA)',
+                          np.nan,
+                          'Shriver, Erin Simon M. P.',
+                          'Schweizer, Pia‐Johanna (Institute for Advanced Sustainability Studies (IASS), Potsdam, Germany); Goble, Robert (Clark University, Worcester, MA, USA)'],
+                         index = [4, 2, 0, 1])
+    output_se = format_auth_affils(input_se, BiblioSource.DIMS)
+    assert output_se.equals(input_se.apply(format_auth_affils_dims))
+    assert output_se[1] == 'Schweizer, P. (Institute for Advanced Sustainability Studies (IASS), Potsdam, Germany); Goble, R. (Clark University, Worcester, MA, USA)'
@@ -0,0 +1,38 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import pandas as pd
+import numpy as np
+from clean import format_authors, format_auth_scopus, format_auth_lens, format_auth_dims, BiblioSource
+
+
+def test_format_authors():
+    # Test case 1: Scopus records with ';' and ',' separators, missing authors and odd whitespace
+    authors_se = pd.Series(['Doe J.', 'Smith J.; Doe J.', 'Alexandre M., Silva T.C., Michalak K.', '[No author name available]',
+                            '', np.nan, ' Müller  H.W. ;;  Martínez  Xavier\tA.'], index = [3, 1, 4, 1, 5, 9, 2])
+    output_se = format_authors(authors_se, BiblioSource.SCOPUS)
+    assert output_se.equals(authors_se.apply(format_auth_scopus))
+    assert output_se.iloc[6] == 'Müller, H.W.; Martínez, X.A.'
+
+    # Test case 2: Lens records with the surname last
+    authors_se = pd.Series(['Elena L. Mishchenko; A. M. Mishchenko; Vladimir A. Ivanisenko', 'Smith', '', np.nan, ' ; Zoë  de Kaspar '])
+    output_se = format_authors(authors_se, BiblioSource.LENS)
+    assert output_se.equals(authors_se.apply(format_auth_lens))
+    assert output_se.iloc[0] == 'Mishchenko, E.L.; Mishchenko, A.M.; Ivanisenko, V.A.'
+
+    # Test case 3: Dimensions records with commas between the surname and the first names
+    authors_se = pd.Series(['Bhat, Sanjay P.; Kumar, M. Uday; Mohammed, Shariq', 'Doe , John', '', np.nan])
+    output_se = format_authors(authors_se, BiblioSource.DIMS)
+    assert output_se.equals(authors_se.apply(format_auth_dims))
+    assert output_se.iloc[0] == 'Bhat, S.P.; Kumar, M.U.; Mohammed, S.'
+
+    # Test case 4: Other sources are not supported
+    try:
+        format_authors(authors_se, BiblioSource.BIBLIO)
+        assert False
+    except ValueError:
+        pass
+
+test_format_authors()
\ No newline at end of file
@@ -0,0 +1,151 @@
+import sys
+import os
+import io
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import pandas as pd
+
+from openpyxl import load_workbook
+
+from highlight import highlight_keywords, highlight_column, create_highlight_pager, ExcelExportSpec, highlight_selected_text, find_highlight_spans, render_highlights_html, parse_highlights_html, \
+                      get_highlight_font, create_rich_text
+
+def test_highlight_selected_text():
+
+    red_span = '<span style="color: red; font-weight: bold">{}</span>'
+    blue_span = '<span style="color: blue; font-weight: bold">{}</span>'
+
+    text = 'Systemic risk and financial contagion in bank networks'
+
+    assert highlight_selected_text(text, ['financ', 'bank'], 'red') == \
+        f"Systemic risk and {red_span.format('financial')} contagion in {red_span.format('bank')} networks"
+    assert highlight_selected_text(text, 'network', 'red', partial = False) == \
+        f"Systemic risk and financial contagion in bank {red_span.format('networks')}"
+    assert highlight_selected_text(text, [], 'red') == text
+    assert highlight_selected_text(text, [''], 'red') == text
+
+    # A second colour group does not highlight the existing highlights again
+    red_text = highlight_selected_text(text, ['risk', 'bank'], 'red')
+    assert highlight_selected_text(red_text, ['risk', 'contagion', 'bold'], 'blue') == \
+        f"Systemic {red_span.format('risk')} and financial {blue_span.format('contagion')} in {red_span.format('bank')} networks"
+
+
+
+def test_find_highlight_spans():
+
+    text = 'Systemic risk and financial contagion in bank networks'
+
+    spans = find_highlight_spans(text, ['risk', 'bank'], 'red')
+    assert spans == [(9, 13, 'red'), (41, 45, 'red')]
+
+    # The existing highlights are kept and not searched again
+    spans = find_highlight_spans(text, ['systemic risk', 'contagion'], 'blue', spans = spans)
+    assert spans == [(9, 13, 'red'), (28, 37, 'blue'), (41, 45, 'red')]
+
+    html = render_highlights_html(text, spans)
+    assert html == highlight_selected_text(highlight_selected_text(text, ['risk', 'bank'], 'red'), 
+                                           ['systemic risk', 'contagion'], 'blue')
+    assert parse_highlights_html(html) == (text, spans)
+
+    rich_text = create_rich_text(text, spans, {'red': get_highlight_font('red'), 'blue': get_highlight_font('blue')})
+    assert str(rich_text) == text
+    assert [block.font.color.rgb for block in rich_text if not isinstance(block, str)] == ['00ff0000', '000000ff', '00ff0000']
+
+
+
+def test_highlight_keywords_excel():
+
+    df = pd.DataFrame({
+        'title': ['Systemic risk in banks', 'Equity markets'],
+        'abstract': ['Contagion in bank networks', None],
+        'year': [2014, 2015]
+    })
+
+    highlight_params = [{'strings': ['risk', 'bank'], 'targets': ['title', 'abstract'], 'colour': 'red'},
+                        {'strings': 'contagion', 'targets': 'abstract', 'colour': 'blue'}]
+
+    for write_only in [True, False]:
+        excel_params = {'cols': [{'col': 'abstract', 'heading': 'Abstract', 'width': 80, 'wrap': True},
+                                 {'col': 'title', 'heading': 'Title', 'width': 40}],
+                        'sheet_name': 'Highlights',
+                        'freeze_panes': 'A2',
+                        'write_only': write_only}
+
+        _, wb = highlight_keywords(df, highlight_params, excel_params = excel_params)
+
+        excel_file = io.BytesIO()
+        wb.save(excel_file)
+        ws = load_workbook(io.BytesIO(excel_file.getvalue()), rich_text = True)['Highlights']
+
+        assert [cell.value for cell in ws[1]] == ['Abstract', 'Title', 'year']
+        assert ws['A1'].font.b and ws['A2'].alignment.wrap_text and not ws['B2'].alignment.wrap_text
+        assert ws.column_dimensions['A'].width == 80 and ws.freeze_panes == 'A2'
+        assert str(ws['A2'].value) == 'Contagion in bank networks'
+        assert [(block.text, block.font.color.rgb) for block in ws['A2'].value if not isinstance(block, str)] == \
+            [('Contagion', '000000ff'), ('bank', '00ff0000')]
+        assert str(ws['A3'].value) == 'nan'
+        assert ws['C3'].value == 2015
+
+    # A compiled spec is reused across exports
+    spec = ExcelExportSpec(excel_params)
+    columns = spec.get_columns(['title', 'abstract', 'year'])
+    assert [column.col for column in columns] == ['abstract', 'title', 'year']
+    assert [column.width for column in columns] == [80, 40, None]
+
+    for _ in range(2):
+        _, wb = highlight_keywords(df, highlight_params, excel_params = spec)
+        wb.save(io.BytesIO())
+
+    assert spec.get_columns(['title', 'abstract', 'year']) is columns
+    assert sorted(spec.fonts.keys()) == ['blue', 'red']
+
+
+
+def test_highlight_column():
+
+    text_se = pd.Series(['Systemic risk in banks', 'Equity markets', None, 'Bank contagion risk'] * 5)
+    groups = [(['risk', 'bank'], 'red'), ('contagion', 'blue')]
+
+    progress = []
+    spans_lst = highlight_column(text_se, groups, chunk_size = 8, 
+                                 progress_callback = lambda n_done, n_total: progress.append((n_done, n_total)))
+
+    assert spans_lst[:4] == [[(9, 13, 'red'), (17, 22, 'red')], [], [], [(0, 4, 'red'), (5, 14, 'blue'), (15, 19, 'red')]]
+    assert progress == [(8, 20), (16, 20), (20, 20)]
+
+    assert highlight_column(text_se, groups, n_workers = 2, chunk_size = 8) == spans_lst
+
+
+
+def test_highlight_pager():
+
+    df = pd.DataFrame({
+        'title': [f'Systemic risk in banks {i}' for i in range(7)],
+        'year': list(range(2010, 2017))
+    })
+
+    highlight_params = [{'strings': ['risk', 'bank'], 'targets': 'title', 'colour': 'red'}]
+
+    pager = create_highlight_pager(df, highlight_params, page_size = 3)
+    assert pager.n_pages == 3
+
+    # Only the shown pages are highlighted
+    page_df = pager.highlight_page(3)
+    assert page_df.index.tolist() == [6]
+    assert page_df['title'].iloc[0] == highlight_selected_text(df['title'].iloc[6], ['risk', 'bank'], 'red')
+    assert 'Page 2 of 3 (rows 4 to 6 of 7)' in pager.page(2).data
+    assert list(pager._page_cache.keys()) == [2]
+
+    # The pages from highlight_keywords use the spans of the Excel export
+    html_pager, _ = highlight_keywords(df, highlight_params, html_cols = ['title'], html_page_size = 3)
+    assert html_pager.highlight_page(3).equals(page_df[['title']])
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        page_paths = pager.export_pages(output_dir)
+        assert [page_path.name for page_path in page_paths] == ['highlights_0001.html', 'highlights_0002.html', 'highlights_0003.html']
+        assert 'href="highlights_0003.html"' in page_paths[1].read_text(encoding = 'utf-8')
+
+
+test_highlight_selected_text()
\ No newline at end of file
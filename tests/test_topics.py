@@ -0,0 +1,245 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import tempfile
+import pandas as pd
+import numpy as np
+from topics import _stratified_sample, generate_bert_topics, merge_bert_topics, calc_topics_over_time, create_topic_time_summary_df, save_bert_model, load_bert_model, assign_bert_topics, generate_online_bert_topics
+from utilities import get_peak_memory_mb
+
+
+def create_topic_corpus(n_per_topic: int = 40, seed: int = 0):
+    """
+    Create titles on three topics with precomputed embeddings that form three separate clusters. 
+    The clusters are the same for all seeds.
+    """
+
+    centers = np.random.default_rng(42).normal(size = (3, 16)) * 5
+    rng = np.random.default_rng(seed)
+    words = [['bank', 'loan', 'credit', 'capital'],
+             ['virus', 'patient', 'health', 'vaccine'],
+             ['climate', 'carbon', 'emission', 'energy']]
+    labels = rng.permutation(np.repeat(np.arange(len(words)), n_per_topic))
+
+    biblio_df = pd.DataFrame({'id': [f'rec_{i}' for i in range(len(labels))],
+                              'title': [' '.join(rng.choice(words[label], size = 6)) for label in labels],
+                              'year': 2000 + np.arange(len(labels)) % 4})
+    embeddings = (centers[labels] + rng.normal(scale = 0.1, size = (len(labels), 16))).astype(np.float32)
+
+    return biblio_df, embeddings, labels
+
+
+def test_save_load_assign_bert_topics():
+
+    biblio_df, embeddings, labels = create_topic_corpus()
+    model, topics_df = generate_bert_topics(biblio_df, 'title', id_col = 'id', embedding_model = None, embeddings = embeddings)
+
+    # Each cluster of embeddings is one topic
+    assert topics_df.index.tolist() == biblio_df['id'].tolist()
+    assert topics_df['Topic'].nunique() == 3
+    assert (topics_df.groupby(labels)['Topic'].nunique() == 1).all()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = save_bert_model(model, tmp_dir, 'title_topics', embedding_model = None)
+        assert model_path.exists()
+
+        loaded_model = load_bert_model(tmp_dir, 'title_topics', embedding_model = None)
+
+    # The loaded model assigns the same topics, keyed by the ids of the rows with text
+    new_df = biblio_df.iloc[::10].copy()
+    new_df.loc[new_df.index[1], 'title'] = ' '
+    new_embeddings = embeddings[::10]
+
+    assigned_df = assign_bert_topics(loaded_model, new_df, 'title', id_col = 'id', embedding_model = None, embeddings = new_embeddings)
+    expected_ids = new_df['id'].drop(new_df.index[1])
+
+    assert assigned_df.index.name == 'id'
+    assert assigned_df.index.tolist() == expected_ids.tolist()
+    assert assigned_df['Topic'].tolist() == topics_df.loc[expected_ids, 'Topic'].tolist()
+    assert assigned_df['Name'].tolist() == topics_df.loc[expected_ids, 'Name'].tolist()
+
+    try:
+        load_bert_model(tmp_dir, 'title_topics')
+        assert False
+    except ValueError:
+        pass
+
+
+def test_generate_online_bert_topics():
+
+    biblio_df, embeddings, labels = create_topic_corpus()
+
+    # The corpus is fed to the online model in three batches
+    model, topics_df = generate_online_bert_topics(biblio_df, 'title', n_topics = 3, n_components = 2, batch_size = 50, 
+                                                   embedding_model = None, embeddings = embeddings)
+
+    assert model.hdbscan_model.n_steps_ == 3
+    assert topics_df.index.tolist() == biblio_df.index.tolist()
+    assert (topics_df.groupby(labels)['Topic'].nunique() == 1).all()
+    assert topics_df['Topic'].nunique() == 3
+
+    # Update the model with new publications in two more batches
+    new_df, new_embeddings, new_labels = create_topic_corpus(n_per_topic = 20, seed = 1)
+    new_df['id'] = 'new_' + new_df['id']
+
+    model, new_topics_df = generate_online_bert_topics(new_df, 'title', batch_size = 30, model = model, id_col = 'id', 
+                                                       embedding_model = None, embeddings = new_embeddings)
+
+    assert model.hdbscan_model.n_steps_ == 5
+    assert new_topics_df.index.tolist() == new_df['id'].tolist()
+    assert (new_topics_df.groupby(new_labels)['Topic'].nunique() == 1).all()
+
+def test_stratified_sample():
+
+    # Strata of 1 to 50 rows, some of them smaller than one sampled row, and a missing stratum
+    sizes = [50, 20, 7, 3, 1, 1, 1, 17]
+    biblio_df = pd.DataFrame({'year': np.repeat([2000, 2001, 2002, 2003, 2004, 2005, np.nan, 2007], sizes),
+                              'bib_src': np.repeat(['scopus', 'lens'] * 4, sizes)})
+    stratum_sizes = biblio_df.groupby(['year', 'bib_src'], dropna = False).size()
+
+    for sample_size in [1, 10, 33, 99, 100, 250]:
+        sample_df = _stratified_sample(biblio_df, sample_size, ['year', 'bib_src'])
+        n_sampled = sample_df.groupby(['year', 'bib_src'], dropna = False).size().reindex(stratum_sizes.index, fill_value = 0)
+        quotas = stratum_sizes * min(sample_size / len(biblio_df), 1)
+
+        # The sample sizes sum to n, and each stratum gets its quota rounded down or up
+        assert len(sample_df) == min(sample_size, len(biblio_df))
+        assert sample_df.index.is_unique
+        assert (n_sampled >= np.floor(quotas)).all() and (n_sampled <= np.ceil(quotas)).all()
+        assert (n_sampled <= stratum_sizes).all()
+
+    # A single stratum is a simple random sample
+    sample_df = _stratified_sample(biblio_df.assign(year = 2000), 30, ['year'])
+    assert len(sample_df) == 30 and sample_df.index.is_unique
+
+
+def test_generate_bert_topics_assign_all():
+
+    biblio_df, embeddings, labels = create_topic_corpus()
+
+    # Fit on a sample stratified by year and assign the topics to the other records in batches
+    model, topics_df = generate_bert_topics(biblio_df, 'title', id_col = 'id', sample_size = 60, stratify_cols = ['year'], 
+                                            assign_all = True, assign_batch_size = 25, embedding_model = None, embeddings = embeddings)
+
+    assert topics_df.index.tolist() == biblio_df['id'].tolist()
+    assert (topics_df.groupby(labels)['Topic'].nunique() == 1).all()
+    assert sum(model.topic_sizes_.values()) == 60
+
+    # Without assign_all, only the sample has topics
+    model, topics_df = generate_bert_topics(biblio_df, 'title', id_col = 'id', sample_size = 60, stratify_cols = ['year'], 
+                                            embedding_model = None, embeddings = embeddings)
+
+    assert len(topics_df) == 60
+    assert topics_df.index.isin(biblio_df['id']).all()
+    assert biblio_df.set_index('id').loc[topics_df.index, 'year'].value_counts().tolist() == [15, 15, 15, 15]
+
+def test_merge_bert_topics():
+
+    biblio_df, embeddings, labels = create_topic_corpus(n_per_topic = 20)
+    biblio_df.loc[[3, 7], 'title'] = [None, ' ']
+
+    # Topics keyed by id_col
+    model, topics_df = generate_bert_topics(biblio_df, 'title', id_col = 'id', embedding_model = None, embeddings = embeddings)
+    merged_df = merge_bert_topics(biblio_df, topics_df, id_col = 'id')
+
+    assert len(topics_df) == len(biblio_df) - 2
+    assert merged_df.index.equals(biblio_df.index)
+    assert merged_df['Topic'].isna().tolist() == [i in [3, 7] for i in range(len(biblio_df))]
+    assert (merged_df.dropna(subset = ['Topic']).groupby(labels[merged_df['Topic'].notna()])['Topic'].nunique() == 1).all()
+
+    # Topics keyed by the index of biblio_df
+    biblio_df.index = biblio_df['id'].str.upper()
+    model, topics_df = generate_bert_topics(biblio_df, 'title', embedding_model = None, embeddings = embeddings)
+    merged_df = merge_bert_topics(biblio_df, topics_df)
+
+    assert topics_df.index.isin(biblio_df.index).all()
+    assert merged_df.loc['REC_0', 'Topic'] == topics_df.loc['REC_0', 'Topic']
+    assert merged_df['Topic'].isna().sum() == 2
+
+    # Duplicate keys would repeat the rows of biblio_df
+    for dup_df, dup_topics_df, id_col in [(biblio_df.set_axis(['REC_0'] + biblio_df.index[:-1].tolist()), topics_df, None),
+                                          (biblio_df.assign(id = 'rec_0'), topics_df, 'id'),
+                                          (biblio_df, pd.concat([topics_df, topics_df]), None)]:
+        try:
+            merge_bert_topics(dup_df, dup_topics_df, id_col = id_col)
+            assert False
+        except ValueError:
+            pass
+
+
+def test_generate_bert_topics_input_errors():
+
+    biblio_df, embeddings, labels = create_topic_corpus(n_per_topic = 5)
+    invalid_inputs = [(biblio_df, 'year', embeddings),                                 # Not text
+                      (biblio_df, 'abstract', embeddings),                             # Missing column
+                      (biblio_df, 'title', embeddings[:-1]),                           # Embeddings of other rows
+                      (biblio_df.assign(title = ' \n'), 'title', embeddings),          # Blank texts
+                      (biblio_df.set_axis([0] * len(biblio_df)), 'title', embeddings), # Duplicate index labels
+                      (biblio_df.iloc[:0], 'title', embeddings[:0])]                   # No rows
+
+    for invalid_df, input_col, invalid_embeddings in invalid_inputs:
+        try:
+            generate_bert_topics(invalid_df, input_col, embedding_model = None, embeddings = invalid_embeddings)
+        except ValueError:
+            continue
+
+        assert False, f"No ValueError for the input column {input_col}"
+
+
+def test_get_peak_memory_mb():
+
+    peak_memory = get_peak_memory_mb()
+
+    if sys.platform == 'win32':
+        assert peak_memory is None
+    else:
+        # The process holds at least the pandas and numpy modules
+        assert 10 < peak_memory < 2**20
+
+def test_calc_topics_over_time():
+
+    # A tiny corpus with precomputed topics and duplicate index labels
+    biblio_df = pd.DataFrame({'id': [f'rec_{i}' for i in range(8)],
+                              'title': ['bank loan', 'bank credit', 'river water', 'bank loan rates', 
+                                        'river flood water', 'water flood', 'credit loan', 'river bank'],
+                              'year': [2000, 2001, 2001, 2002, 2003, None, 2003, 2002]},
+                             index = [0, 0, 1, 1, 2, 2, 3, 3])
+    topics_df = pd.DataFrame({'Topic': [0, 0, 1, 0, 1, 1, 0],
+                              'Name': ['0_bank_loan', '0_bank_loan', '1_river_water', '0_bank_loan', 
+                                       '1_river_water', '1_river_water', '0_bank_loan']},
+                             index = pd.Index([f'rec_{i}' for i in range(7)], name = 'id'))
+
+    topics_over_time_df = calc_topics_over_time(biblio_df, topics_df, 'title', id_col = 'id', period_length = 2, 
+                                                n_terms = 2, stop_words = None)
+
+    # rec_5 has no year and rec_7 has no topic
+    assert topics_over_time_df[['period', 'Topic', 'Name', 'n_articles']].values.tolist() == [[2000, 0, '0_bank_loan', 2],
+                                                                                            [2000, 1, '1_river_water', 1],
+                                                                                            [2002, 0, '0_bank_loan', 2],
+                                                                                            [2002, 1, '1_river_water', 1]]
+    assert topics_over_time_df['share'].tolist() == [2/3, 1/3, 2/3, 1/3]
+    assert topics_over_time_df.loc[0, 'Top_n_words'].split(' - ')[0] == 'bank'
+    assert topics_over_time_df.loc[3, 'Top_n_words'].split(' - ')[0] in ['flood', 'river', 'water']
+
+    topic_summary_df = create_topic_time_summary_df(topics_over_time_df)
+
+    assert topic_summary_df.columns.tolist() == ['n_articles', 'tp_num', 'tp_name', 'first_period', 'peak_period', '2000', '2002']
+    assert topic_summary_df[['n_articles', 'tp_num', 'first_period', 'peak_period', '2000', '2002']].values.tolist() == [[4, 0, 2000, 2000, 2, 2],
+                                                                                                                     [2, 1, 2000, 2000, 1, 1]]
+
+    # Topics keyed by the index of biblio_df give the same counts, and duplicate labels raise an error
+    index_topics_df = topics_df.set_axis(topics_df.index.str.upper())
+    index_topics_over_time_df = calc_topics_over_time(biblio_df.set_axis(biblio_df['id'].str.upper()), index_topics_df, 'title', 
+                                                      period_length = 2, n_terms = 2, stop_words = None)
+
+    assert index_topics_over_time_df.equals(topics_over_time_df)
+
+    try:
+        calc_topics_over_time(biblio_df, topics_df.set_axis(range(7)), 'title', period_length = 2)
+        assert False
+    except ValueError:
+        pass
+
+test_save_load_assign_bert_topics()
\ No newline at end of file